@@ -13,4 +13,7 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'jobProject.settings')
 
-application = get_asgi_application()
+# Collected static files are answered before the request reaches Django
+from job_app.staticfiles import ASGIStaticFilesMiddleware  # noqa: E402
+
+application = ASGIStaticFilesMiddleware(get_asgi_application())
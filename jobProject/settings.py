@@ -41,11 +41,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'job_app.middleware.QueryInstrumentationMiddleware',
+    'job_app.middleware.ReplicaRoutingMiddleware',
+    'job_app.middleware.CacheVersionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'job_app.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -63,6 +66,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'job_app.context_processors.cache_versions',
             ],
         },
     },
@@ -76,15 +80,105 @@ WSGI_APPLICATION = 'jobProject.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        # django.db.backends.sqlite3 plus WAL and tuned pragmas, see
+        # job_app/backends/sqlite3/base.py
+        'ENGINE': 'job_app.backends.sqlite3',
+        # JOB_PORTAL_DB points benchmarks and experiments at a scratch database
+        'NAME': os.environ.get('JOB_PORTAL_DB', BASE_DIR / 'db.sqlite3'),
+        # Keep connections (and their page cache) across requests
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'serialize_writes': True,
+            'pragmas': {},
+        },
+    }
+}
+
+# Read replicas, e.g. JOB_PORTAL_REPLICAS=/srv/replica1.sqlite3,/srv/replica2.sqlite3.
+# Local SQLite replicas are refreshed with `python manage.py sync_replicas`; for
+# Postgres add the replica aliases to DATABASES and DATABASE_REPLICAS directly.
+DATABASE_REPLICAS = []
+for number, replica_name in enumerate(filter(None, os.environ.get('JOB_PORTAL_REPLICAS', '').split(',')), 1):
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'NAME': replica_name.strip(),
+        'TEST': {'MIRROR': 'default'},
     }
+    DATABASE_REPLICAS.append(f'replica_{number}')
+
+DATABASE_ROUTERS = ['job_app.routers.PrimaryReplicaRouter']
+
+# Seconds a client keeps reading from the primary after a write
+REPLICA_PIN_SECONDS = 5
+
+
+# Cache
+# JOB_PORTAL_CACHE selects the backend: locmem (default), file or redis
+
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'job-portal',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+    },
+}
+
+JOB_PORTAL_CACHE = os.environ.get('JOB_PORTAL_CACHE', 'locmem')
+CACHES = {
+    'default': CACHE_BACKENDS[JOB_PORTAL_CACHE],
 }
+# locmem is private to each process, so data that must agree across workers
+# (logged-in users, sessions) is only cached when the backend is shared
+CACHE_IS_SHARED = JOB_PORTAL_CACHE != 'locmem'
+
+# Seconds anonymous job pages and job card fragments stay cached; job saves
+# and deletes invalidate both immediately through the catalogue version,
+# which is stored in the database (job_app.versions) so any cache backend works
+PAGE_CACHE_TIMEOUT = 60
+FRAGMENT_CACHE_TIMEOUT = 600
+# Seconds a version read from the database is reused from the cache. Bumps
+# clear it, but with locmem other processes only notice when it expires.
+CACHE_VERSION_TTL = 1
+
+
+# Sessions
+# JOB_PORTAL_SESSIONS selects the engine: cached_db (reads come from the cache, the
+# database is the fallback), db, cache or signed_cookies (no server-side storage at
+# all). The cache engines need a shared cache: with per-process locmem a logout only
+# clears the copy in one worker. The default is cached_db with a shared cache and db
+# otherwise. Purge expired rows with `python manage.py purge_sessions`.
+
+SESSION_BACKENDS = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_ENGINE = SESSION_BACKENDS[os.environ.get('JOB_PORTAL_SESSIONS', 'cached_db' if CACHE_IS_SHARED else 'db')]
+
+# Flash messages travel in a cookie instead of being written to the session
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
 
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
+# Loads each user together with their profile when the copy kept in the session
+# (job_app.middleware.AuthenticationMiddleware) is missing or stale, and caches
+# both when the cache is shared. 0 disables the cache: with a per-process cache
+# other workers would keep an old password hash or is_active until expiry.
+AUTHENTICATION_BACKENDS = ['job_app.auth.CachedModelBackend']
+AUTH_USER_CACHE_TIMEOUT = 300 if CACHE_IS_SHARED else 0
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -117,12 +211,100 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.0/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# `collectstatic` writes content-hashed copies plus .gz/.br variants (brotli needs
+# the optional brotli package); job_app.staticfiles.StaticFilesMiddleware in wsgi.py
+# and asgi.py serves them with a one year Cache-Control. Rebuild the Tailwind
+# stylesheet with `python manage.py build_css`.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'job_app.staticfiles.CompressedManifestStaticFilesStorage',
+    },
+}
+# Seconds browsers cache static files that have no content hash in their name
+STATIC_MAX_AGE = 60
 
 # Media files (Uploaded files)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# The apply view streams resumes to disk through ResumeUploadHandler, which
+# hashes them and enforces the size cap; the temp dir sits under MEDIA_ROOT so
+# finished uploads are renamed into place instead of copied
+FILE_UPLOAD_TEMP_DIR = os.path.join(MEDIA_ROOT, 'tmp')
+RESUME_MAX_UPLOAD_SIZE = 5 * 1024 * 1024
+
+# Background task queue (job_app.queue). Queued tasks only run while a worker
+# (`python manage.py run_task_worker`) is running; eager mode runs them in the
+# web process after commit instead, for setups without one.
+TASK_QUEUE_EAGER = os.environ.get('TASK_QUEUE_EAGER', '') == '1'
+TASK_MAX_ATTEMPTS = 5
+TASK_VISIBILITY_TIMEOUT = 300
+# Days finished and failed tasks are kept before workers delete them
+TASK_RETENTION_DAYS = 7
+
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = 'Job Portal <no-reply@jobportal.local>'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Query instrumentation (job_app.middleware.QueryInstrumentationMiddleware)
+# Budgets for views that cannot use the @query_budget decorator, keyed by URL name.
+# They include the session read that database sessions (the default) cost.
+
+QUERY_BUDGETS = {
+    'admin:job_app_job_changelist': 7,
+    'admin:job_app_application_changelist': 6,
+    'admin:job_app_job_filter_values': 3,
+    'admin:job_app_application_filter_values': 3,
+    'admin:job_applications': 6,
+}
+QUERY_BUDGET_STRICT = False
+QUERY_REPEAT_THRESHOLD = 3
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'job_app.queries': {
+            'handlers': ['console'],
+            # INFO logs one JSON line per request; WARNING only budget overruns and repeats
+            'level': os.environ.get('QUERY_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+# Admin
+# Job and application changelists (job_app.admin.PerformanceModeMixin): unfiltered
+# lists past this many rows show an estimated total and filtered ones stop counting
+# there; sidebar filters with more values than the cap turn into a text box with
+# suggestions
+ADMIN_EXACT_COUNT_LIMIT = 10000
+ADMIN_FILTER_MAX_CHOICES = 50
+
+# List pages (job listings, my applications, a job's applications in the admin)
+# accept ?per_page= up to this many rows; pages longer than the default size
+# stream their rows and gzip them as they go (job_app.streaming)
+LIST_MAX_PER_PAGE = 5000
+
+# Company and location names each process keeps mapped to their ids
+# (job_app.entities), per model
+ENTITY_CACHE_SIZE = 10000
+
+# Job search
+# SQLiteFTSSearchBackend falls back to icontains matching on other databases
+
+JOB_SEARCH_BACKEND = 'job_app.search.SQLiteFTSSearchBackend'
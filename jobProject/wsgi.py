@@ -13,4 +13,7 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'jobProject.settings')
 
-application = get_wsgi_application()
+# Collected static files are answered before the request reaches Django
+from job_app.staticfiles import StaticFilesMiddleware  # noqa: E402
+
+application = StaticFilesMiddleware(get_wsgi_application())
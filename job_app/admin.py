@@ -1,11 +1,175 @@
+from django import forms
+from django.conf import settings
 from django.contrib import admin
 from django.contrib import messages
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.utils import build_q_object_from_lookup_parameters, get_fields_from_path, reverse_field_path
+from django.contrib.admin.views.main import ChangeList
+from django.core.exceptions import PermissionDenied, ValidationError
 from django.urls import reverse
 from django.utils.html import format_html
+from django.utils.text import smart_split, unescape_string_literal
+from django.utils.translation import gettext_lazy as _
 from django.shortcuts import redirect, get_object_or_404
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, JsonResponse
 from django.template.response import TemplateResponse
-from .models import Profile, Job, Application
+from django.utils import timezone
+from django.contrib.auth.models import User
+from django.db.models import Q
+from .models import Profile, Company, Job, Location, Application, Task
+from .auth import invalidate_cached_users
+from .exports import export_response
+from .facets import FACET_MODELS
+from .pagination import EstimatedCountPaginator, get_per_page, paginate, stream_paginate
+from .streaming import stream_template
+from urllib.parse import urlencode
+
+FILTER_SUGGESTIONS = 20
+
+# Per-job applications page (JobAdmin.view_job_applications)
+APPLICATIONS_PER_PAGE = 25
+APPLICATION_SORTS = {
+    'newest': ('-applied_at', '-id'),
+    'oldest': ('applied_at', 'id'),
+    'applicant': ('applicant__username', 'id'),
+    '-applicant': ('-applicant__username', '-id'),
+}
+APPLICATION_EXPORT_HEADER = ('Username', 'Name', 'Email', 'Applied at', 'Resume', 'Cover letter')
+
+# Sidebar filter that stays cheap on large tables
+def facet_model(model, field_path):
+    """The Company or Location model whose names ``field_path`` ends in, if it does."""
+    field = get_fields_from_path(model, field_path)[-1]
+    return field.model if field.name == 'name' and field.model in FACET_MODELS.values() else None
+
+class CappedValuesFieldListFilter(admin.AllValuesFieldListFilter):
+    """
+    Lists at most ADMIN_FILTER_MAX_CHOICES distinct values. Past that the
+    sidebar shows a text box, with suggestions from the admin's filter values
+    endpoint as the user types.
+    """
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        super().__init__(field, request, params, model, model_admin, field_path)
+        self.model = model
+        entity_model = facet_model(model, field_path)
+        if entity_model:
+            # Names come straight from the unique name index; no DISTINCT over the jobs
+            self.lookup_choices = (
+                entity_model.objects.filter(job_count__gt=0).order_by('name').values_list('name', flat=True)
+            )
+        limit = settings.ADMIN_FILTER_MAX_CHOICES
+        # One extra value tells us the list is over the cap
+        choices = list(self.lookup_choices[:limit + 1])
+        self.autocomplete = len(choices) > limit
+        self.lookup_choices = [] if self.autocomplete else choices
+        if self.autocomplete:
+            opts = model_admin.opts
+            self.template = 'admin/job_app/autocomplete_filter.html'
+            self.suggestions_url = reverse(
+                f'admin:{opts.app_label}_{opts.model_name}_filter_values', args=[field_path]
+            )
+
+    def choices(self, changelist):
+        if not self.autocomplete:
+            yield from super().choices(changelist)
+            return
+        yield {
+            'selected': self.lookup_val is None,
+            'query_string': changelist.get_query_string(remove=[self.lookup_kwarg, self.lookup_kwarg_isnull]),
+            'display': _('All'),
+        }
+        # The text box submits the other active filters along with its own value
+        yield {
+            'value': self.lookup_val[-1] if self.lookup_val else '',
+            'hidden_params': [
+                (name, value)
+                for name, values in changelist.filter_params.items()
+                if name not in (self.lookup_kwarg, self.lookup_kwarg_isnull)
+                for value in values
+            ],
+        }
+
+    def queryset(self, request, queryset):
+        relation, _sep, lookup = self.field_path.partition('__')
+        if not lookup or not self.used_parameters:
+            return super().queryset(request, queryset)
+        # Filter through a subquery on the related table. SQLite plans the
+        # equivalent join as "every matching row, then sort", which is slow
+        # when one value covers a large share of the table.
+        related_model = self.model._meta.get_field(relation).related_model
+        parameters = {
+            name.removeprefix(f'{relation}__'): values for name, values in self.used_parameters.items()
+        }
+        try:
+            related = related_model._default_manager.filter(build_q_object_from_lookup_parameters(parameters))
+            return queryset.filter(**{f'{relation}__in': related.values('pk')})
+        except (ValueError, ValidationError) as e:
+            raise IncorrectLookupParameters(e)
+
+class PerformanceChangeList(ChangeList):
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        if self.model_admin.list_defer:
+            queryset = queryset.defer(*self.model_admin.list_defer)
+        return queryset
+
+# Changelist settings for tables that grow without bound
+class PerformanceModeMixin:
+    """
+    Performance mode for admin changelists over large tables.
+
+    Counts are estimated or capped (see EstimatedCountPaginator), the unfiltered
+    total and facet counts are skipped, ``list_defer`` keeps large text columns
+    out of the list query, and CappedValuesFieldListFilter filters fetch their
+    suggestions from ``filter_values_view``. Leave out ``date_hierarchy``: it
+    scans the whole table for the dates to offer.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    list_defer = ()
+    
+    class Media:
+        js = ('job_app/admin/filter_suggestions.js',)
+    
+    def get_changelist(self, request, **kwargs):
+        return PerformanceChangeList
+    
+    def get_urls(self):
+        from django.urls import path
+        opts = self.opts
+        custom_urls = [
+            path(
+                'filter-values/<str:field_path>/',
+                self.admin_site.admin_view(self.filter_values_view),
+                name=f'{opts.app_label}_{opts.model_name}_filter_values',
+            ),
+        ]
+        return custom_urls + super().get_urls()
+    
+    def filter_values_view(self, request, field_path):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        capped_paths = [
+            item[0] for item in self.list_filter
+            if isinstance(item, tuple) and issubclass(item[1], CappedValuesFieldListFilter)
+        ]
+        if field_path not in capped_paths:
+            raise Http404
+        term = request.GET.get('term', '').strip()
+        entity_model = facet_model(self.model, field_path)
+        if entity_model:
+            # Most common names first, from the stored job counts
+            entities = entity_model.objects.filter(job_count__gt=0, name__istartswith=term)
+            values = entities.order_by('-job_count', 'name').values_list('name', flat=True)[:FILTER_SUGGESTIONS]
+            return JsonResponse({'results': list(values)})
+        field = get_fields_from_path(self.model, field_path)[-1]
+        parent_model, _reverse_path = reverse_field_path(self.model, field_path)
+        queryset = self.get_queryset(request) if parent_model is self.model else parent_model._default_manager.all()
+        if term:
+            queryset = queryset.filter(**{f'{field.name}__istartswith': term})
+        values = queryset.order_by(field.name).values_list(field.name, flat=True).distinct()[:FILTER_SUGGESTIONS]
+        return JsonResponse({'results': list(values)})
 
 # Inline Application Admin
 class ApplicationInline(admin.TabularInline):
@@ -14,6 +178,9 @@ class ApplicationInline(admin.TabularInline):
     readonly_fields = ('applicant', 'applied_at', 'cover_letter', 'resume')
     fields = ('applicant', 'applied_at', 'cover_letter', 'resume')
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('applicant')
+    
     def has_add_permission(self, request, obj=None):
         return False
 
@@ -35,27 +202,77 @@ class ProfileAdmin(admin.ModelAdmin):
     user_date_joined.short_description = 'Joined'
     
     def make_employee(self, request, queryset):
+        user_ids = list(queryset.values_list('user_id', flat=True))
         updated = queryset.update(role='employee')
+        # update() sends no signals, so drop the cached users here
+        invalidate_cached_users(user_ids)
         self.message_user(request, f'{updated} user(s) were successfully assigned employee role.', messages.SUCCESS)
     make_employee.short_description = "Assign employee role to selected users"
     
     def make_applicant(self, request, queryset):
+        user_ids = list(queryset.values_list('user_id', flat=True))
         updated = queryset.update(role='applicant')
+        invalidate_cached_users(user_ids)
         self.message_user(request, f'{updated} user(s) were successfully assigned applicant role.', messages.SUCCESS)
     make_applicant.short_description = "Assign applicant role to selected users"
 
+# Companies and locations, mainly for renaming them; names are unique
+class NamedEntityAdmin(admin.ModelAdmin):
+    list_display = ('name', 'job_count')
+    search_fields = ('name',)
+    ordering = ('-job_count', 'name')
+
+@admin.register(Company)
+class CompanyAdmin(NamedEntityAdmin):
+    pass
+
+# Coordinates come from the gazetteer when a location is first seen; places
+# it does not know are filled in here (see the geocode_locations command)
+@admin.register(Location)
+class LocationAdmin(NamedEntityAdmin):
+    list_display = ('name', 'job_count', 'latitude', 'longitude', 'is_remote')
+    list_filter = ('is_remote',)
+    fields = ('name', 'latitude', 'longitude', 'is_remote')
+
+# Companies and locations are typed by name and interned on save, rather
+# than picked from selects listing every row
+class JobAdminForm(forms.ModelForm):
+    company_name = forms.CharField(label='Company name', max_length=200)
+    location_name = forms.CharField(label='Location', max_length=200)
+    
+    class Meta:
+        model = Job
+        fields = ('title', 'description', 'posted_by')
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.initial.setdefault('company_name', self.instance.company.name)
+            self.initial.setdefault('location_name', self.instance.location.name)
+    
+    def save(self, commit=True):
+        self.instance.company_id = Company.objects.intern(self.cleaned_data['company_name'])
+        self.instance.location_id = Location.objects.intern(self.cleaned_data['location_name'])
+        return super().save(commit)
+
 # Custom admin for Job
 @admin.register(Job)
-class JobAdmin(admin.ModelAdmin):
-    list_display = ('title', 'company_name', 'location', 'posted_by', 'created_at', 'applications_count', 'view_applications_link')
-    search_fields = ('title', 'company_name', 'location')
-    list_filter = ('company_name', 'location', 'created_at')
-    date_hierarchy = 'created_at'
+class JobAdmin(PerformanceModeMixin, admin.ModelAdmin):
+    form = JobAdminForm
+    list_display = ('title', 'company', 'location', 'posted_by', 'created_at', 'applications_count_display', 'view_applications_link')
+    list_select_related = ('posted_by', 'company', 'location')
+    list_defer = ('description',)
+    search_fields = ('title', 'company__name', 'location__name')
+    list_filter = (
+        ('company__name', CappedValuesFieldListFilter),
+        ('location__name', CappedValuesFieldListFilter),
+        'created_at',
+    )
     inlines = [ApplicationInline]
     readonly_fields = ('created_at', 'applications_summary', 'view_applications_button')
     fieldsets = (
         ('Job Information', {
-            'fields': ('title', 'company_name', 'location', 'description', 'posted_by', 'created_at')
+            'fields': ('title', 'company_name', 'location_name', 'description', 'posted_by', 'created_at')
         }),
         ('Applications', {
             'fields': ('applications_summary', 'view_applications_button'),
@@ -75,13 +292,14 @@ class JobAdmin(admin.ModelAdmin):
         ]
         return custom_urls + urls
     
-    def applications_count(self, obj):
-        count = obj.applications.count()
+    def applications_count_display(self, obj):
+        count = obj.applications_count
         return f"{count} application{'s' if count != 1 else ''}"
-    applications_count.short_description = 'Applications'
+    applications_count_display.short_description = 'Applications'
+    applications_count_display.admin_order_field = 'applications_count'
     
     def view_applications_link(self, obj):
-        count = obj.applications.count()
+        count = obj.applications_count
         if count > 0:
             url = reverse('admin:job_applications', args=[obj.id])
             return format_html('<a href="{}" class="button">View {} Application{}</a>', 
@@ -91,19 +309,19 @@ class JobAdmin(admin.ModelAdmin):
     view_applications_link.allow_tags = True
     
     def applications_summary(self, obj):
-        count = obj.applications.count()
-        if count > 0:
+        count = obj.applications_count
+        if count > 0 and obj.last_applied_at:
             return format_html(
                 '<p><strong>Total Applications:</strong> {}</p>'
                 '<p><strong>Latest Application:</strong> {}</p>',
                 count,
-                obj.applications.order_by('-applied_at').first().applied_at.strftime('%B %d, %Y at %I:%M %p')
+                obj.last_applied_at.strftime('%B %d, %Y at %I:%M %p')
             )
         return "No applications yet"
     applications_summary.short_description = 'Applications Summary'
     
     def view_applications_button(self, obj):
-        count = obj.applications.count()
+        count = obj.applications_count
         if count > 0:
             url = reverse('admin:job_applications', args=[obj.id])
             return format_html(
@@ -115,31 +333,121 @@ class JobAdmin(admin.ModelAdmin):
     view_applications_button.short_description = 'View Applications'
     
     def view_job_applications(self, request, job_id):
-        job = get_object_or_404(Job, id=job_id)
-        applications = job.applications.all().order_by('-applied_at')
+        job = get_object_or_404(Job.objects.select_related('posted_by', 'company', 'location'), id=job_id)
+        applications = job.applications.select_related('applicant')
+        
+        # Filtering and sorting happen in the database; pages are keyset
+        # seeks on application_job_idx, so page 100 costs the same as page 1
+        query = request.GET.get('q', '').strip()
+        if query:
+            applications = applications.filter(
+                Q(applicant__username__icontains=query) | Q(applicant__email__icontains=query)
+                | Q(applicant__first_name__icontains=query) | Q(applicant__last_name__icontains=query)
+            )
+        resume = request.GET.get('resume', '')
+        if resume == 'yes':
+            applications = applications.exclude(resume='')
+        elif resume == 'no':
+            applications = applications.filter(resume='')
+        sort = request.GET.get('sort', '')
+        if sort not in APPLICATION_SORTS:
+            sort = 'newest'
+        ordering = APPLICATION_SORTS[sort]
+        
+        export_format = request.GET.get('export')
+        if export_format in ('csv', 'xlsx'):
+            return self.export_job_applications(request, job, applications.order_by(*ordering), export_format)
+        
+        per_page = get_per_page(request, APPLICATIONS_PER_PAGE)
+        if per_page > APPLICATIONS_PER_PAGE:
+            # Longer pages stream their rows as they are read
+            page = stream_paginate(request, applications.defer('resume_text'), ordering, per_page)
+        else:
+            page = paginate(request, applications.defer('resume_text'), ordering, per_page)
+        filters = {name: value for name, value in (('q', query), ('resume', resume), ('sort', sort)) if value}
+        if per_page != APPLICATIONS_PER_PAGE:
+            filters['per_page'] = per_page
         
         context = {
             'title': f'Applications for "{job.title}"',
             'job': job,
-            'applications': applications,
+            'applications': page,
+            'page': page,
+            'page_query': urlencode(filters),
+            'query': query,
+            'resume': resume,
+            'sort': sort,
+            'sorts': [('newest', 'Newest first'), ('oldest', 'Oldest first'),
+                      ('applicant', 'Applicant A-Z'), ('-applicant', 'Applicant Z-A')],
+            'matching_count': applications.count() if query or resume else job.applications_count,
             'opts': self.model._meta,
             'has_view_permission': self.has_view_permission(request),
         }
-        
+        if page.streamed:
+            return stream_template(
+                request, 'admin/job_app/job/applications.html', context, page,
+                'admin/job_app/job/application_card.html', 'application',
+            )
         return TemplateResponse(request, 'admin/job_app/job/applications.html', context)
+    
+    def export_job_applications(self, request, job, applications, export_format):
+        # Plain tuples straight off a server-side cursor; nothing is held in memory
+        storage = Application._meta.get_field('resume').storage
+        rows = applications.values_list(
+            'applicant__username', 'applicant__first_name', 'applicant__last_name',
+            'applicant__email', 'applied_at', 'resume', 'cover_letter',
+        ).iterator(chunk_size=2000)
+        export_rows = (
+            (username, f'{first_name} {last_name}'.strip(), email, applied_at,
+             request.build_absolute_uri(storage.url(resume)) if resume else '', cover_letter)
+            for username, first_name, last_name, email, applied_at, resume, cover_letter in rows
+        )
+        return export_response(
+            export_format, f'job-{job.id}-applications', APPLICATION_EXPORT_HEADER, export_rows,
+            sheet_name='Applications',
+        )
 
 # Custom admin for Application
 @admin.register(Application)
-class ApplicationAdmin(admin.ModelAdmin):
+class ApplicationAdmin(PerformanceModeMixin, admin.ModelAdmin):
     list_display = ('job', 'applicant', 'applied_at', 'resume_link')
+    list_select_related = ('job__company', 'applicant')
+    list_defer = ('cover_letter', 'resume_text', 'job__description')
     search_fields = ('job__title', 'applicant__username', 'applicant__email')
-    list_filter = ('applied_at', 'job__company_name')
-    date_hierarchy = 'applied_at'
+    list_filter = ('applied_at', ('job__company__name', CappedValuesFieldListFilter))
     readonly_fields = ('applied_at',)
     
+    def get_search_results(self, request, queryset, search_term):
+        # Same fields as search_fields, but matched in the (much smaller) job
+        # and user tables first; the applications are then found by key
+        # instead of scanning every application through the joins
+        for bit in smart_split(search_term):
+            if bit.startswith(('"', "'")) and bit[0] == bit[-1]:
+                bit = unescape_string_literal(bit)
+            jobs = Job.objects.filter(title__icontains=bit).values('pk')
+            users = User.objects.filter(Q(username__icontains=bit) | Q(email__icontains=bit)).values('pk')
+            queryset = queryset.filter(Q(job__in=jobs) | Q(applicant__in=users))
+        return queryset, False
+    
     def resume_link(self, obj):
         if obj.resume:
             return format_html('<a href="{}" target="_blank">View Resume</a>', obj.resume.url)
         return "No resume"
     resume_link.short_description = 'Resume'
     resume_link.allow_tags = True
+
+# Custom admin for background tasks
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'max_attempts', 'run_at', 'worker', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'last_error')
+    readonly_fields = ('created_at', 'finished_at', 'locked_until', 'worker', 'last_error')
+    actions = ['retry_tasks']
+    
+    def retry_tasks(self, request, queryset):
+        updated = queryset.exclude(status='running').update(
+            status='queued', attempts=0, run_at=timezone.now(), locked_until=None, last_error=''
+        )
+        self.message_user(request, f'{updated} task(s) were queued again.', messages.SUCCESS)
+    retry_tasks.short_description = "Retry selected tasks"
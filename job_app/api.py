@@ -0,0 +1,174 @@
+"""
+Compact JSON API for jobs and the current user's applications.
+
+List endpoints take the same filters as job_listings, ``cursor`` for
+keyset pagination and ``fields`` for sparse field selection. Responses
+carry an ETag and Last-Modified so that unchanged polls get a bodiless
+304 before any query runs.
+
+Job responses are versioned by the catalogue version rather than by the
+newest ``Job.created_at`` alone: the version is bumped whenever a job is
+created, edited or deleted, so its timestamp is the newest creation or
+change time and edits invalidate cached responses too. The version is kept
+in the database (see job_app.versions), so every worker derives the same
+validators whichever cache backend is configured.
+"""
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.http import JsonResponse
+from django.views.decorators.http import condition, require_GET
+
+from .cache import get_catalogue_version
+from .middleware import query_budget
+from .models import Application, Job
+from .pagination import paginate
+from .search import read_search_params, search_jobs
+
+JOBS_PER_PAGE = 20
+APPLICATIONS_PER_PAGE = 20
+
+JOB_FIELDS = ('id', 'title', 'company_name', 'location', 'description', 'created_at')
+DEFAULT_LIST_FIELDS = ('id', 'title', 'company_name', 'location', 'created_at')
+# Fields read from the related company and location: (relation, path for only())
+RELATED_FIELDS = {'company_name': ('company', 'company__name'), 'location': ('location', 'location__name')}
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params={'separators': (',', ':')})
+
+
+def api_login_required(view_func):
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return json_response({'error': 'Authentication required.'}, status=401)
+        return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def requested_fields(request, default):
+    if not request.GET.get('fields'):
+        return default
+    fields = tuple(dict.fromkeys(f.strip() for f in request.GET['fields'].split(',') if f.strip()))
+    unknown = set(fields) - set(JOB_FIELDS)
+    if unknown or not fields:
+        raise InvalidFields(f'Unknown fields: {", ".join(sorted(unknown))}. Allowed: {", ".join(JOB_FIELDS)}.')
+    return fields
+
+
+def job_queryset(fields):
+    """Jobs loading just ``fields``, with the related names joined in."""
+    relations = [RELATED_FIELDS[field][0] for field in fields if field in RELATED_FIELDS]
+    columns = [RELATED_FIELDS[field][1] if field in RELATED_FIELDS else field for field in fields]
+    return Job.objects.select_related(*relations).only(*columns)
+
+
+def serialize_job(job, fields):
+    return {
+        field: getattr(job, RELATED_FIELDS[field][0]).name if field in RELATED_FIELDS else getattr(job, field)
+        for field in fields
+    }
+
+
+def page_payload(page, results):
+    return {
+        'results': results,
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    }
+
+
+def catalogue_etag(request, *args, **kwargs):
+    key = f'{get_catalogue_version()}:{request.get_full_path()}'
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def catalogue_last_modified(request, *args, **kwargs):
+    return datetime.fromtimestamp(get_catalogue_version() / 1e9, tz=timezone.utc)
+
+
+@require_GET
+@query_budget(2)
+@condition(etag_func=catalogue_etag, last_modified_func=catalogue_last_modified)
+def job_list(request):
+    try:
+        fields = requested_fields(request, DEFAULT_LIST_FIELDS)
+    except InvalidFields as exc:
+        return json_response({'error': str(exc)}, status=400)
+
+    params = read_search_params(request.GET)
+    # The cursor needs created_at and id whatever fields were asked for
+    jobs = search_jobs(job_queryset(('id', 'created_at', *fields)), params)
+    page = paginate(request, jobs, ('-created_at', '-id'), JOBS_PER_PAGE)
+    return json_response(page_payload(page, [serialize_job(job, fields) for job in page]))
+
+
+@require_GET
+@query_budget(2)
+@condition(etag_func=catalogue_etag, last_modified_func=catalogue_last_modified)
+def job_detail(request, job_id):
+    try:
+        fields = requested_fields(request, JOB_FIELDS)
+    except InvalidFields as exc:
+        return json_response({'error': str(exc)}, status=400)
+
+    job = job_queryset(('id', *fields)).filter(id=job_id).first()
+    if job is None:
+        return json_response({'error': 'Job not found.'}, status=404)
+    return json_response(serialize_job(job, fields))
+
+
+def _user_applications(request):
+    applications = Application.objects.filter(applicant=request.user)
+    if request.GET.get('job', '').isdigit():
+        applications = applications.filter(job_id=request.GET['job'])
+    return applications
+
+
+def _applications_state(request):
+    # One indexed aggregate tells whether anything changed since the last poll
+    if not hasattr(request, '_applications_state'):
+        request._applications_state = _user_applications(request).aggregate(
+            count=Count('id'), latest=Max('applied_at')
+        )
+    return request._applications_state
+
+
+def applications_etag(request):
+    state = _applications_state(request)
+    key = f'{request.user.pk}:{state["count"]}:{state["latest"]}:{request.get_full_path()}'
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def applications_last_modified(request):
+    return _applications_state(request)['latest']
+
+
+@require_GET
+@api_login_required
+@query_budget(5)
+@condition(etag_func=applications_etag, last_modified_func=applications_last_modified)
+def application_list(request):
+    """The current user's applications; ``?job=<id>`` checks a single job."""
+    applications = (
+        _user_applications(request)
+        .select_related('job__company')
+        .only('id', 'applied_at', 'job__id', 'job__title', 'job__company__name')
+    )
+    page = paginate(request, applications, ('-applied_at', '-id'), APPLICATIONS_PER_PAGE)
+    return json_response(page_payload(page, [
+        {
+            'job': {'id': application.job.id, 'title': application.job.title,
+                    'company_name': application.job.company.name},
+            'status': 'applied',
+            'applied_at': application.applied_at,
+        }
+        for application in page
+    ]))
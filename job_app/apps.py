@@ -1,6 +1,28 @@
+import os
+
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.models.signals import post_migrate
+
+
+def install_search_index(sender, using='default', **kwargs):
+    from .search import get_search_backend
+    get_search_backend().install(using)
+
+
+def install_geo_index(sender, using='default', **kwargs):
+    from .geo import install
+    install(using)
 
 
 class JobAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'job_app'
+
+    def ready(self):
+        from . import signals, tasks  # noqa: F401
+        post_migrate.connect(install_search_index, sender=self)
+        post_migrate.connect(install_geo_index, sender=self)
+        # Uploads are streamed here before being renamed into MEDIA_ROOT
+        if settings.FILE_UPLOAD_TEMP_DIR:
+            os.makedirs(settings.FILE_UPLOAD_TEMP_DIR, exist_ok=True)
@@ -0,0 +1,147 @@
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import BACKEND_SESSION_KEY, SESSION_KEY, get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from . import versions
+from .models import Profile
+
+USER_CACHE_KEY = 'auth:user:{}'
+SESSION_USER_KEY = '_auth_user_copy'
+
+
+def invalidate_cached_users(user_ids):
+    cache.delete_many([USER_CACHE_KEY.format(user_id) for user_id in user_ids])
+    # Drops every session's copy, in every process (see get_session_user)
+    versions.bump_version(versions.USERS)
+
+
+def _dump(instance):
+    # Strings, so that any session serializer can store them. The password
+    # hash stays out of the session and is loaded if something asks for it
+    return {
+        field.attname: None if getattr(instance, field.attname) is None else field.value_to_string(instance)
+        for field in instance._meta.concrete_fields
+        if field.attname != 'password'
+    }
+
+
+def _load(model, values):
+    fields = [model._meta.get_field(name) for name in values]
+    return model.from_db(None, list(values), [
+        None if value is None else field.to_python(value) for field, value in zip(fields, values.values())
+    ])
+
+
+def _from_copy(copy, version, user_id, backend):
+    if (copy is None or copy['version'] != version or copy['id'] != user_id
+            or backend not in settings.AUTHENTICATION_BACKENDS):
+        return None
+    user = _load(get_user_model(), copy['user'])
+    profile = None if copy['profile'] is None else _load(Profile, copy['profile'])
+    Profile.user.field.remote_field.set_cached_value(user, profile)
+    if profile is not None:
+        Profile.user.field.set_cached_value(profile, user)
+    user.backend = backend
+    return user
+
+
+def _copy(user, version, user_id):
+    profile = getattr(user, 'profile', None)
+    return {
+        'version': version,
+        'id': user_id,
+        'user': _dump(user),
+        'profile': None if profile is None else _dump(profile),
+    }
+
+
+def get_session_user(request):
+    """
+    django.contrib.auth.get_user() that keeps a copy of the user and their
+    profile in the session, so that logged-in requests need neither query.
+
+    The copy carries the USERS version, which invalidate_cached_users()
+    bumps whenever a user or profile is saved or a role changes. The version
+    lives in the database like the cache versions, so a stale copy is
+    dropped in every process within CACHE_VERSION_TTL, and the next request
+    loads the user (checking the password hash and is_active) again.
+    """
+    session = request.session
+    user_id = session.get(SESSION_KEY)
+    if user_id is None:
+        return auth.get_user(request)
+    version = versions.get_version(versions.USERS)
+    user = _from_copy(session.get(SESSION_USER_KEY), version, user_id, session.get(BACKEND_SESSION_KEY))
+    if user is None:
+        user = auth.get_user(request)
+        if user.is_authenticated:
+            session[SESSION_USER_KEY] = _copy(user, version, user_id)
+    return user
+
+
+def copy_user_to_session(session, user):
+    # On login, so that the requests that follow start with a copy
+    session[SESSION_USER_KEY] = _copy(user, versions.get_version(versions.USERS), session[SESSION_KEY])
+
+
+async def aget_session_user(request):
+    session = request.session
+    user_id = await session.aget(SESSION_KEY)
+    if user_id is None:
+        return await auth.aget_user(request)
+    version = await versions.aget_version(versions.USERS)
+    user = _from_copy(
+        await session.aget(SESSION_USER_KEY), version, user_id, await session.aget(BACKEND_SESSION_KEY)
+    )
+    if user is None:
+        user = await auth.aget_user(request)
+        if user.is_authenticated:
+            await session.aset(SESSION_USER_KEY, _copy(user, version, user_id))
+    return user
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend whose per-request user lookup fetches the profile in the
+    same query and keeps both in the cache for AUTH_USER_CACHE_TIMEOUT.
+
+    Django still checks the session auth hash against the cached user, and
+    job_app.signals drops the entry when the user or profile is saved, so a
+    password or role change takes effect on the next request. That only
+    holds when every worker shares the cache; with a timeout of 0 (the
+    default for the per-process locmem cache) users are read from the
+    database each time. Either way this only runs when the session has no
+    current copy of the user (see get_session_user).
+    """
+
+    def _users(self, user_id):
+        # A missing profile is cached too, so hasattr(user, 'profile') never queries
+        return get_user_model()._default_manager.select_related('profile').filter(pk=user_id)
+
+    def get_user(self, user_id):
+        if not settings.AUTH_USER_CACHE_TIMEOUT:
+            user = self._users(user_id).first()
+            return user if user is not None and self.user_can_authenticate(user) else None
+        key = USER_CACHE_KEY.format(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = self._users(user_id).first()
+            if user is None:
+                return None
+            cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        if not settings.AUTH_USER_CACHE_TIMEOUT:
+            user = await self._users(user_id).afirst()
+            return user if user is not None and self.user_can_authenticate(user) else None
+        key = USER_CACHE_KEY.format(user_id)
+        user = await cache.aget(key)
+        if user is None:
+            user = await self._users(user_id).afirst()
+            if user is None:
+                return None
+            await cache.aset(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
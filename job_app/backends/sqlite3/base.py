@@ -0,0 +1,90 @@
+"""
+SQLite backend tuned for serving the portal from a single database file.
+
+Every new connection switches the database to WAL, so readers no longer
+block on writers, and applies the PRAGMAS below (overridable through
+``OPTIONS['pragmas']``). With ``OPTIONS['serialize_writes']`` the write
+transactions of a process queue on a lock before BEGIN, so a burst of
+applications waits its turn instead of failing with "database is locked".
+Use it together with ``transaction_mode = 'IMMEDIATE'``, which takes the
+write lock at BEGIN rather than on the first write.
+"""
+import threading
+
+from django.db import OperationalError
+from django.db.backends.sqlite3 import base
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    # Safe with WAL: a power loss can only lose the last transactions, never corrupt
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,  # KiB, i.e. 64 MB per connection
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 5000,  # ms
+    'temp_store': 'MEMORY',
+}
+
+_write_locks = {}
+_write_locks_guard = threading.Lock()
+
+
+def _write_lock(name):
+    with _write_locks_guard:
+        return _write_locks.setdefault(str(name), threading.Lock())
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pragmas = dict(PRAGMAS)
+        self.serialize_writes = False
+        self._holds_write_lock = False
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = {**PRAGMAS, **params.pop('pragmas', {})}
+        self.serialize_writes = params.pop('serialize_writes', False)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for pragma, value in self.pragmas.items():
+            if pragma == 'journal_mode' and self.is_in_memory_db():
+                continue
+            conn.execute(f'PRAGMA {pragma} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.serialize_writes and not self._holds_write_lock:
+            timeout = self.pragmas.get('busy_timeout', 5000) / 1000
+            if not _write_lock(self.settings_dict['NAME']).acquire(timeout=timeout):
+                raise OperationalError('database is locked (timed out waiting for the write queue)')
+            self._holds_write_lock = True
+        try:
+            super()._start_transaction_under_autocommit()
+        except BaseException:
+            self._release_write_lock()
+            raise
+
+    def _release_write_lock(self):
+        if self._holds_write_lock:
+            self._holds_write_lock = False
+            _write_lock(self.settings_dict['NAME']).release()
+
+    def _commit(self):
+        try:
+            return super()._commit()
+        finally:
+            self._release_write_lock()
+
+    def _rollback(self):
+        try:
+            return super()._rollback()
+        finally:
+            self._release_write_lock()
+
+    def _close(self):
+        try:
+            return super()._close()
+        finally:
+            self._release_write_lock()
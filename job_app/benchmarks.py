@@ -0,0 +1,334 @@
+"""
+Benchmark data generation and request scenarios for ``manage.py benchmark``.
+
+Scenarios drive the public views through the Django test client, so the
+numbers include middleware, templates and the page cache but not a web
+server. Each scenario reports throughput, latency percentiles and the
+median number of SQL queries per request.
+"""
+import json
+import random
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connections, transaction
+from django.db.models import Max
+from django.test import Client
+from django.urls import reverse
+
+from .models import Application, Company, Job, Location, Profile, Task
+
+SCALES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+
+# Based on add_sample_jobs.py / add_sample_applications.py
+TITLES = [
+    'Senior Software Engineer', 'Frontend Developer', 'Data Scientist', 'Product Manager',
+    'DevOps Engineer', 'UX/UI Designer', 'Marketing Specialist', 'Sales Representative',
+    'Customer Success Manager', 'Backend Developer', 'Python Developer', 'QA Engineer',
+    'Mobile Developer', 'Data Engineer', 'Technical Writer', 'Security Analyst',
+]
+SENIORITY = ['', 'Junior ', 'Senior ', 'Lead ', 'Principal ']
+COMPANIES = [
+    'TechCorp Solutions', 'Digital Innovations Inc', 'Analytics Pro', 'StartupXYZ',
+    'Cloud Systems Ltd', 'Creative Studios', 'Growth Marketing Co', 'Enterprise Sales Inc',
+    'SaaS Solutions',
+]
+LOCATIONS = [
+    'San Francisco, CA', 'New York, NY', 'Austin, TX', 'Seattle, WA', 'Remote',
+    'Los Angeles, CA', 'Chicago, IL', 'Boston, MA', 'Denver, CO', 'Dhaka, Bangladesh',
+]
+SKILLS = [
+    'Python', 'Django', 'JavaScript', 'React', 'Vue.js', 'SQL', 'PostgreSQL', 'AWS', 'Docker',
+    'Kubernetes', 'machine learning', 'data visualization', 'REST APIs', 'CSS', 'Figma',
+    'Salesforce', 'SEO', 'analytics', 'customer onboarding', 'CI/CD', 'Linux', 'Go', 'Java',
+]
+COVER_LETTERS = [
+    'I am excited to apply for this position and believe I would be a great fit for your team.',
+    'This role aligns perfectly with my career goals and technical expertise.',
+    'My experience in this field, combined with my enthusiasm for learning, makes me a strong candidate.',
+]
+
+BENCHMARK_PASSWORD = 'benchpass123'
+
+# Filters used by the job_listings scenario
+LISTING_FILTERS = [
+    {'title': 'python'},
+    {'location': 'Remote'},
+    {'company': 'Cloud'},
+    {'title': 'engineer', 'location': 'Austin'},
+    {},
+]
+
+
+def _description(rng):
+    skills = ', '.join(rng.sample(SKILLS, 4))
+    return (
+        f'We are looking for someone to join our growing team. You will work with {skills} '
+        f'and collaborate with cross-functional teams. Requirements: {rng.randint(1, 8)}+ years '
+        f'of relevant experience.'
+    )
+
+
+def _pick_job(rng, job_ids):
+    # A few popular jobs get a long tail of applications, like real traffic
+    if rng.random() < 0.3:
+        return job_ids[min(int(rng.paretovariate(1.2)) - 1, len(job_ids) - 1)]
+    return rng.choice(job_ids)
+
+
+def generate(scale, seed=42, batch_size=5000, log=print):
+    """
+    Creates ``scale`` jobs and applications plus one user per ten jobs
+    (a fifth of them employers). Users are prefixed ``bench_`` and share
+    BENCHMARK_PASSWORD.
+    """
+    rng = random.Random(seed)
+    user_count = max(scale // 10, 10)
+    employer_count = max(user_count // 5, 1)
+    password = make_password(BENCHMARK_PASSWORD)
+    start = User.objects.filter(username__startswith='bench_').count()
+
+    with transaction.atomic():
+        users = User.objects.bulk_create(
+            [
+                User(username=f'bench_{start + i}', email=f'bench_{start + i}@example.com', password=password)
+                for i in range(user_count)
+            ],
+            batch_size=batch_size,
+        )
+        Profile.objects.bulk_create(
+            [Profile(user=user, role='employee' if i < employer_count else 'applicant') for i, user in enumerate(users)],
+            batch_size=batch_size,
+        )
+    employers, applicants = users[:employer_count], users[employer_count:]
+    log(f'{len(users)} users created')
+
+    companies = Company.objects.intern_many(COMPANIES)
+    locations = Location.objects.intern_many(LOCATIONS)
+    # In list order, so a seed always picks the same names
+    company_ids = [companies[name] for name in COMPANIES]
+    location_ids = [locations[name] for name in LOCATIONS]
+    job_ids = []
+    for offset in range(0, scale, batch_size):
+        with transaction.atomic():
+            jobs = Job.objects.bulk_create([
+                Job(
+                    title=f'{rng.choice(SENIORITY)}{rng.choice(TITLES)}',
+                    company_id=rng.choice(company_ids),
+                    location_id=rng.choice(location_ids),
+                    description=_description(rng),
+                    posted_by=rng.choice(employers),
+                )
+                for _ in range(min(batch_size, scale - offset))
+            ])
+        job_ids.extend(job.id for job in jobs)
+        log(f'{len(job_ids)} jobs created')
+
+    created = 0
+    per_applicant = max(scale // len(applicants), 1)
+    batch = []
+    for applicant in applicants:
+        for job_id in {_pick_job(rng, job_ids) for _ in range(per_applicant)}:
+            batch.append(Application(
+                job_id=job_id, applicant=applicant, resume='', cover_letter=rng.choice(COVER_LETTERS),
+            ))
+        if len(batch) >= batch_size:
+            with transaction.atomic():
+                created += len(Application.objects.bulk_create(batch, ignore_conflicts=True))
+            batch = []
+            log(f'{created} applications created')
+    if batch:
+        with transaction.atomic():
+            created += len(Application.objects.bulk_create(batch, ignore_conflicts=True))
+    log(f'{created} applications created')
+    return {'users': len(users), 'jobs': len(job_ids), 'applications': created}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+class Scenario:
+    def __init__(self, name, request, login=False):
+        self.name = name
+        self.request = request
+        self.login = login
+
+
+class ScenarioContext:
+    """Ids and users the scenarios draw from, picked once per run."""
+
+    def __init__(self, seed=42):
+        self.rng = random.Random(seed)
+        self.job_ids = list(Job.objects.order_by('-id').values_list('id', flat=True)[:5000])
+        if not self.job_ids:
+            raise ValueError('No jobs found; run generate_benchmark_data first')
+        self.applicant = (
+            User.objects.filter(profile__role='applicant', application__isnull=False)
+            .order_by('id').first()
+        )
+        if self.applicant is None:
+            raise ValueError('No applicant with applications found; run generate_benchmark_data first')
+        applied = set(Application.objects.filter(applicant=self.applicant).values_list('job_id', flat=True))
+        self.unapplied = [job_id for job_id in self.job_ids if job_id not in applied]
+        self.iteration = 0
+        self.last_application = Application.objects.aggregate(last=Max('id'))['last'] or 0
+        self.last_task = Task.objects.aggregate(last=Max('id'))['last'] or 0
+
+    def clean_up(self):
+        """
+        Deletes the applications and queued tasks created since the context
+        was built; the application signals put the job counters back.
+        """
+        Application.objects.filter(id__gt=self.last_application).delete()
+        Task.objects.filter(id__gt=self.last_task).delete()
+
+    def next_job(self):
+        return self.rng.choice(self.job_ids)
+
+    def next_unapplied_job(self):
+        self.iteration += 1
+        return self.unapplied[self.iteration % len(self.unapplied)]
+
+    def next_filters(self):
+        return self.rng.choice(LISTING_FILTERS)
+
+
+def _apply(client, context):
+    resume = SimpleUploadedFile('resume.txt', b'Benchmark resume\n', content_type='text/plain')
+    return client.post(
+        reverse('apply_to_job', args=[context.next_unapplied_job()]),
+        {'cover_letter': COVER_LETTERS[0], 'resume': resume},
+    )
+
+
+SCENARIOS = [
+    Scenario('homepage', lambda client, context: client.get(reverse('home'))),
+    Scenario('homepage_search', lambda client, context: client.get(reverse('home'), {'title': 'developer'})),
+    Scenario('job_listings', lambda client, context: client.get(reverse('job_listings'), context.next_filters()),
+             login=True),
+    Scenario('job_detail', lambda client, context: client.get(reverse('job_detail', args=[context.next_job()]))),
+    Scenario('apply_to_job', _apply, login=True),
+    Scenario('my_applications', lambda client, context: client.get(reverse('my_applications')), login=True),
+]
+
+
+def run_scenario(scenario, client, context, requests, warmup):
+    for _ in range(warmup):
+        scenario.request(client, context)
+    latencies = []
+    queries = []
+    errors = 0
+    started = time.perf_counter()
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = scenario.request(client, context)
+        latencies.append((time.perf_counter() - start) * 1000)
+        queries.append(response.query_stats.count)
+        if response.status_code >= 400:
+            errors += 1
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': requests,
+        'errors': errors,
+        'rps': round(requests / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+        'queries': statistics.median(queries),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns regressions of ``results`` against ``baseline``: more queries
+    per request, or p95 latency / throughput worse by more than ``tolerance``.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current['queries'] > previous['queries']:
+            regressions.append(f'{name}: {current["queries"]} queries per request, baseline {previous["queries"]}')
+        if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append(f'{name}: p95 {current["p95_ms"]}ms, baseline {previous["p95_ms"]}ms')
+        if current['rps'] < previous['rps'] * (1 - tolerance):
+            regressions.append(f'{name}: {current["rps"]} req/s, baseline {previous["rps"]} req/s')
+    return regressions
+
+
+def load_baseline(path):
+    with open(path) as baseline:
+        return json.load(baseline)['results']
+
+
+def save_baseline(path, results, metadata):
+    with open(path, 'w') as baseline:
+        json.dump({'metadata': metadata, 'results': results}, baseline, indent=2, sort_keys=True)
+        baseline.write('\n')
+
+
+def run_session_benchmark(usernames, password, pages_per_login=3):
+    """
+    Each thread logs one user in through the login view, loads
+    ``pages_per_login`` pages and logs out, all with its own client.
+    Returns per-step latencies, errors and the session keys it created.
+    """
+    logins, pages, queries, session_keys = [], [], [], []
+    errors = []
+    lock = threading.Lock()
+
+    def session(username):
+        client = Client()
+        try:
+            start = time.perf_counter()
+            response = client.post(reverse('login'), {'username': username, 'password': password})
+            login_ms = (time.perf_counter() - start) * 1000
+            if response.status_code != 302:
+                raise AssertionError(f'login returned {response.status_code}')
+            page_ms, page_queries = [], []
+            for _ in range(pages_per_login):
+                start = time.perf_counter()
+                response = client.get(reverse('job_listings'))
+                page_ms.append((time.perf_counter() - start) * 1000)
+                page_queries.append(response.query_stats.count)
+            session_key = client.cookies[settings.SESSION_COOKIE_NAME].value
+            client.get(reverse('logout'))
+        except Exception as exc:
+            with lock:
+                errors.append(f'{type(exc).__name__}: {exc}')
+            return
+        finally:
+            connections.close_all()
+        with lock:
+            logins.append(login_ms)
+            pages.extend(page_ms)
+            queries.extend(page_queries)
+            session_keys.append(session_key)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=session, args=(username,)) for username in usernames]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    result = {'logins_per_s': round(len(logins) / elapsed, 1), 'errors': len(errors)}
+    if logins:
+        result.update({
+            'login_p50_ms': round(percentile(logins, 0.50), 2),
+            'login_p95_ms': round(percentile(logins, 0.95), 2),
+            'page_p50_ms': round(percentile(pages, 0.50), 2),
+            'page_p95_ms': round(percentile(pages, 0.95), 2),
+            'page_queries': statistics.median(queries),
+        })
+    return result, errors, session_keys
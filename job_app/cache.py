@@ -0,0 +1,129 @@
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from . import facets, versions
+from .search import normalize_search
+
+# Query parameters that do not make a request "filtered"
+PAGE_CACHE_ALLOWED_PARAMS = {'cursor'}
+
+
+def get_catalogue_version():
+    """
+    Version stamp of the job catalogue, part of every page and fragment key.
+    Bumping it on job changes invalidates all of them without deleting keys.
+    """
+    return versions.get_version(versions.CATALOGUE)
+
+
+async def aget_catalogue_version():
+    return await versions.aget_version(versions.CATALOGUE)
+
+
+def bump_catalogue_version():
+    versions.bump_version(versions.CATALOGUE)
+
+
+def search_cache_key(params, using='default'):
+    return hashlib.md5(repr(normalize_search(params, using)).encode()).hexdigest()
+
+
+async def acount_jobs(queryset, params):
+    """
+    Number of jobs matching the search ``params``, cached per catalogue
+    version and normalized search, so each distinct search is counted once
+    between job changes. The unfiltered total comes from the facet table.
+    """
+    key = f'jobs:count:{await aget_catalogue_version()}:{search_cache_key(params, queryset.db)}'
+    total = await cache.aget(key)
+    if total is None:
+        total = await (queryset.acount() if normalize_search(params, queryset.db) else facets.atotal_jobs())
+        await cache.aset(key, total, settings.FRAGMENT_CACHE_TIMEOUT)
+    return total
+
+
+async def ajob_facets(queryset, params):
+    """Top companies and locations for a search, cached like acount_jobs()."""
+    key = f'jobs:facets:{await aget_catalogue_version()}:{search_cache_key(params, queryset.db)}'
+    top = await cache.aget(key)
+    if top is None:
+        top = await facets.atop_facets(queryset, params)
+        await cache.aset(key, top, settings.FRAGMENT_CACHE_TIMEOUT)
+    return top
+
+
+def page_cache_key(request):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'page:{get_catalogue_version()}:{path}'
+
+
+def is_cacheable_request(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if not set(request.GET).issubset(PAGE_CACHE_ALLOWED_PARAMS):
+        return False
+    if request.user.is_authenticated:
+        return False
+    # Pending flash messages are rendered into the page
+    return not len(get_messages(request))
+
+
+def cache_anonymous_page(view_func):
+    """
+    Caches the full response of ``view_func`` for anonymous, unfiltered GET
+    requests. Keys include the catalogue version, so any job save or delete
+    invalidates every cached page at once. Works on sync and async views.
+    """
+    if iscoroutinefunction(view_func):
+        return _cache_anonymous_page_async(view_func)
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not is_cacheable_request(request):
+            return view_func(request, *args, **kwargs)
+
+        key = page_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+            response['X-Page-Cache'] = 'hit'
+            return response
+
+        response = view_func(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming and not response.cookies:
+            cache.set(key, (response.content, response['Content-Type']), settings.PAGE_CACHE_TIMEOUT)
+            response['X-Page-Cache'] = 'miss'
+        return response
+    return wrapper
+
+
+def _cache_anonymous_page_async(view_func):
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        # Load the user without blocking; the sync checks below then reuse it
+        request.user = await request.auser()
+        if not await sync_to_async(is_cacheable_request)(request):
+            return await view_func(request, *args, **kwargs)
+
+        key = await sync_to_async(page_cache_key)(request)
+        cached = await cache.aget(key)
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+            response['X-Page-Cache'] = 'hit'
+            return response
+
+        response = await view_func(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming and not response.cookies:
+            await cache.aset(key, (response.content, response['Content-Type']), settings.PAGE_CACHE_TIMEOUT)
+            response['X-Page-Cache'] = 'miss'
+        return response
+    return wrapper
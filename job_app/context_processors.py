@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+
+from .cache import get_catalogue_version
+
+
+def cache_versions(request):
+    return {
+        # Read from the database only by templates that cache fragments
+        'catalogue_version': SimpleLazyObject(get_catalogue_version),
+        'fragment_cache_timeout': settings.FRAGMENT_CACHE_TIMEOUT,
+    }
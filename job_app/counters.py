@@ -0,0 +1,44 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Application, Job
+
+
+def latest_application_subquery():
+    return Subquery(
+        Application.objects.filter(job=OuterRef('pk'))
+        .order_by('-applied_at')
+        .values('applied_at')[:1]
+    )
+
+
+def application_added(job_id, applied_at):
+    # Single UPDATE statement, so concurrent applications cannot lose increments
+    Job.objects.filter(pk=job_id).update(
+        applications_count=F('applications_count') + 1,
+        last_applied_at=Coalesce(Greatest('last_applied_at', Value(applied_at)), Value(applied_at)),
+    )
+
+
+def application_removed(job_id):
+    Job.objects.filter(pk=job_id).update(
+        applications_count=Greatest(F('applications_count') - 1, Value(0)),
+        last_applied_at=latest_application_subquery(),
+    )
+
+
+def refresh_application_counters(jobs=None):
+    """Recomputes the stored counters from the applications table."""
+    if jobs is None:
+        jobs = Job.objects.all()
+    total = Subquery(
+        Application.objects.filter(job=OuterRef('pk'))
+        .values('job')
+        .annotate(total=Count('id'))
+        .values('total'),
+        output_field=IntegerField(),
+    )
+    return jobs.update(
+        applications_count=Coalesce(total, Value(0)),
+        last_applied_at=latest_application_subquery(),
+    )
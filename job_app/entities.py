@@ -0,0 +1,124 @@
+"""
+Companies and locations, stored once and referenced from jobs by id.
+
+``Company.objects.intern(name)`` returns the id of the row with that name,
+creating it the first time the name is seen. Ids are remembered in a
+per-process LRU cache, so posting or importing jobs for known companies and
+locations costs no query beyond reading the entities version. Only ids of
+committed rows are cached, so a rolled back insert never leaves a dangling id
+behind. Renames and deletes bump the entities version (see job_app.signals),
+which empties the caches of every process the next time they are used.
+"""
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import models, transaction
+
+from . import gazetteer
+
+
+def normalize_name(name):
+    """Names differing only in surrounding or repeated whitespace are one entity."""
+    return ' '.join(name.split())
+
+
+class LRUCache:
+    """A thread-safe mapping that forgets its least recently used keys."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.data.get(key)
+            if value is not None:
+                self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            if len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+    def __len__(self):
+        return len(self.data)
+
+
+class NamedEntityManager(models.Manager):
+    # One (entities version, cache) pair per model, shared by every copy of the manager
+    caches = {}
+
+    @property
+    def ids(self):
+        """This model's cache, emptied if the entities version moved since it was filled."""
+        # Imported here: versions imports the models, which import this module
+        from .versions import ENTITIES, get_version
+        version = get_version(ENTITIES)
+        label = self.model._meta.label
+        cached_version, cache = self.caches.get(label, (None, None))
+        if cache is None or cached_version != version:
+            cache = LRUCache(settings.ENTITY_CACHE_SIZE)
+            self.caches[label] = (version, cache)
+        return cache
+
+    def intern(self, name):
+        """The id of the entity called ``name``, created if it does not exist yet."""
+        name = normalize_name(name)
+        cache = self.ids
+        pk = cache.get(name)
+        if pk is None:
+            pk = self.get_or_create(name=name, defaults=self.new_fields(name))[0].pk
+            # Runs at once outside a transaction, and never if it rolls back
+            transaction.on_commit(lambda: self.remember(cache, {name: pk}), using=self.db)
+        return pk
+
+    def intern_many(self, names):
+        """{name: id} for ``names``, with one query for all the ones not cached."""
+        cache = self.ids
+        ids = {}
+        missing = set()
+        for name in names:
+            pk = cache.get(normalize_name(name))
+            if pk is None:
+                missing.add(normalize_name(name))
+            else:
+                ids[name] = pk
+        if missing:
+            self.bulk_create(
+                [self.model(name=name, **self.new_fields(name)) for name in missing],
+                ignore_conflicts=True, batch_size=500,
+            )
+            found = dict(self.filter(name__in=missing).values_list('name', 'pk'))
+            for name in names:
+                if name not in ids:
+                    ids[name] = found[normalize_name(name)]
+            transaction.on_commit(lambda: self.remember(cache, found), using=self.db)
+        return ids
+
+    def new_fields(self, name):
+        """Values other than the name to store when ``name`` is first seen."""
+        return {}
+
+    def remember(self, cache, ids):
+        # ``cache`` is the one the ids were looked up in; if the version moved
+        # since, it has been replaced and the ids are dropped with it
+        for name, pk in ids.items():
+            cache.set(name, pk)
+
+    def forget(self):
+        self.caches.pop(self.model._meta.label, None)
+
+
+class LocationManager(NamedEntityManager):
+    def new_fields(self, name):
+        # New locations are geocoded offline as they are first seen
+        return gazetteer.locate(name)
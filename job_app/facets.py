@@ -0,0 +1,92 @@
+"""
+Materialized job counts per company and per location (``job_count`` on
+Company and Location).
+
+Job saves and deletes adjust the stored counts through signals (see
+job_app.signals); bulk inserts that skip signals call jobs_added(), and
+refresh_job_facets() recomputes them from scratch. Search pages and the
+admin filters read their values and counts from here instead of grouping
+the jobs table.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Company, Job, Location
+from .search import normalize_search
+
+# Job foreign keys whose targets carry a job count
+FACET_MODELS = {'company': Company, 'location': Location}
+FACET_FIELDS = tuple(FACET_MODELS)
+# Values listed per field on search pages
+FACET_LIMIT = 10
+
+
+def facet_values(job):
+    return {field: getattr(job, f'{field}_id') for field in FACET_FIELDS}
+
+
+def adjust_facets(deltas):
+    """Applies a {(field, id): change} mapping to the stored counts."""
+    for (field, pk), delta in deltas.items():
+        if not delta:
+            continue
+        # Single UPDATE statement, so concurrent saves cannot lose changes
+        FACET_MODELS[field].objects.filter(pk=pk).update(job_count=Greatest(F('job_count') + delta, Value(0)))
+
+
+def job_saved(job, previous=None):
+    """``previous`` holds the job's facet ids before the save, if it existed."""
+    deltas = Counter()
+    for field, value in facet_values(job).items():
+        if previous is None or previous[field] != value:
+            deltas[field, value] += 1
+            if previous is not None:
+                deltas[field, previous[field]] -= 1
+    adjust_facets(deltas)
+
+
+def job_removed(job):
+    adjust_facets(Counter({(field, value): -1 for field, value in facet_values(job).items()}))
+
+
+def jobs_added(jobs):
+    adjust_facets(Counter((field, value) for job in jobs for field, value in facet_values(job).items()))
+
+
+def refresh_job_facets():
+    """Recomputes the stored counts from the jobs table."""
+    with transaction.atomic():
+        for field, model in FACET_MODELS.items():
+            counts = Job.objects.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(total=Count('id'))
+            model.objects.update(job_count=Coalesce(Subquery(counts.values('total')), 0))
+    return sum(model.objects.filter(job_count__gt=0).count() for model in FACET_MODELS.values())
+
+
+async def atotal_jobs():
+    # Every job has exactly one company; the filter lets company_top_idx
+    # answer it without reading the table
+    totals = await Company.objects.filter(job_count__gt=0).aaggregate(total=Sum('job_count'))
+    return totals['total'] or 0
+
+
+async def atop_facets(queryset, params, limit=FACET_LIMIT):
+    """
+    The ``limit`` most common companies and locations as (name, count)
+    lists. Unfiltered lists come from the stored counts; searches group
+    their matching jobs by company or location id.
+    """
+    searched = bool(normalize_search(params, queryset.db))
+    facets = {}
+    for field, model in FACET_MODELS.items():
+        if searched:
+            rows = (
+                queryset.order_by().values(field).annotate(total=Count('id'))
+                .order_by('-total', f'{field}__name').values_list(f'{field}__name', 'total')
+            )
+        else:
+            rows = model.objects.filter(job_count__gt=0).order_by('-job_count', 'name').values_list('name', 'job_count')
+        facets[field] = [tuple(row) async for row in rows[:limit]]
+    return facets
@@ -0,0 +1,94 @@
+"""
+Offline geocoding of location names against data/gazetteer.csv.
+
+Each gazetteer row is a place with its coordinates, region (state or
+province) and country, and optional ``|``-separated aliases. A row is found
+by its name or an alias, alone or followed by its region or country as a
+code or in full: "Austin", "Austin, TX", "Austin, Texas" and "Austin, TX,
+United States" all resolve to the same point. When a name alone matches
+several places, the earlier row wins. Remote locations ("Remote",
+"Anywhere", "Work from home") have no coordinates and are flagged instead.
+"""
+import csv
+import re
+import unicodedata
+from functools import lru_cache
+from pathlib import Path
+
+GAZETTEER_PATH = Path(__file__).resolve().parent / 'data' / 'gazetteer.csv'
+
+REMOTE_RE = re.compile(r'\b(remote|anywhere|work from home|wfh|telecommute)\b')
+_PUNCTUATION_RE = re.compile(r"[^\w\s,]")
+# Other spellings of the country codes used in the gazetteer
+COUNTRY_SYNONYMS = {
+    'usa': 'us', 'u s': 'us', 'u s a': 'us', 'united states of america': 'us',
+    'uk': 'gb', 'u k': 'gb', 'great britain': 'gb', 'england': 'gb', 'scotland': 'gb',
+}
+
+
+def normalize_place(text):
+    """Lowercased, accent-free comma-separated parts: 'St. Louis,  MO' -> ('st louis', 'mo')."""
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode()
+    text = _PUNCTUATION_RE.sub(' ', text.lower())
+    return tuple(part for part in (' '.join(part.split()) for part in text.split(',')) if part)
+
+
+@lru_cache(maxsize=None)
+def load_gazetteer(path=GAZETTEER_PATH):
+    """Maps every lookup key of every row to its (latitude, longitude)."""
+    places = {}
+    with open(path, encoding='utf-8', newline='') as stream:
+        for row in csv.DictReader(stream):
+            point = (float(row['latitude']), float(row['longitude']))
+            names = [row['name'], *filter(None, row['aliases'].split('|'))]
+            qualifiers = [
+                (row['region'], row['country']), (row['region'], row['country_name']),
+                (row['region_name'], row['country']), (row['region_name'], row['country_name']),
+                (row['region'],), (row['region_name'],), (row['country'],), (row['country_name'],), (),
+            ]
+            for name in names:
+                for qualifier in qualifiers:
+                    key = normalize_place(', '.join([name, *qualifier]))
+                    # A bare name keeps the first place listed under it
+                    places.setdefault(key, point)
+    return places
+
+
+def is_remote(text):
+    return bool(REMOTE_RE.search(' '.join(normalize_place(text))))
+
+
+def geocode(text):
+    """(latitude, longitude) of the place ``text`` names, or None if it is not in the gazetteer."""
+    parts = normalize_place(text)
+    if not parts:
+        return None
+    parts = (parts[0], *(COUNTRY_SYNONYMS.get(part, part) for part in parts[1:]))
+    places = load_gazetteer()
+    # "Austin, TX, 78701" still finds "Austin, TX"; a qualifier that was
+    # given is never dropped entirely, so "Cambridge, UK" cannot become
+    # Cambridge, MA
+    for end in range(len(parts), min(len(parts), 2) - 1, -1):
+        if parts[:end] in places:
+            return places[parts[:end]]
+    if len(parts) == 1:
+        # No comma: "austin tx" is tried as "austin, tx"
+        words = parts[0].split()
+        for split in range(len(words) - 1, 0, -1):
+            qualifier = ' '.join(words[split:])
+            key = (' '.join(words[:split]), COUNTRY_SYNONYMS.get(qualifier, qualifier))
+            if key in places:
+                return places[key]
+    return None
+
+
+def locate(name):
+    """The coordinate and remote fields to store on a Location called ``name``."""
+    if is_remote(name):
+        return {'latitude': None, 'longitude': None, 'is_remote': True}
+    point = geocode(name)
+    return {
+        'latitude': point[0] if point else None,
+        'longitude': point[1] if point else None,
+        'is_remote': False,
+    }
@@ -0,0 +1,210 @@
+"""
+Radius search over job locations.
+
+Locations carry coordinates from the gazetteer (job_app.gazetteer). On
+SQLite an R*Tree (job_app_location_rtree), kept in sync by triggers on
+job_app_location, indexes them: a search for jobs within ``radius`` km of
+``near`` reads the locations inside the bounding box from the R*Tree,
+keeps those within the great-circle distance and matches jobs on their
+location id, so its cost depends on the jobs found rather than the size of
+the catalogue. Other databases use a bounding box on the coordinate
+columns instead. Remote jobs have no coordinates; ``remote`` adds them to
+the results.
+"""
+import math
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+from .gazetteer import geocode, normalize_place
+from .models import Location
+
+RTREE_TABLE = 'job_app_location_rtree'
+
+# Search form parameters handled here
+GEO_PARAMS = ('near', 'radius', 'remote')
+RADIUS_CHOICES = (10, 25, 50, 100, 250)
+DEFAULT_RADIUS_KM = 50
+# Wider circles match a large share of the catalogue, and counting and
+# faceting those costs as much as an unfiltered listing without its stored counts
+MAX_RADIUS_KM = RADIUS_CHOICES[-1]
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+RTREE_TABLE_SQL = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {RTREE_TABLE} USING rtree(
+        id, min_lat, max_lat, min_lon, max_lon
+    )
+"""
+
+_POINT_SQL = "SELECT {row}.id, {row}.latitude, {row}.latitude, {row}.longitude, {row}.longitude"
+
+RTREE_TRIGGERS_SQL = {
+    f'{RTREE_TABLE}_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS {RTREE_TABLE}_ai AFTER INSERT ON job_app_location
+        WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL BEGIN
+            INSERT INTO {RTREE_TABLE} {_POINT_SQL.format(row='new')};
+        END
+    """,
+    f'{RTREE_TABLE}_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS {RTREE_TABLE}_ad AFTER DELETE ON job_app_location BEGIN
+            DELETE FROM {RTREE_TABLE} WHERE id = old.id;
+        END
+    """,
+    f'{RTREE_TABLE}_au': f"""
+        CREATE TRIGGER IF NOT EXISTS {RTREE_TABLE}_au AFTER UPDATE OF latitude, longitude ON job_app_location BEGIN
+            DELETE FROM {RTREE_TABLE} WHERE id = old.id;
+            INSERT INTO {RTREE_TABLE} {_POINT_SQL.format(row='new')}
+            WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+        END
+    """,
+}
+
+
+def install(using='default'):
+    """
+    Creates the R*Tree and its triggers if they are missing, like
+    SQLiteFTSSearchBackend.install(), and refills it when anything had to
+    be recreated. Before migration 0013 locations have no coordinates to
+    index, so nothing is done.
+    """
+    conn = connections[using]
+    if conn.vendor != 'sqlite':
+        return
+    if Location._meta.db_table not in conn.introspection.table_names():
+        return
+    with conn.cursor() as cursor:
+        columns = {column.name for column in conn.introspection.get_table_description(cursor, Location._meta.db_table)}
+        if not {'latitude', 'longitude'} <= columns:
+            return
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name LIKE %s",
+            (f'{RTREE_TABLE}%',),
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        if all(name in existing for name in [RTREE_TABLE, *RTREE_TRIGGERS_SQL]):
+            return
+        cursor.execute(RTREE_TABLE_SQL)
+        for statement in RTREE_TRIGGERS_SQL.values():
+            cursor.execute(statement)
+    rebuild(using)
+
+
+def rebuild(using='default'):
+    conn = connections[using]
+    if conn.vendor != 'sqlite':
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {RTREE_TABLE}')
+        cursor.execute(
+            f"INSERT INTO {RTREE_TABLE} {_POINT_SQL.format(row='location')} FROM job_app_location location "
+            "WHERE location.latitude IS NOT NULL AND location.longitude IS NOT NULL"
+        )
+
+
+def get_radius(params):
+    try:
+        radius = float(params.get('radius') or DEFAULT_RADIUS_KM)
+    except ValueError:
+        return DEFAULT_RADIUS_KM
+    if not math.isfinite(radius):
+        return DEFAULT_RADIUS_KM
+    return min(max(radius, 1), MAX_RADIUS_KM)
+
+
+def bounding_boxes(latitude, longitude, radius_km):
+    """
+    (min_lat, max_lat, min_lon, max_lon) boxes covering every point within
+    ``radius_km``; two of them when the circle crosses the antimeridian.
+    """
+    delta_lat = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = max(latitude - delta_lat, -90), min(latitude + delta_lat, 90)
+    if min_lat == -90 or max_lat == 90:
+        # The circle covers a pole, and with it every longitude
+        return [(min_lat, max_lat, -180, 180)]
+    # Longitude degrees shrink towards the poles; use the widest latitude
+    widest = max(abs(min_lat), abs(max_lat))
+    delta_lon = radius_km / (KM_PER_DEGREE * math.cos(math.radians(widest)))
+    if delta_lon >= 180:
+        return [(min_lat, max_lat, -180, 180)]
+    min_lon, max_lon = longitude - delta_lon, longitude + delta_lon
+    if min_lon < -180:
+        return [(min_lat, max_lat, min_lon + 360, 180), (min_lat, max_lat, -180, max_lon)]
+    if max_lon > 180:
+        return [(min_lat, max_lat, min_lon, 180), (min_lat, max_lat, -180, max_lon - 360)]
+    return [(min_lat, max_lat, min_lon, max_lon)]
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle (haversine) distance between two points."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1, math.sqrt(a)))
+
+
+def _distance_expression(latitude, longitude, lat_field, lon_field):
+    # distance_km() as a database expression, for the non-SQLite fallback
+    half_lat = Radians(lat_field - latitude) / 2
+    half_lon = Radians(lon_field - longitude) / 2
+    a = (Power(Sin(half_lat), 2)
+         + math.cos(math.radians(latitude)) * Cos(Radians(lat_field)) * Power(Sin(half_lon), 2))
+    return 2 * EARTH_RADIUS_KM * ASin(Sqrt(a))
+
+
+def locations_within(latitude, longitude, radius_km, using='default'):
+    """A lazy subquery of the ids of the locations within ``radius_km`` of the point."""
+    boxes = bounding_boxes(latitude, longitude, radius_km)
+    if connections[using].vendor == 'sqlite':
+        # The R*Tree finds the box; the haversine check drops its corners.
+        # SIN, COS and friends are registered by Django's SQLite backend.
+        where = ' OR '.join(
+            '(max_lat >= %s AND min_lat <= %s AND max_lon >= %s AND min_lon <= %s)' for _box in boxes
+        )
+        params = [value for min_lat, max_lat, min_lon, max_lon in boxes
+                  for value in (min_lat, max_lat, min_lon, max_lon)]
+        distance = (
+            '2 * %s * ASIN(MIN(1, SQRT(POWER(SIN(RADIANS(min_lat - %s) / 2), 2)'
+            ' + %s * COS(RADIANS(min_lat)) * POWER(SIN(RADIANS(min_lon - %s) / 2), 2))))'
+        )
+        params += [EARTH_RADIUS_KM, latitude, math.cos(math.radians(latitude)), longitude, radius_km]
+        return RawSQL(f'SELECT id FROM {RTREE_TABLE} WHERE ({where}) AND {distance} <= %s', params)
+    in_box = Q()
+    for min_lat, max_lat, min_lon, max_lon in boxes:
+        in_box |= Q(latitude__range=(min_lat, max_lat), longitude__range=(min_lon, max_lon))
+    return (
+        Location.objects.using(using).filter(in_box)
+        .alias(distance=_distance_expression(latitude, longitude, 'latitude', 'longitude'))
+        .filter(distance__lte=radius_km).values('pk')
+    )
+
+
+def filter_near(queryset, params):
+    """
+    Narrows a Job queryset to the ``radius`` km around the place ``near``
+    names, plus remote jobs when ``remote`` is set. A place missing from the
+    gazetteer matches nothing.
+    """
+    near = (params.get('near') or '').strip()
+    if not near:
+        return queryset
+    point = geocode(near)
+    if point is None:
+        return queryset.none()
+    match = Q(location__in=locations_within(*point, get_radius(params), using=queryset.db))
+    if params.get('remote'):
+        match |= Q(location__in=Location.objects.filter(is_remote=True).values('pk'))
+    return queryset.filter(match)
+
+
+def normalize(params):
+    """Canonical form of the radius search in ``params``, see BaseSearchBackend.normalize()."""
+    near = (params.get('near') or '').strip()
+    if not near:
+        return ()
+    point = geocode(near)
+    # Spellings of the same place share an entry; unknown places match nothing anyway
+    place = f'{point[0]:.4f},{point[1]:.4f}' if point else ' '.join(normalize_place(near))
+    return (('near', place), ('radius', get_radius(params)), ('remote', bool(params.get('remote'))))
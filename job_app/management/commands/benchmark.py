@@ -0,0 +1,82 @@
+import platform
+import tempfile
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from job_app.benchmarks import SCENARIOS, ScenarioContext, compare, load_baseline, run_scenario, save_baseline
+from job_app.models import Application, Job
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the public job portal views and compares them against a stored baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Measured requests per scenario')
+        parser.add_argument('--warmup', type=int, default=10, help='Unmeasured requests per scenario')
+        parser.add_argument('--scenario', action='append', choices=[s.name for s in SCENARIOS],
+                            help='Scenario to run (repeatable, default: all)')
+        parser.add_argument('--baseline', help='Baseline JSON file to compare against')
+        parser.add_argument('--save-baseline', help='Write the results to this baseline JSON file')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed relative slowdown before a result counts as a regression')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        scenarios = [s for s in SCENARIOS if not options['scenario'] or s.name in options['scenario']]
+        try:
+            context = ScenarioContext(seed=options['seed'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        cache.clear()
+        results = {}
+        # Requests commit as they do in production (on_commit hooks and the
+        # write lock included). What the scenarios create is deleted afterwards
+        # and uploaded resumes go to a throwaway MEDIA_ROOT
+        try:
+            with tempfile.TemporaryDirectory() as media_root, \
+                    override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], MEDIA_ROOT=media_root):
+                for scenario in scenarios:
+                    client = Client()
+                    if scenario.login:
+                        client.force_login(context.applicant)
+                    try:
+                        results[scenario.name] = run_scenario(
+                            scenario, client, context, options['requests'], options['warmup']
+                        )
+                    finally:
+                        client.logout()
+                    self.print_result(scenario.name, results[scenario.name])
+        finally:
+            context.clean_up()
+
+        if options['save_baseline']:
+            save_baseline(options['save_baseline'], results, {
+                'date': timezone.now().isoformat(),
+                'jobs': Job.objects.count(),
+                'applications': Application.objects.count(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+            })
+            self.stdout.write(f'Baseline written to {options["save_baseline"]}.')
+
+        if options['baseline']:
+            regressions = compare(results, load_baseline(options['baseline']), options['tolerance'])
+            if regressions:
+                raise CommandError('Regressions against baseline:\n  ' + '\n  '.join(regressions))
+            self.stdout.write(self.style.SUCCESS('No regressions against baseline.'))
+
+    def print_result(self, name, result):
+        self.stdout.write(
+            f'{name:<16} {result["rps"]:>8.1f} req/s  p50 {result["p50_ms"]:>7.2f}ms  '
+            f'p95 {result["p95_ms"]:>7.2f}ms  p99 {result["p99_ms"]:>7.2f}ms  '
+            f'{result["queries"]:>4} queries'
+            + (f'  {result["errors"]} errors' if result['errors'] else '')
+        )
@@ -0,0 +1,69 @@
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from job_app.benchmarks import run_session_benchmark
+from job_app.models import Profile
+
+PASSWORD = 'session-bench'
+
+
+class Command(BaseCommand):
+    help = 'Compares session engines under concurrent logins through the login view'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--engines', nargs='+', choices=list(settings.SESSION_BACKENDS),
+                            default=list(settings.SESSION_BACKENDS), help='Session engines to compare')
+        parser.add_argument('--concurrency', type=int, default=16, help='Simultaneous logins per round')
+        parser.add_argument('--rounds', type=int, default=5)
+        parser.add_argument('--pages', type=int, default=3, help='Pages loaded after each login')
+
+    def handle(self, *args, **options):
+        # A cheap hasher keeps password checks from drowning out session costs
+        hashers = ['django.contrib.auth.hashers.MD5PasswordHasher', *settings.PASSWORD_HASHERS]
+        with override_settings(PASSWORD_HASHERS=hashers, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            users = self.create_users(options['concurrency'])
+            try:
+                for engine in options['engines']:
+                    self.benchmark(engine, users, options)
+            finally:
+                User.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+    def create_users(self, count):
+        password = make_password(PASSWORD, hasher='md5')
+        users = User.objects.bulk_create([
+            User(username=f'session_bench_{i}', password=password) for i in range(count)
+        ])
+        Profile.objects.bulk_create([Profile(user=user, role='applicant') for user in users])
+        return users
+
+    def benchmark(self, engine, users, options):
+        errors = []
+        with override_settings(SESSION_ENGINE=settings.SESSION_BACKENDS[engine]):
+            cache.clear()
+            results = []
+            for _ in range(options['rounds']):
+                result, round_errors, session_keys = run_session_benchmark(
+                    [user.username for user in users], PASSWORD, options['pages']
+                )
+                results.append(result)
+                errors.extend(round_errors)
+                Session.objects.filter(session_key__in=session_keys).delete()
+
+        def median(key):
+            values = sorted(r[key] for r in results if key in r)
+            return values[len(values) // 2] if values else float('nan')
+
+        self.stdout.write(
+            f'{engine:<15} {median("logins_per_s"):>7.1f} logins/s  '
+            f'login p50 {median("login_p50_ms"):>7.2f}ms p95 {median("login_p95_ms"):>7.2f}ms  '
+            f'page p50 {median("page_p50_ms"):>6.2f}ms p95 {median("page_p95_ms"):>6.2f}ms  '
+            f'{median("page_queries")} queries/page  {len(errors)} errors'
+        )
+        for error in sorted(set(errors))[:3]:
+            self.stdout.write(f'    {error}')
@@ -0,0 +1,35 @@
+import shutil
+import subprocess
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+APP_DIR = Path(__file__).resolve().parents[2]
+SOURCE = APP_DIR / 'assets' / 'site.css'
+OUTPUT = APP_DIR / 'static' / 'job_app' / 'css' / 'site.css'
+
+
+class Command(BaseCommand):
+    help = 'Compiles job_app/assets/site.css into job_app/static/job_app/css/site.css with the Tailwind CLI'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--watch', action='store_true',
+                            help='Rebuild whenever a template or the source file changes')
+
+    def handle(self, *args, **options):
+        # The standalone Tailwind CLI (v4); `pip install tailwindcss-bin` puts it on PATH.
+        # Only needed to rebuild the stylesheet, the compiled file is checked in.
+        binary = shutil.which('tailwindcss')
+        if binary is None:
+            raise CommandError('The Tailwind CLI was not found; install it with `pip install tailwindcss-bin`.')
+        command = [binary, '--input', str(SOURCE), '--output', str(OUTPUT), '--minify']
+        if options['watch']:
+            command.append('--watch')
+        try:
+            # @source paths in the source file are relative to its directory
+            subprocess.run(command, cwd=SOURCE.parent, check=True)
+        except subprocess.CalledProcessError as e:
+            raise CommandError(f'tailwindcss exited with status {e.returncode}')
+        except KeyboardInterrupt:
+            return
+        self.stdout.write(self.style.SUCCESS(f'Wrote {OUTPUT.relative_to(APP_DIR.parent)} ({OUTPUT.stat().st_size} bytes).'))
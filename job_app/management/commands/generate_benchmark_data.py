@@ -0,0 +1,35 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from job_app.benchmarks import BENCHMARK_PASSWORD, SCALES, generate
+from job_app.cache import bump_catalogue_version
+
+
+class Command(BaseCommand):
+    help = 'Fills the database with generated jobs, users and applications for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', choices=sorted(SCALES), default='10k',
+                            help='Number of jobs and applications to create')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--with-similar', action='store_true',
+                            help='Also build the similar-jobs index (slow for large sizes)')
+
+    def handle(self, *args, **options):
+        counts = generate(
+            SCALES[options['size']],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            log=self.stdout.write,
+        )
+        # bulk_create skips the signals that maintain these
+        call_command('rebuild_application_counters', stdout=self.stdout)
+        call_command('rebuild_job_facets', stdout=self.stdout)
+        if options['with_similar']:
+            call_command('rebuild_similar_jobs', stdout=self.stdout)
+        bump_catalogue_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {counts["users"]} users, {counts["jobs"]} jobs and {counts["applications"]} applications. '
+            f'Benchmark users are named bench_<n> with password "{BENCHMARK_PASSWORD}".'
+        ))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from job_app.cache import bump_catalogue_version
+from job_app.gazetteer import locate
+from job_app.models import Location
+
+
+class Command(BaseCommand):
+    help = 'Fills in location coordinates from the bundled gazetteer and lists the places it does not know'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Re-geocode every location, replacing coordinates set by hand')
+        parser.add_argument('--limit', type=int, default=20,
+                            help='How many unknown locations to list, busiest first')
+
+    def handle(self, *args, **options):
+        locations = Location.objects.order_by('-job_count', 'name')
+        if not options['all']:
+            locations = locations.filter(latitude__isnull=True, is_remote=False)
+        located, unknown = [], []
+        for location in locations.iterator():
+            fields = locate(location.name)
+            if fields['latitude'] is None and not fields['is_remote']:
+                unknown.append(location)
+                if not options['all']:
+                    continue
+            for field, value in fields.items():
+                setattr(location, field, value)
+            located.append(location)
+        # The R*Tree follows the coordinate columns through its triggers
+        Location.objects.bulk_update(located, ['latitude', 'longitude', 'is_remote'], batch_size=1000)
+        # Cached radius search counts may have changed
+        bump_catalogue_version()
+        found = len(located) - (len(unknown) if options['all'] else 0)
+        self.stdout.write(self.style.SUCCESS(f'Geocoded {found} locations.'))
+        if unknown:
+            self.stdout.write(f'{len(unknown)} locations are not in the gazetteer:')
+            for location in unknown[:options['limit']]:
+                self.stdout.write(f'  {location.name} ({location.job_count} jobs)')
@@ -0,0 +1,134 @@
+import csv
+import json
+import sys
+import time
+from hashlib import blake2b
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from job_app import facets, tasks
+from job_app.cache import bump_catalogue_version
+from job_app.models import Company, Job, Location
+
+JOB_FIELDS = ('title', 'company_name', 'location', 'description')
+
+
+def dedupe_key(title, company_name):
+    # 16-byte digests keep the seen-set small for feeds with millions of rows
+    normalized = f'{title.strip().lower()}\x00{company_name.strip().lower()}'
+    return blake2b(normalized.encode(), digest_size=16).digest()
+
+
+def read_csv(stream):
+    yield from csv.DictReader(stream)
+
+
+def read_jsonl(stream):
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as exc:
+            raise CommandError(f'Line {line_number}: invalid JSON ({exc})')
+
+
+class Command(BaseCommand):
+    help = 'Imports jobs from a CSV or JSON Lines feed, skipping jobs that already exist'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSONL file, or - for standard input')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='Input format (default: guessed from the file extension)')
+        parser.add_argument('--posted-by', required=True,
+                            help='Username of the employer the jobs are posted by')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of jobs inserted per transaction')
+        parser.add_argument('--skip-similar', action='store_true',
+                            help='Do not queue similar-jobs indexing for the imported jobs')
+
+    def handle(self, *args, **options):
+        try:
+            posted_by = User.objects.get(username=options['posted_by'])
+        except User.DoesNotExist:
+            raise CommandError(f'User "{options["posted_by"]}" does not exist')
+
+        path = options['path']
+        input_format = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        reader = read_jsonl if input_format == 'jsonl' else read_csv
+
+        # Rows are deduplicated against the catalogue and within the feed itself
+        seen = {
+            dedupe_key(title, company_name)
+            for title, company_name in Job.objects.values_list('title', 'company__name').iterator(chunk_size=5000)
+        }
+
+        stream = sys.stdin if path == '-' else open(path, encoding='utf-8-sig', newline='')
+        started = time.perf_counter()
+        read = created = skipped = 0
+        try:
+            batch = []
+            for row in reader(stream):
+                read += 1
+                values = self.clean_row(row)
+                if values is None:
+                    skipped += 1
+                    continue
+                key = dedupe_key(values['title'], values['company_name'])
+                if key in seen:
+                    skipped += 1
+                    continue
+                seen.add(key)
+                batch.append(values)
+                if len(batch) >= options['batch_size']:
+                    created += self.insert(batch, posted_by, options['skip_similar'])
+                    batch = []
+                    self.report(read, created, skipped, started)
+            if batch:
+                created += self.insert(batch, posted_by, options['skip_similar'])
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        if created:
+            # bulk_create does not send post_save, so cached pages are invalidated here
+            bump_catalogue_version()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {created} job(s), skipped {skipped} of {read} row(s) '
+            f'in {elapsed:.1f}s ({read / elapsed if elapsed else 0:.0f} rows/s).'
+        ))
+
+    def clean_row(self, row):
+        values = {field: str(row.get(field) or '').strip() for field in JOB_FIELDS}
+        if not values['title'] or not values['company_name']:
+            return None
+        return values
+
+    def insert(self, batch, posted_by, skip_similar):
+        with transaction.atomic():
+            # Names already seen by this process cost no query
+            company_ids = Company.objects.intern_many({values['company_name'] for values in batch})
+            location_ids = Location.objects.intern_many({values['location'] for values in batch})
+            jobs = Job.objects.bulk_create([
+                Job(
+                    title=values['title'], description=values['description'], posted_by=posted_by,
+                    company_id=company_ids[values['company_name']], location_id=location_ids[values['location']],
+                )
+                for values in batch
+            ])
+            # bulk_create sends no signals, so the facet counts are added here
+            facets.jobs_added(jobs)
+            if not skip_similar:
+                tasks.refresh_similar_jobs_batch.enqueue([job.id for job in jobs])
+        return len(jobs)
+
+    def report(self, read, created, skipped, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{read} rows read, {created} imported, {skipped} skipped '
+            f'({read / elapsed if elapsed else 0:.0f} rows/s)'
+        )
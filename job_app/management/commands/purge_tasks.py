@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from job_app.queue import purge_tasks
+
+
+class Command(BaseCommand):
+    help = 'Deletes finished and failed background tasks in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.TASK_RETENTION_DAYS,
+                            help='Keep tasks that finished within this many days')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of tasks deleted per transaction')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        deleted = purge_tasks(cutoff, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} finished task(s).'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from job_app.counters import refresh_application_counters
+from job_app.models import Job
+
+
+class Command(BaseCommand):
+    help = 'Recomputes Job.applications_count and Job.last_applied_at from the applications table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of jobs updated per transaction')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        updated = 0
+        while True:
+            ids = list(
+                Job.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                updated += refresh_application_counters(Job.objects.filter(id__gte=ids[0], id__lte=ids[-1]))
+            last_id = ids[-1]
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt application counters for {updated} job(s).'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from job_app.cache import bump_catalogue_version
+from job_app.facets import refresh_job_facets
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the job counts of companies and locations from the jobs table'
+
+    def handle(self, *args, **options):
+        facets = refresh_job_facets()
+        # Cached counts and facet lists were computed from the old table
+        bump_catalogue_version()
+        self.stdout.write(self.style.SUCCESS(f'Recounted the jobs of {facets} companies and locations.'))
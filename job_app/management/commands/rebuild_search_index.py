@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from job_app.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the job full-text search index from the job table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        backend.install(options['database'])
+        backend.rebuild(options['database'])
+        self.stdout.write(self.style.SUCCESS('Job search index rebuilt.'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from job_app.models import Job, JobSignature, JobSignatureBucket, SimilarJob
+from job_app.similarity import refresh_similar_jobs
+
+
+class Command(BaseCommand):
+    help = 'Recomputes job signatures and the precomputed similar-jobs table'
+
+    def handle(self, *args, **options):
+        SimilarJob.objects.all().delete()
+        JobSignatureBucket.objects.all().delete()
+        JobSignature.objects.all().delete()
+        total = 0
+        for job in Job.objects.order_by('id').iterator(chunk_size=500):
+            refresh_similar_jobs(job)
+            total += 1
+            if total % 1000 == 0:
+                self.stdout.write(f'{total} jobs indexed...')
+        self.stdout.write(self.style.SUCCESS(f'Similar jobs rebuilt for {total} job(s).'))
@@ -0,0 +1,67 @@
+import os
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from job_app.queue import Worker
+
+
+class Command(BaseCommand):
+    help = 'Runs background task workers for the database task queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4,
+                            help='Tasks run at once by each worker process')
+        parser.add_argument('--processes', type=int, default=1,
+                            help='Number of worker processes to fork')
+        parser.add_argument('--visibility-timeout', type=int, default=None,
+                            help='Seconds before a claimed but unfinished task is retried elsewhere')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait when the queue is empty')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        def make_worker():
+            return Worker(
+                concurrency=options['concurrency'],
+                visibility_timeout=options['visibility_timeout'],
+                poll_interval=options['poll_interval'],
+                burst=options['burst'],
+            )
+
+        processes = options['processes']
+        if processes <= 1:
+            self.stdout.write(f'Worker started (pid {os.getpid()}, concurrency {options["concurrency"]}).')
+            make_worker().run()
+            return
+
+        # Children must open their own database connections
+        connections.close_all()
+        children = []
+        for _ in range(processes):
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    make_worker().run()
+                finally:
+                    os._exit(0)
+            children.append(pid)
+        self.stdout.write(f'Started {processes} worker processes: {", ".join(map(str, children))}.')
+
+        def forward(signum, frame):
+            for pid in children:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+        signal.signal(signal.SIGTERM, forward)
+        signal.signal(signal.SIGINT, forward)
+        for pid in children:
+            while True:
+                try:
+                    os.waitpid(pid, 0)
+                    break
+                except InterruptedError:
+                    continue
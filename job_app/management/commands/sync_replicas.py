@@ -0,0 +1,31 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from job_app.routers import PRIMARY
+
+
+class Command(BaseCommand):
+    help = 'Copies the primary SQLite database to the local SQLite replicas in DATABASE_REPLICAS'
+
+    def handle(self, *args, **options):
+        primary = connections[PRIMARY]
+        if primary.vendor != 'sqlite':
+            raise CommandError('sync_replicas only handles SQLite; use your database replication otherwise')
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('No replicas configured (set JOB_PORTAL_REPLICAS)')
+
+        primary.ensure_connection()
+        for alias in settings.DATABASE_REPLICAS:
+            name = settings.DATABASES[alias]['NAME']
+            connections[alias].close()
+            # The backup API copies a consistent snapshot while the primary stays writable
+            target = sqlite3.connect(name)
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(f'{alias}: copied to {name}')
+        self.stdout.write(self.style.SUCCESS(f'Synced {len(settings.DATABASE_REPLICAS)} replica(s).'))
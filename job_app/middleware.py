@@ -0,0 +1,275 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware as BaseAuthenticationMiddleware
+from django.db import connections
+from django.http import FileResponse
+from django.utils.functional import SimpleLazyObject
+
+from .auth import aget_session_user, get_session_user
+from .routers import replica_reads, replicas
+from .versions import request_versions
+
+logger = logging.getLogger('job_app.queries')
+
+# Literals are stripped so that the same statement with different ids
+# produces the same fingerprint
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\bIN \((?:\s*(?:\?|%s)\s*,?)+\)', re.IGNORECASE)
+_SPACE_RE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(max_queries):
+    """Declares the maximum number of SQL queries a view may issue per request."""
+    def decorator(view_func):
+        view_func.query_budget = max_queries
+        return view_func
+    return decorator
+
+
+class QueryStats:
+    """Execute wrapper recording every query run while it is installed."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def repeated(self, threshold=None):
+        if threshold is None:
+            threshold = getattr(settings, 'QUERY_REPEAT_THRESHOLD', 3)
+        return {sql: n for sql, n in self.fingerprints.items() if n >= threshold}
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Records query count, SQL time and repeated statements for each request.
+
+    The numbers are exposed in a Server-Timing header and a JSON log line on
+    the ``job_app.queries`` logger. Views may declare a budget with
+    ``@query_budget(n)`` or through ``settings.QUERY_BUDGETS`` keyed by URL
+    name; going over it logs a warning, or raises QueryBudgetExceeded when
+    ``settings.QUERY_BUDGET_STRICT`` is on (as in the test suite).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        request.query_budget = None
+        with QueryStats() as stats:
+            request.query_stats = stats
+            response = self.get_response(request)
+        return self.finish(request, response, stats, start)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        request.query_budget = None
+        stats = QueryStats()
+        request.query_stats = stats
+        # Connections belong to the thread the async ORM runs queries on, so
+        # the wrappers have to be installed there rather than on the event loop
+        await sync_to_async(stats.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stats.__exit__)(None, None, None)
+        return self.finish(request, response, stats, start)
+
+    def finish(self, request, response, stats, start):
+        total = time.perf_counter() - start
+        response.query_stats = stats
+        response['Server-Timing'] = (
+            f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries", '
+            f'total;dur={total * 1000:.1f}'
+        )
+        if response.streaming and not isinstance(response, FileResponse):
+            # Streamed pages read their rows while the body is sent, so the
+            # totals are only known after the last chunk
+            response.streaming_content = self.count_streamed(request, response, stats, start)
+            return response
+        self.log(request, response, stats, total)
+        self.check_budget(request, stats)
+        return response
+
+    def count_streamed(self, request, response, stats, start):
+        content = response.streaming_content
+        if response.is_async:
+            async def chunks():
+                # Entered on the thread the async ORM runs queries on, as in __acall__
+                await sync_to_async(stats.__enter__)()
+                try:
+                    async for chunk in content:
+                        yield chunk
+                finally:
+                    await sync_to_async(stats.__exit__)(None, None, None)
+                self.log(request, response, stats, time.perf_counter() - start)
+                self.check_budget(request, stats)
+            return chunks()
+
+        def chunks():
+            with stats:
+                yield from content
+            self.log(request, response, stats, time.perf_counter() - start)
+            self.check_budget(request, stats)
+        return chunks()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        budget = getattr(view_func, 'query_budget', None)
+        if budget is None and request.resolver_match:
+            budgets = getattr(settings, 'QUERY_BUDGETS', {})
+            budget = budgets.get(request.resolver_match.view_name)
+        request.query_budget = budget
+
+    def log(self, request, response, stats, total):
+        repeated = stats.repeated()
+        view_name = request.resolver_match.view_name if request.resolver_match else None
+        logger.log(
+            logging.WARNING if repeated else logging.INFO,
+            json.dumps({
+                'path': request.path,
+                'view': view_name,
+                'status': response.status_code,
+                'queries': stats.count,
+                'db_ms': round(stats.duration * 1000, 2),
+                'total_ms': round(total * 1000, 2),
+                'budget': request.query_budget,
+                'repeated': repeated,
+            }),
+        )
+
+    def check_budget(self, request, stats):
+        budget = request.query_budget
+        if budget is None or stats.count <= budget:
+            return
+        message = f'{request.path} ran {stats.count} queries, budget is {budget}'
+        if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Sends the reads of safe requests to a replica (see job_app.routers).
+    A request that writes sets a cookie pinning the client to the primary
+    for REPLICA_PIN_SECONDS, covering replication lag on the next page.
+    """
+
+    cookie_name = 'pin_primary'
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with replica_reads(self.use_replicas(request)) as routing:
+            response = self.get_response(request)
+        return self.pin(routing, response)
+
+    async def __acall__(self, request):
+        with replica_reads(self.use_replicas(request)) as routing:
+            response = await self.get_response(request)
+        return self.pin(routing, response)
+
+    def use_replicas(self, request):
+        return request.method in ('GET', 'HEAD', 'OPTIONS') and self.cookie_name not in request.COOKIES
+
+    def pin(self, routing, response):
+        if routing.wrote and replicas():
+            response.set_cookie(
+                self.cookie_name, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax'
+            )
+        return response
+
+
+class CacheVersionMiddleware:
+    """
+    Reads each cache version (see job_app.versions) at most once per
+    request, however many cache keys, fragments and validators use it.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with request_versions():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with request_versions():
+            return await self.get_response(request)
+
+
+class AuthenticationMiddleware(BaseAuthenticationMiddleware):
+    """
+    Django's AuthenticationMiddleware with request.user taken from the copy
+    kept in the session (see job_app.auth.get_session_user).
+    """
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_session_user(request))
+        request.auser = partial(_auser, request)
+
+
+async def _auser(request):
+    if not hasattr(request, '_acached_user'):
+        request._acached_user = await aget_session_user(request)
+    return request._acached_user
@@ -0,0 +1,67 @@
+from django.db import migrations
+
+# External-content FTS5 index over job_app_job. The triggers keep it in sync
+# with every insert, update and delete, including bulk operations that skip
+# model signals.
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS job_app_job_fts USING fts5(
+        title, company_name, location, description,
+        content='job_app_job', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS job_app_job_fts_ai AFTER INSERT ON job_app_job BEGIN
+        INSERT INTO job_app_job_fts(rowid, title, company_name, location, description)
+        VALUES (new.id, new.title, new.company_name, new.location, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS job_app_job_fts_ad AFTER DELETE ON job_app_job BEGIN
+        INSERT INTO job_app_job_fts(job_app_job_fts, rowid, title, company_name, location, description)
+        VALUES ('delete', old.id, old.title, old.company_name, old.location, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS job_app_job_fts_au AFTER UPDATE OF title, company_name, location, description ON job_app_job BEGIN
+        INSERT INTO job_app_job_fts(job_app_job_fts, rowid, title, company_name, location, description)
+        VALUES ('delete', old.id, old.title, old.company_name, old.location, old.description);
+        INSERT INTO job_app_job_fts(rowid, title, company_name, location, description)
+        VALUES (new.id, new.title, new.company_name, new.location, new.description);
+    END
+    """,
+    "INSERT INTO job_app_job_fts(job_app_job_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS job_app_job_fts_au',
+    'DROP TRIGGER IF EXISTS job_app_job_fts_ad',
+    'DROP TRIGGER IF EXISTS job_app_job_fts_ai',
+    'DROP TABLE IF EXISTS job_app_job_fts',
+]
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in CREATE_SQL:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('job_app', '0003_alter_profile_role'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
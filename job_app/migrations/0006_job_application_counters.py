@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:30
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Job = apps.get_model('job_app', 'Job')
+    Application = apps.get_model('job_app', 'Application')
+    applications = Application.objects.filter(job=models.OuterRef('pk'))
+    Job.objects.update(
+        applications_count=Coalesce(
+            models.Subquery(
+                applications.values('job').annotate(total=models.Count('id')).values('total'),
+                output_field=models.IntegerField(),
+            ),
+            models.Value(0),
+        ),
+        last_applied_at=models.Subquery(applications.order_by('-applied_at').values('applied_at')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('job_app', '0005_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='applications_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='last_applied_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
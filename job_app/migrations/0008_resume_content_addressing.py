@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:36
+
+import job_app.uploads
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('job_app', '0007_similar_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='application',
+            name='resume_sha256',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='application',
+            name='resume_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='application',
+            name='resume',
+            field=models.FileField(storage=job_app.uploads.ContentAddressedStorage(), upload_to=job_app.uploads.resume_upload_to),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:26
+
+from django.db import migrations, models
+
+
+def backfill_facets(apps, schema_editor):
+    Job = apps.get_model('job_app', 'Job')
+    JobFacet = apps.get_model('job_app', 'JobFacet')
+    for field in ('company_name', 'location'):
+        counts = Job.objects.order_by().values(field).annotate(total=models.Count('id'))
+        JobFacet.objects.bulk_create(
+            [JobFacet(field=field, value=row[field], job_count=row['total']) for row in counts],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('job_app', '0010_admin_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(choices=[('company_name', 'Company'), ('location', 'Location')], max_length=20)),
+                ('value', models.CharField(max_length=200)),
+                ('job_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['field', '-job_count', 'value'], name='job_facet_top_idx')],
+                'constraints': [models.UniqueConstraint(fields=('field', 'value'), name='unique_job_facet')],
+            },
+        ),
+        migrations.RunPython(backfill_facets, migrations.RunPython.noop),
+    ]
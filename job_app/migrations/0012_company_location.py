@@ -0,0 +1,152 @@
+import importlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+search_index = importlib.import_module('job_app.migrations.0004_job_search_index')
+
+# The external-content search index reads company_name and location from
+# job_app_job; it is dropped here and recreated contentless after migrate
+# (see SQLiteFTSSearchBackend.install)
+DROP_SEARCH_INDEX_SQL = [
+    'DROP TRIGGER IF EXISTS job_app_job_fts_location_au',
+    'DROP TRIGGER IF EXISTS job_app_job_fts_company_au',
+    *search_index.DROP_SQL,
+]
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_SEARCH_INDEX_SQL:
+        schema_editor.execute(statement)
+
+
+def restore_search_index(apps, schema_editor):
+    drop_search_index(apps, schema_editor)
+    search_index.create_search_index(apps, schema_editor)
+
+
+# (entity model, old Job column, new Job foreign key column). The location
+# key is added as location_ref and takes the old column's name at the end.
+ENTITY_FIELDS = (('Company', 'company_name', 'company_id'), ('Location', 'location', 'location_ref_id'))
+
+
+def normalize_name(name):
+    return ' '.join(name.split())
+
+
+def link_entities(apps, schema_editor):
+    """One Company and one Location per distinct name, and every job pointed at its pair."""
+    Job = apps.get_model('job_app', 'Job')
+    for model_name, old_field, new_field in ENTITY_FIELDS:
+        Entity = apps.get_model('job_app', model_name)
+        counts = dict(Job.objects.order_by().values_list(old_field).annotate(total=models.Count('id')))
+        # Values differing only in whitespace become one entity
+        job_counts = {}
+        for value, total in counts.items():
+            job_counts[normalize_name(value)] = job_counts.get(normalize_name(value), 0) + total
+        Entity.objects.bulk_create(
+            [Entity(name=name, job_count=total) for name, total in job_counts.items()], batch_size=1000,
+        )
+        ids = dict(Entity.objects.values_list('name', 'id'))
+        # One UPDATE per distinct value, each a seek on the old column's index
+        for value in counts:
+            Job.objects.filter(**{old_field: value}).update(**{new_field: ids[normalize_name(value)]})
+
+
+def unlink_entities(apps, schema_editor):
+    Job = apps.get_model('job_app', 'Job')
+    for model_name, old_field, new_field in ENTITY_FIELDS:
+        Entity = apps.get_model('job_app', model_name)
+        for pk, name in Entity.objects.values_list('id', 'name').iterator():
+            Job.objects.filter(**{new_field: pk}).update(**{old_field: name})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('job_app', '0011_job_facets'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_search_index, restore_search_index),
+        migrations.CreateModel(
+            name='Company',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, unique=True)),
+                ('job_count', models.PositiveIntegerField(default=0, editable=False)),
+            ],
+            options={
+                'verbose_name_plural': 'companies',
+                'indexes': [models.Index(fields=['-job_count', 'name'], name='company_top_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Location',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, unique=True)),
+                ('job_count', models.PositiveIntegerField(default=0, editable=False)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-job_count', 'name'], name='location_top_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='company',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='jobs', to='job_app.company'),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='location_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='jobs', to='job_app.location'),
+        ),
+        migrations.RunPython(link_entities, unlink_entities),
+        migrations.RemoveIndex(
+            model_name='job',
+            name='job_company_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='job',
+            name='job_location_idx',
+        ),
+        # State only: migrating backwards then re-adds the text columns with
+        # an empty default for the existing rows, which unlink_entities fills
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.AlterField(model_name='job', name='company_name', field=models.CharField(max_length=200, default='')),
+            migrations.AlterField(model_name='job', name='location', field=models.CharField(max_length=200, default='')),
+        ]),
+        migrations.RemoveField(
+            model_name='job',
+            name='company_name',
+        ),
+        migrations.RemoveField(
+            model_name='job',
+            name='location',
+        ),
+        migrations.RenameField(
+            model_name='job',
+            old_name='location_ref',
+            new_name='location',
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='company',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='jobs', to='job_app.company'),
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='location',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='jobs', to='job_app.location'),
+        ),
+        # Facet counts now live on the companies and locations themselves
+        migrations.DeleteModel(
+            name='JobFacet',
+        ),
+        # Run last when migrating backwards: the contentless index's triggers
+        # read job_app_company and job_app_location, which are about to go
+        migrations.RunPython(migrations.RunPython.noop, drop_search_index),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:41
+
+from django.db import migrations, models
+
+from job_app.gazetteer import locate
+
+# The search index triggers read job_app_location, which SQLite will not
+# let the AddField below remake while they exist. They are recreated, and
+# the index rebuilt, after migrate (see SQLiteFTSSearchBackend.install).
+DROP_SEARCH_TRIGGERS_SQL = [
+    f'DROP TRIGGER IF EXISTS job_app_job_fts_{suffix}'
+    for suffix in ('ai', 'ad', 'au', 'company_au', 'location_au')
+]
+
+
+def drop_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_SEARCH_TRIGGERS_SQL:
+        schema_editor.execute(statement)
+
+
+# The R*Tree triggers installed after migrate (see job_app.geo.install) read
+# the coordinate columns, so migrating backwards drops them before the
+# columns go, along with the search triggers again
+DROP_GEO_INDEX_SQL = [
+    *(f'DROP TRIGGER IF EXISTS job_app_location_rtree_{suffix}' for suffix in ('ai', 'ad', 'au')),
+    'DROP TABLE IF EXISTS job_app_location_rtree',
+]
+
+
+def drop_geo_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    drop_search_triggers(apps, schema_editor)
+    for statement in DROP_GEO_INDEX_SQL:
+        schema_editor.execute(statement)
+
+
+def geocode_locations(apps, schema_editor):
+    """Coordinates for existing locations from the bundled gazetteer."""
+    Location = apps.get_model('job_app', 'Location')
+    located = []
+    for location in Location.objects.iterator():
+        for field, value in locate(location.name).items():
+            setattr(location, field, value)
+        located.append(location)
+    Location.objects.bulk_update(located, ['latitude', 'longitude', 'is_remote'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('job_app', '0012_company_location'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_search_triggers, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='location',
+            name='is_remote',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['is_remote'], name='location_remote_idx'),
+        ),
+        migrations.RunPython(geocode_locations, migrations.RunPython.noop),
+        # Runs first when migrating backwards
+        migrations.RunPython(migrations.RunPython.noop, drop_geo_index),
+    ]
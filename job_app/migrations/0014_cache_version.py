@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:57
+
+import time
+
+from django.db import migrations, models
+
+
+def create_versions(apps, schema_editor):
+    CacheVersion = apps.get_model('job_app', 'CacheVersion')
+    for name in ('catalogue', 'entities'):
+        CacheVersion.objects.get_or_create(name=name, defaults={'version': time.time_ns()})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('job_app', '0013_location_coordinates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheVersion',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField()),
+            ],
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,9 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+from .entities import LocationManager, NamedEntityManager
+from .uploads import resume_storage, resume_upload_to
+
 # Optional: Extend User with role
 class Profile(models.Model):
     ROLE_CHOICES = (
@@ -13,23 +16,160 @@ class Profile(models.Model):
     def __str__(self):
         return f"{self.user.username} ({self.role})"
 
+# Companies and locations are stored once; see job_app.entities for the
+# interned name lookups. job_count is maintained by job_app.facets.
+class Company(models.Model):
+    name = models.CharField(max_length=200, unique=True)
+    job_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = NamedEntityManager()
+
+    class Meta:
+        verbose_name_plural = 'companies'
+        indexes = [
+            # search pages: the companies with the most jobs
+            models.Index(fields=['-job_count', 'name'], name='company_top_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+class Location(models.Model):
+    name = models.CharField(max_length=200, unique=True)
+    job_count = models.PositiveIntegerField(default=0, editable=False)
+    # Filled in from the gazetteer (job_app.gazetteer); indexed for radius
+    # searches by the R*Tree in job_app.geo. Remote locations have none.
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    is_remote = models.BooleanField(default=False)
+
+    objects = LocationManager()
+
+    class Meta:
+        indexes = [
+            # search pages: the locations with the most jobs
+            models.Index(fields=['-job_count', 'name'], name='location_top_idx'),
+            # radius searches that also include remote jobs
+            models.Index(fields=['is_remote'], name='location_remote_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
 class Job(models.Model):
     title = models.CharField(max_length=200)
-    company_name = models.CharField(max_length=200)
-    location = models.CharField(max_length=200)
+    company = models.ForeignKey(Company, on_delete=models.PROTECT, related_name='jobs')
+    location = models.ForeignKey(Location, on_delete=models.PROTECT, related_name='jobs')
     description = models.TextField()
     posted_by = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Maintained by job_app.counters when applications are created or deleted
+    applications_count = models.PositiveIntegerField(default=0, editable=False)
+    last_applied_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # homepage / job_listings: newest first, keyset paginated
+            models.Index(fields=['-created_at', '-id'], name='job_created_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.title} at {self.company_name}"
+        return f"{self.title} at {self.company.name}"
 
 class Application(models.Model):
     job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='applications')
     applicant = models.ForeignKey(User, on_delete=models.CASCADE)
-    resume = models.FileField(upload_to='resumes/')
+    resume = models.FileField(upload_to=resume_upload_to, storage=resume_storage)
+    # Filled in by resume_upload_to; identical files share one stored copy
+    resume_sha256 = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
+    resume_text = models.TextField(blank=True, editable=False)
     cover_letter = models.TextField()
     applied_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # my_applications: one applicant's applications, newest first
+            models.Index(fields=['applicant', '-applied_at', '-id'], name='application_applicant_idx'),
+            # admin applications page: one job's applications, newest first
+            models.Index(fields=['job', '-applied_at', '-id'], name='application_job_idx'),
+        ]
+        constraints = [
+            # Also serves the applicant + job lookups in apply_to_job and job_detail
+            models.UniqueConstraint(fields=['job', 'applicant'], name='unique_job_applicant'),
+        ]
+
     def __str__(self):
         return f"{self.applicant.username} applied to {self.job.title}"
+
+
+# Precomputed "similar jobs", maintained by job_app.similarity
+class JobSignature(models.Model):
+    job = models.OneToOneField(Job, on_delete=models.CASCADE, primary_key=True, related_name='signature')
+    minhash = models.BinaryField()
+
+    def __str__(self):
+        return f"Signature of {self.job_id}"
+
+class JobSignatureBucket(models.Model):
+    # One row per LSH band; jobs sharing a bucket are similarity candidates
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='signature_buckets')
+    bucket = models.BigIntegerField(db_index=True)
+
+    def __str__(self):
+        return f"{self.job_id} in bucket {self.bucket}"
+
+class SimilarJob(models.Model):
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='similar_entries')
+    similar_job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'rank'], name='unique_similar_job_rank'),
+        ]
+
+    def __str__(self):
+        return f"{self.similar_job_id} is similar to {self.job_id} ({self.score:.2f})"
+
+
+# Background work queue, see job_app.queue
+class Task(models.Model):
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    name = models.CharField(max_length=200)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField()
+    locked_until = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers claim the oldest due tasks
+            models.Index(fields=['status', 'run_at', 'id'], name='task_due_idx'),
+            models.Index(fields=['name', 'status'], name='task_name_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.status})"
+
+
+# Version stamps that cache keys are built from (see job_app.versions). They
+# live in the database so that a bump from any process, including management
+# commands, reaches every worker whatever the cache backend.
+class CacheVersion(models.Model):
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
@@ -0,0 +1,341 @@
+from itertools import chain
+
+from django.conf import settings
+from django.core import signing
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+CURSOR_SALT = 'job_app.pagination.cursor'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class KeysetPage:
+    streamed = False
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+class StreamedKeysetPage(KeysetPage):
+    """
+    A keyset page whose rows are read lazily from a server-side cursor, for
+    pages that stream their HTML (see job_app.streaming).
+
+    ``open()``/``aopen()`` run the query and read the first row, so the page
+    knows whether it is empty before any rows are consumed. Iterating (with
+    ``for`` or ``async for``) yields each row once and keeps none of them;
+    the cursors are set when the iteration ends.
+    """
+    streamed = True
+
+    def __init__(self, paginator, queryset, reverse=False, from_cursor=False, chunk_size=100):
+        super().__init__([])
+        self.paginator = paginator
+        # Rows are read after the view has returned, outside the request's
+        # replica routing, so pick the database now
+        self.queryset = queryset.using(queryset.db)
+        self.reverse = reverse
+        self.from_cursor = from_cursor
+        self.chunk_size = chunk_size
+        self.count = 0
+        self.first = self.last = None
+        self.has_more = False
+        self._rows = None
+        self._pending = None
+        # Deferred {% after_rows %} blocks, see job_app.templatetags.streaming
+        self.after_rows = []
+
+    def open(self):
+        self._rows = self.queryset.iterator(chunk_size=self.chunk_size)
+        self._pending = next(self._rows, None)
+
+    async def aopen(self):
+        self._rows = aiter(self.queryset.aiterator(chunk_size=self.chunk_size))
+        self._pending = await anext(self._rows, None)
+
+    def __iter__(self):
+        try:
+            for row in chain([self._pending] if self._pending is not None else [], self._rows):
+                if not self._accept(row):
+                    break
+                yield row
+        finally:
+            self._rows.close()
+        self._finish(self.reverse and self.first is not None and self._earlier_rows().exists())
+
+    async def __aiter__(self):
+        try:
+            if self._pending is not None and self._accept(self._pending):
+                yield self._pending
+                async for row in self._rows:
+                    if not self._accept(row):
+                        break
+                    yield row
+        finally:
+            await self._rows.aclose()
+        self._finish(self.reverse and self.first is not None and await self._earlier_rows().aexists())
+
+    def __len__(self):
+        return self.count
+
+    def __bool__(self):
+        return self._pending is not None
+
+    def _accept(self, row):
+        # The row after a full page is only there to tell that more follow
+        if self.count == self.paginator.per_page:
+            self.has_more = True
+            return False
+        if self.first is None:
+            self.first = row
+        self.last = row
+        self.count += 1
+        return True
+
+    def _earlier_rows(self):
+        # Rows before the first one on a page reached backwards
+        ordering = self.paginator._invert(self.paginator.ordering)
+        return self.paginator.queryset.using(self.queryset.db).filter(
+            self.paginator._seek(ordering, self.paginator._key(self.first))
+        )
+
+    def _finish(self, has_earlier):
+        has_next = self.has_more or (self.reverse and self.from_cursor)
+        has_previous = has_earlier or (not self.reverse and self.from_cursor)
+        if self.first is not None:
+            self.next_cursor = self.paginator.encode_cursor('n', self.last) if has_next else None
+            self.previous_cursor = self.paginator.encode_cursor('p', self.first) if has_previous else None
+
+
+class KeysetPaginator:
+    """
+    Cursor pagination over a unique ordering such as ('-created_at', '-id').
+
+    Each page is a range seek on the ordering columns, so fetching page 1000
+    costs the same as page 1 as long as an index matches the ordering. Cursors
+    are signed, opaque tokens holding the key of the boundary row.
+    """
+
+    def __init__(self, queryset, ordering, per_page=20):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.fields = [name.lstrip('-') for name in self.ordering]
+
+    def page(self, cursor=None):
+        if not cursor:
+            return self._build_page(list(self._rows()), reverse=False, from_cursor=False)
+
+        direction, values = self.decode_cursor(cursor)
+        reverse = direction == 'p'
+        rows = list(self._rows(values, reverse))
+        return self._build_page(rows, reverse=reverse, from_cursor=True)
+
+    async def apage(self, cursor=None):
+        if not cursor:
+            rows = [obj async for obj in self._rows()]
+            return self._build_page(rows, reverse=False, from_cursor=False)
+
+        direction, values = self.decode_cursor(cursor)
+        reverse = direction == 'p'
+        rows = [obj async for obj in self._rows(values, reverse)]
+        return self._build_page(rows, reverse=reverse, from_cursor=True)
+
+    def stream(self, cursor=None, chunk_size=100):
+        """
+        The page for ``cursor`` as a StreamedKeysetPage. Pages reached
+        backwards are still read in page order, so no rows are buffered.
+        """
+        if not cursor:
+            return StreamedKeysetPage(self, self._rows(), chunk_size=chunk_size)
+        direction, values = self.decode_cursor(cursor)
+        if direction == 'n':
+            return StreamedKeysetPage(self, self._rows(values), from_cursor=True, chunk_size=chunk_size)
+        keys = self._rows(values, reverse=True)[:self.per_page].values('pk')
+        rows = self.queryset.filter(pk__in=keys).order_by(*self.ordering)
+        return StreamedKeysetPage(self, rows, reverse=True, from_cursor=True, chunk_size=chunk_size)
+
+    def _rows(self, values=None, reverse=False):
+        ordering = self._invert(self.ordering) if reverse else self.ordering
+        queryset = self.queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._seek(ordering, values))
+        # One extra row tells us whether there is another page in this direction
+        return queryset[:self.per_page + 1]
+
+    def _build_page(self, rows, reverse, from_cursor):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+
+        has_next = (not reverse and has_more) or (reverse and from_cursor)
+        has_previous = (reverse and has_more) or (not reverse and from_cursor)
+        next_cursor = self.encode_cursor('n', rows[-1]) if has_next and rows else None
+        previous_cursor = self.encode_cursor('p', rows[0]) if has_previous and rows else None
+        return KeysetPage(rows, next_cursor, previous_cursor)
+
+    def _seek(self, ordering, values):
+        # (a, b) < (x, y) is written as a <= x AND (a < x OR (a = x AND b < y));
+        # the leading range term lets the database seek into the index.
+        first, first_value = ordering[0], values[0]
+        condition = Q(**{f'{first.lstrip("-")}__{"lte" if first.startswith("-") else "gte"}': first_value})
+        after = Q()
+        for position, name in enumerate(ordering):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            term = Q(**{f'{field}__{lookup}': values[position]})
+            for previous, previous_value in zip(ordering[:position], values[:position]):
+                term &= Q(**{previous.lstrip('-'): previous_value})
+            after |= term
+        return condition & after
+
+    @staticmethod
+    def _invert(ordering):
+        return tuple(name[1:] if name.startswith('-') else f'-{name}' for name in ordering)
+
+    def _key(self, obj):
+        values = []
+        for field in self.fields:
+            value = obj
+            for part in field.split('__'):
+                value = getattr(value, part)
+            values.append(value)
+        return values
+
+    def encode_cursor(self, direction, obj):
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in self._key(obj)]
+        return signing.dumps([direction, values], salt=CURSOR_SALT, compress=True)
+
+    def decode_cursor(self, cursor):
+        try:
+            direction, values = signing.loads(cursor, salt=CURSOR_SALT)
+        except (signing.BadSignature, TypeError, ValueError):
+            raise InvalidCursor(cursor)
+        if direction not in ('n', 'p') or len(values) != len(self.fields):
+            raise InvalidCursor(cursor)
+        return direction, values
+
+
+def paginate(request, queryset, ordering, per_page=20, cursor_param='cursor'):
+    """Returns the keyset page selected by ``request.GET[cursor_param]``."""
+    paginator = KeysetPaginator(queryset, ordering, per_page)
+    try:
+        return paginator.page(request.GET.get(cursor_param))
+    except InvalidCursor:
+        return paginator.page()
+
+
+async def apaginate(request, queryset, ordering, per_page=20, cursor_param='cursor'):
+    """Async version of paginate()."""
+    paginator = KeysetPaginator(queryset, ordering, per_page)
+    try:
+        return await paginator.apage(request.GET.get(cursor_param))
+    except InvalidCursor:
+        return await paginator.apage()
+
+
+def stream_paginate(request, queryset, ordering, per_page=20, cursor_param='cursor', chunk_size=100):
+    """Like paginate(), but returns a StreamedKeysetPage."""
+    paginator = KeysetPaginator(queryset, ordering, per_page)
+    try:
+        return paginator.stream(request.GET.get(cursor_param), chunk_size)
+    except InvalidCursor:
+        return paginator.stream(chunk_size=chunk_size)
+
+
+def get_per_page(request, default, param='per_page'):
+    """
+    Page size asked for with ``?per_page=``, between 1 and
+    ``settings.LIST_MAX_PER_PAGE``; ``default`` when absent or invalid.
+    """
+    try:
+        per_page = int(request.GET[param])
+    except (KeyError, ValueError):
+        return default
+    return max(1, min(per_page, settings.LIST_MAX_PER_PAGE))
+
+
+def estimated_row_count(model, using='default'):
+    """
+    The row count the database statistics hold for ``model``'s table, or None
+    when there are none (SQLite before ANALYZE, other vendors).
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'sqlite':
+            # sqlite_stat1 only exists once ANALYZE or PRAGMA optimize has run
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            # The first number of each stat is the table's row count
+            cursor.execute("SELECT CAST(stat AS INTEGER) FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    # reltuples is -1 for tables Postgres has never analyzed
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for admin changelists over tables too large to count.
+
+    Unfiltered lists past ``ADMIN_EXACT_COUNT_LIMIT`` rows take their size from
+    the database statistics instead of COUNT(*). Filtered lists count at most
+    that many rows plus one, so a broad search stops counting early; narrow the
+    filters to reach results beyond it.
+    """
+    estimated = False
+    capped = False
+
+    @cached_property
+    def count_limit(self):
+        return settings.ADMIN_EXACT_COUNT_LIMIT
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.has_filters():
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > self.count_limit:
+                self.estimated = True
+                return estimate
+            return queryset.count()
+        # No ordering: the capped count can stop at the first matching rows
+        count = queryset.order_by()[:self.count_limit + 1].count()
+        self.capped = count > self.count_limit
+        return count
@@ -0,0 +1,248 @@
+"""
+A small database-backed task queue.
+
+Tasks are rows in job_app_task written in the same transaction as the work
+that produced them, so a rolled back request never leaves a task behind.
+Workers (``manage.py run_task_worker``) claim due tasks with a
+compare-and-swap UPDATE, which works on SQLite as well as on databases with
+row locks. A claimed task is invisible to other workers until its
+visibility timeout expires; if the worker dies, the task becomes claimable
+again. Failures are retried with exponential backoff up to max_attempts.
+Finished and failed tasks are kept for TASK_RETENTION_DAYS and then deleted
+by the workers (or ``manage.py purge_tasks``).
+"""
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+class TaskDefinition:
+    def __init__(self, func, name, max_attempts, concurrency):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.concurrency = concurrency
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *args, **kwargs):
+        return enqueue(self, *args, **kwargs)
+
+
+def task(func=None, *, name=None, max_attempts=None, concurrency=None):
+    """
+    Registers a function as a queue task.
+
+    ``concurrency`` caps how many instances of this task may run at once
+    across all workers.
+    """
+    def register(func):
+        definition = TaskDefinition(
+            func,
+            name or f'{func.__module__}.{func.__name__}',
+            max_attempts or settings.TASK_MAX_ATTEMPTS,
+            concurrency,
+        )
+        _registry[definition.name] = definition
+        return definition
+    return register(func) if func is not None else register
+
+
+def enqueue(task_def, *args, delay=0, **kwargs):
+    """
+    Queues ``task_def(*args, **kwargs)``. Arguments must be JSON serializable.
+    With TASK_QUEUE_EAGER the task runs in-process once the transaction commits.
+    """
+    if getattr(settings, 'TASK_QUEUE_EAGER', False):
+        transaction.on_commit(lambda: _execute_eagerly(task_def, args, kwargs))
+        return None
+    return Task.objects.create(
+        name=task_def.name,
+        payload={'args': list(args), 'kwargs': kwargs},
+        max_attempts=task_def.max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def _execute_eagerly(task_def, args, kwargs):
+    try:
+        task_def(*args, **kwargs)
+    except Exception:
+        logger.exception('Task %s failed', task_def.name)
+
+
+def _claimable(now):
+    return Q(status='queued', run_at__lte=now) | Q(status='running', locked_until__lt=now)
+
+
+def claim_tasks(worker_id, limit, visibility_timeout):
+    """Claims up to ``limit`` due tasks for ``worker_id``."""
+    now = timezone.now()
+    running = _running_counts(now)
+
+    claimed = []
+    candidates = Task.objects.filter(_claimable(now)).order_by('run_at', 'id')[:limit * 4]
+    for candidate in candidates:
+        if len(claimed) >= limit:
+            break
+        definition = _registry.get(candidate.name)
+        if definition and definition.concurrency is not None:
+            if running.get(candidate.name, 0) >= definition.concurrency:
+                continue
+        claim = Task.objects.filter(_claimable(now), id=candidate.id)
+        if definition and definition.concurrency is not None:
+            claim = _under_cap(claim, definition.concurrency, now)
+        updated = claim.update(
+            status='running',
+            worker=worker_id,
+            attempts=F('attempts') + 1,
+            locked_until=now + timedelta(seconds=visibility_timeout),
+        )
+        if updated:
+            running[candidate.name] = running.get(candidate.name, 0) + 1
+            candidate.status = 'running'
+            candidate.worker = worker_id
+            candidate.attempts += 1
+            claimed.append(candidate)
+    return claimed
+
+
+def _under_cap(claim, concurrency, now):
+    # The counts read before the loop may be stale by the time the UPDATE
+    # runs, so the cap is checked again inside it. SQLite runs the statement
+    # under its write lock, so two workers cannot both take the last slot
+    running = (
+        Task.objects.filter(name=OuterRef('name'), status='running', locked_until__gte=now)
+        .order_by().values('name').annotate(count=Count('id')).values('count')
+    )
+    return claim.alias(running=Coalesce(Subquery(running), 0)).filter(running__lt=concurrency)
+
+
+def _running_counts(now):
+    return dict(
+        Task.objects.filter(status='running', locked_until__gte=now)
+        .values_list('name')
+        .annotate(count=Count('id'))
+        .values_list('name', 'count')
+    )
+
+
+def run_task(task_row):
+    """Runs one claimed task and records the outcome."""
+    definition = _registry.get(task_row.name)
+    try:
+        if definition is None:
+            raise LookupError(f'Unknown task {task_row.name}')
+        definition(*task_row.payload.get('args', []), **task_row.payload.get('kwargs', {}))
+    except Exception:
+        error = traceback.format_exc()
+        if task_row.attempts >= task_row.max_attempts:
+            Task.objects.filter(id=task_row.id, worker=task_row.worker).update(
+                status='failed', last_error=error, locked_until=None, finished_at=timezone.now()
+            )
+            logger.error('Task %s #%s failed permanently', task_row.name, task_row.id)
+        else:
+            backoff = min(2 ** task_row.attempts, 600)
+            Task.objects.filter(id=task_row.id, worker=task_row.worker).update(
+                status='queued', last_error=error, locked_until=None,
+                run_at=timezone.now() + timedelta(seconds=backoff),
+            )
+            logger.warning('Task %s #%s failed, retrying in %ss', task_row.name, task_row.id, backoff)
+        return False
+    Task.objects.filter(id=task_row.id, worker=task_row.worker).update(
+        status='done', locked_until=None, finished_at=timezone.now()
+    )
+    return True
+
+
+def purge_tasks(older_than, batch_size=1000):
+    """
+    Deletes done and failed tasks that finished before ``older_than``, in
+    batches so the write lock is released in between. Returns the count.
+    """
+    deleted = 0
+    while True:
+        ids = list(
+            Task.objects.filter(status__in=['done', 'failed'], finished_at__lt=older_than)
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        with transaction.atomic():
+            deleted += Task.objects.filter(id__in=ids).delete()[0]
+
+
+class Worker:
+    # Seconds between purges of old finished tasks
+    purge_interval = 3600
+
+    def __init__(self, concurrency=4, visibility_timeout=None, poll_interval=1.0, burst=False):
+        self.concurrency = concurrency
+        self.visibility_timeout = visibility_timeout or settings.TASK_VISIBILITY_TIMEOUT
+        self.poll_interval = poll_interval
+        self.burst = burst
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = threading.Event()
+        self.in_flight = threading.Semaphore(concurrency)
+        self.purged_at = None
+
+    def stop(self, *args):
+        self.stopping.set()
+
+    def purge(self):
+        """Deletes old finished tasks, at most once per purge_interval."""
+        now = time.monotonic()
+        if self.purged_at is not None and now - self.purged_at < self.purge_interval:
+            return
+        self.purged_at = now
+        deleted = purge_tasks(timezone.now() - timedelta(days=settings.TASK_RETENTION_DAYS))
+        if deleted:
+            logger.info('Purged %s finished task(s)', deleted)
+
+    def _run(self, task_row):
+        close_old_connections()
+        try:
+            run_task(task_row)
+        finally:
+            close_old_connections()
+            self.in_flight.release()
+
+    def run(self):
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix='task-worker') as pool:
+            while not self.stopping.is_set():
+                free = 0
+                while self.in_flight.acquire(blocking=False):
+                    free += 1
+                tasks = claim_tasks(self.worker_id, free, self.visibility_timeout) if free else []
+                for _ in range(free - len(tasks)):
+                    self.in_flight.release()
+                for task_row in tasks:
+                    pool.submit(self._run, task_row)
+                if not tasks:
+                    if self.burst and free == self.concurrency:
+                        break
+                    # Idle time is spent keeping the table (and the claim query) small
+                    self.purge()
+                    time.sleep(self.poll_interval)
@@ -0,0 +1,20 @@
+import os
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # optional dependency
+    PdfReader = None
+
+
+def extract_text(file, name):
+    """Best-effort plain text of a resume; empty when the format is unsupported."""
+    extension = os.path.splitext(name)[1].lower()
+    if extension == '.pdf' and PdfReader is not None:
+        try:
+            reader = PdfReader(file)
+            return '\n'.join(page.extract_text() or '' for page in reader.pages).strip()
+        except Exception:
+            return ''
+    if extension == '.txt':
+        return file.read().decode('utf-8', errors='replace').strip()
+    return ''
@@ -0,0 +1,70 @@
+"""
+Primary/replica routing.
+
+Outside of a request (management commands, task workers, the shell)
+everything uses the primary. ReplicaRoutingMiddleware lets safe requests
+read from one replica, chosen per request. The first write of a request
+pins the rest of it to the primary, and a short-lived cookie keeps the
+follow-up requests there too (e.g. the redirect to my_applications after
+applying), so users always read their own writes.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PRIMARY = 'default'
+
+# Sessions, users and queued tasks must never be read stale. Neither must
+# the cache versions: a lagging replica would bring back invalidated pages.
+PRIMARY_ONLY = {'sessions', 'auth', 'job_app.task', 'job_app.cacheversion'}
+
+_routing = ContextVar('replica_routing', default=None)
+
+
+class RequestRouting:
+    def __init__(self, replica):
+        self.replica = replica
+        self.wrote = False
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Routes reads inside the block to a replica until the first write."""
+    available = replicas()
+    routing = RequestRouting(random.choice(available) if enabled and available else None)
+    token = _routing.set(routing)
+    try:
+        yield routing
+    finally:
+        _routing.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if routing is None or routing.replica is None:
+            return PRIMARY
+        if model._meta.app_label in PRIMARY_ONLY or model._meta.label_lower in PRIMARY_ONLY:
+            return PRIMARY
+        return routing.replica
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.wrote = True
+            routing.replica = None
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *replicas()}
+        return obj1._state.db in databases and obj2._state.db in databases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary
+        return db not in replicas()
@@ -0,0 +1,277 @@
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from . import geo
+
+FTS_TABLE = 'job_app_job_fts'
+
+# Maps the search form fields onto the indexed Job columns
+SEARCH_FIELDS = {
+    'title': 'title',
+    'company': 'company_name',
+    'location': 'location',
+    'q': None,  # free text over every indexed column
+}
+
+# The Job field each indexed column is matched against without FTS
+ICONTAINS_FIELDS = {
+    'title': 'title',
+    'company_name': 'company__name',
+    'location': 'location__name',
+    'description': 'description',
+}
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+FTS_COLUMNS = 'title, company_name, location, description'
+
+# Contentless: the company and location names live in their own tables, so
+# the triggers look them up and pass every value in, and rebuild() reindexes
+# from a join. Nothing reads column values back out of the index.
+FTS_TABLE_SQL = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        {FTS_COLUMNS},
+        content='',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+"""
+
+# The triggers read these tables by name, so a migration that remakes
+# job_app_company or job_app_location has to drop them first
+INDEXED_TABLES = {'job_app_job', 'job_app_company', 'job_app_location'}
+COMPANY_NAME_SQL = '(SELECT name FROM job_app_company WHERE id = {job}.company_id)'
+LOCATION_NAME_SQL = '(SELECT name FROM job_app_location WHERE id = {job}.location_id)'
+
+
+def fts_values(job, company=None, location=None):
+    """The indexed values of the job_app_job row ``job`` in a trigger or query."""
+    company = company or COMPANY_NAME_SQL.format(job=job)
+    location = location or LOCATION_NAME_SQL.format(job=job)
+    return f'{job}.id, {job}.title, {company}, {location}, {job}.description'
+
+
+FTS_TRIGGERS_SQL = {
+    f'{FTS_TABLE}_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON job_app_job BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, {FTS_COLUMNS})
+            VALUES ({fts_values('new')});
+        END
+    """,
+    f'{FTS_TABLE}_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON job_app_job BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {FTS_COLUMNS})
+            VALUES ('delete', {fts_values('old')});
+        END
+    """,
+    f'{FTS_TABLE}_au': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+        AFTER UPDATE OF title, company_id, location_id, description ON job_app_job BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {FTS_COLUMNS})
+            VALUES ('delete', {fts_values('old')});
+            INSERT INTO {FTS_TABLE}(rowid, {FTS_COLUMNS})
+            VALUES ({fts_values('new')});
+        END
+    """,
+    # Renaming a company or location reindexes its jobs
+    f'{FTS_TABLE}_company_au': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_company_au
+        AFTER UPDATE OF name ON job_app_company WHEN old.name IS NOT new.name BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {FTS_COLUMNS})
+            SELECT 'delete', {fts_values('job', company='old.name')}
+            FROM job_app_job job WHERE job.company_id = old.id;
+            INSERT INTO {FTS_TABLE}(rowid, {FTS_COLUMNS})
+            SELECT {fts_values('job', company='new.name')}
+            FROM job_app_job job WHERE job.company_id = new.id;
+        END
+    """,
+    f'{FTS_TABLE}_location_au': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_location_au
+        AFTER UPDATE OF name ON job_app_location WHEN old.name IS NOT new.name BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {FTS_COLUMNS})
+            SELECT 'delete', {fts_values('job', location='old.name')}
+            FROM job_app_job job WHERE job.location_id = old.id;
+            INSERT INTO {FTS_TABLE}(rowid, {FTS_COLUMNS})
+            SELECT {fts_values('job', location='new.name')}
+            FROM job_app_job job WHERE job.location_id = new.id;
+        END
+    """,
+}
+
+
+def tokenize(value):
+    return TOKEN_RE.findall(value.lower())
+
+
+class BaseSearchBackend:
+    """Filters a Job queryset by the search form parameters."""
+
+    def search(self, queryset, params, ranked=False):
+        raise NotImplementedError
+
+    def normalize(self, params, using='default'):
+        """
+        Canonical form of the search ``params`` against the database
+        ``using``. Searches matching the same jobs normalize the same, so
+        they share cached counts and facets.
+        """
+        return tuple(
+            (param, ' '.join(params[param].lower().split()))
+            for param in SEARCH_FIELDS if (params.get(param) or '').strip()
+        )
+
+    def install(self, using='default'):
+        pass
+
+    def rebuild(self, using='default'):
+        pass
+
+
+class IContainsSearchBackend(BaseSearchBackend):
+    """Plain substring matching, works on every database."""
+
+    def search(self, queryset, params, ranked=False):
+        for param, column in SEARCH_FIELDS.items():
+            value = params.get(param)
+            if not value:
+                continue
+            if column is None:
+                q = Q()
+                for field in ICONTAINS_FIELDS.values():
+                    q |= Q(**{f'{field}__icontains': value})
+                queryset = queryset.filter(q)
+            else:
+                queryset = queryset.filter(**{f'{ICONTAINS_FIELDS[column]}__icontains': value})
+        return queryset
+
+
+class SQLiteFTSSearchBackend(BaseSearchBackend):
+    """
+    Ranked, tokenized prefix search backed by the FTS5 table created by
+    install(). The index is kept in sync by triggers on job_app_job and the
+    company and location tables, so it also covers bulk inserts and queryset
+    updates.
+    """
+
+    fallback_class = IContainsSearchBackend
+
+    def build_match(self, params):
+        clauses = []
+        for param, column in SEARCH_FIELDS.items():
+            tokens = tokenize(params.get(param) or '')
+            if not tokens:
+                continue
+            phrase = ' AND '.join(f'"{token}"*' for token in tokens)
+            if column is None:
+                clauses.append(f'({phrase})')
+            else:
+                clauses.append(f'{column} : ({phrase})')
+        return ' AND '.join(clauses)
+
+    def normalize(self, params, using='default'):
+        if connections[using].vendor != 'sqlite':
+            return self.fallback_class().normalize(params, using)
+        # Tokens are ANDed, so neither their order nor repeats matter. A value
+        # with no tokens is kept: it matches nothing rather than everything.
+        return tuple(
+            (param, ' '.join(sorted(set(tokenize(params[param])))))
+            for param in SEARCH_FIELDS if (params.get(param) or '').strip()
+        )
+
+    def search(self, queryset, params, ranked=False):
+        # The read may go to a replica (see job_app.routers), not the default database
+        if connections[queryset.db].vendor != 'sqlite':
+            return self.fallback_class().search(queryset, params, ranked)
+
+        match = self.build_match(params)
+        if not match:
+            # Nothing searchable (e.g. punctuation only) - mirror an empty result
+            if any(params.get(param) for param in SEARCH_FIELDS):
+                return queryset.none()
+            return queryset
+
+        queryset = queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', (match,)
+        ))
+        if ranked:
+            # bm25() gathers statistics over the whole match, which a plain
+            # correlated subquery would redo for every job. The MATERIALIZED
+            # CTE runs the MATCH once per query and each job looks its rank up
+            # in the result. Lower is better; title matches weigh the most.
+            queryset = queryset.annotate(search_rank=RawSQL(
+                f'WITH ranked AS MATERIALIZED ('
+                f'SELECT rowid, bm25({FTS_TABLE}, 10.0, 5.0, 3.0, 1.0) AS rank '
+                f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+                f') SELECT rank FROM ranked WHERE ranked.rowid = job_app_job.id',
+                (match,), output_field=FloatField(),
+            )).order_by('search_rank', '-created_at')
+        return queryset
+
+    def install(self, using='default'):
+        """
+        Creates the index and its triggers if they are missing. SQLite drops
+        triggers whenever a migration remakes job_app_job, so this runs after
+        every migrate and rebuilds the index when anything had to be recreated.
+        Before migration 0012 there are no company and location tables to
+        index; the index those migrations create is left alone.
+        """
+        conn = connections[using]
+        if conn.vendor != 'sqlite':
+            return
+        if not INDEXED_TABLES <= set(conn.introspection.table_names()):
+            return
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name LIKE %s",
+                (f'{FTS_TABLE}%',),
+            )
+            existing = {row[0] for row in cursor.fetchall()}
+            missing = [name for name in [FTS_TABLE, *FTS_TRIGGERS_SQL] if name not in existing]
+            if not missing:
+                return
+            cursor.execute(FTS_TABLE_SQL)
+            for statement in FTS_TRIGGERS_SQL.values():
+                cursor.execute(statement)
+        self.rebuild(using)
+
+    def rebuild(self, using='default'):
+        conn = connections[using]
+        if conn.vendor != 'sqlite':
+            return
+        with conn.cursor() as cursor:
+            # 'rebuild' needs a content table; a contentless index is emptied and refilled
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}(rowid, {FTS_COLUMNS}) "
+                f"SELECT {fts_values('job', company='company.name', location='location.name')} "
+                "FROM job_app_job job "
+                "JOIN job_app_company company ON company.id = job.company_id "
+                "JOIN job_app_location location ON location.id = job.location_id"
+            )
+
+
+def get_search_backend():
+    backend = getattr(settings, 'JOB_SEARCH_BACKEND', 'job_app.search.SQLiteFTSSearchBackend')
+    return import_string(backend)()
+
+
+def read_search_params(data):
+    """The search form parameters from a QueryDict; the radius options only apply near a place."""
+    params = {param: data.get(param, '').strip() for param in (*SEARCH_FIELDS, *geo.GEO_PARAMS)}
+    if not params['near']:
+        params['radius'] = params['remote'] = ''
+    return params
+
+
+def search_jobs(queryset, params, ranked=False):
+    """Applies the title/company/location/q filters and the radius search from ``params``."""
+    return geo.filter_near(get_search_backend().search(queryset, params, ranked=ranked), params)
+
+
+def normalize_search(params, using='default'):
+    """The canonical form of ``params`` searched on ``using``; empty when nothing is searched."""
+    return get_search_backend().normalize(params, using) + geo.normalize(params)
@@ -0,0 +1,102 @@
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_in
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import counters, facets, tasks, versions
+from .auth import copy_user_to_session, invalidate_cached_users
+from .cache import bump_catalogue_version
+from .models import Application, Company, Job, Location, Profile, SimilarJob
+
+
+@receiver(post_save, sender=Application)
+def application_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.application_added(instance.job_id, instance.applied_at)
+
+
+@receiver(post_delete, sender=Application)
+def application_deleted(sender, instance, origin=None, **kwargs):
+    # Applications removed along with their job have no counter left to update
+    if isinstance(origin, Job) or (isinstance(origin, QuerySet) and origin.model is Job):
+        return
+    counters.application_removed(instance.job_id)
+
+
+@receiver(post_save, sender=Job)
+@receiver(post_delete, sender=Job)
+def job_changed(sender, instance, **kwargs):
+    bump_catalogue_version()
+
+
+@receiver(pre_save, sender=Job)
+def job_saving(sender, instance, raw=False, update_fields=None, **kwargs):
+    # The facet counts need the values an edited job is moving away from
+    instance._facets_before = None
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and not set(update_fields) & set(facets.FACET_FIELDS):
+        instance._facets_before = facets.facet_values(instance)
+        return
+    instance._facets_before = (
+        Job.objects.filter(pk=instance.pk).values(*facets.FACET_FIELDS).first()
+    )
+
+
+@receiver(post_save, sender=Job)
+def job_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        facets.job_saved(instance, None if created else instance._facets_before)
+        tasks.refresh_similar_jobs.enqueue(instance.id)
+
+
+@receiver(pre_delete, sender=Job)
+def job_deleting(sender, instance, **kwargs):
+    instance._similar_to = list(
+        SimilarJob.objects.filter(similar_job=instance).values_list('job_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Job)
+def job_deleted(sender, instance, **kwargs):
+    facets.job_removed(instance)
+    job_ids = getattr(instance, '_similar_to', [])
+    if job_ids:
+        tasks.refresh_neighbours_of.enqueue(job_ids)
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Company)
+@receiver(post_delete, sender=Location)
+def entity_changed(sender, instance, created=False, raw=False, **kwargs):
+    if created or raw:
+        return
+    # A rename or delete leaves cached ids stale; the new entities version
+    # empties the caches of every process
+    sender.objects.forget()
+    versions.bump_version(versions.ENTITIES)
+    # Job pages show the old name
+    bump_catalogue_version()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, created=False, update_fields=None, **kwargs):
+    # No session holds a copy of a new user yet, and logging in only moves
+    # last_login, which nothing reads from a copy
+    if created or update_fields == frozenset({'last_login'}):
+        return
+    invalidate_cached_users([instance.pk])
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def profile_changed(sender, instance, **kwargs):
+    invalidate_cached_users([instance.user_id])
+
+
+@receiver(user_logged_in)
+def copy_user_on_login(sender, request, user, **kwargs):
+    copy_user_to_session(request.session, user)
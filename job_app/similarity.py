@@ -0,0 +1,161 @@
+"""
+Similar-jobs index based on MinHash signatures with LSH banding.
+
+Each job is reduced to a set of tokens (title, company and description
+words) and a fixed-size MinHash signature estimating Jaccard similarity.
+The signature is split into bands; jobs that share a band bucket become
+candidates, are scored by signature agreement and the top NEIGHBOURS are
+stored in SimilarJob. Refreshing one job touches only its candidates, so
+the cost of an update does not depend on the size of the catalogue.
+"""
+import re
+from array import array
+from hashlib import blake2b
+
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Job, JobSignature, JobSignatureBucket, SimilarJob
+
+NUM_HASHES = 64
+ROWS_PER_BAND = 2  # 32 bands: pairs from ~0.2 Jaccard upwards become candidates
+NEIGHBOURS = 6
+MAX_CANDIDATES = 500
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_PERMUTATIONS = [
+    (
+        int.from_bytes(blake2b(f'a{i}'.encode(), digest_size=8).digest(), 'big') % _MERSENNE_PRIME or 1,
+        int.from_bytes(blake2b(f'b{i}'.encode(), digest_size=8).digest(), 'big') % _MERSENNE_PRIME,
+    )
+    for i in range(NUM_HASHES)
+]
+
+_WORD_RE = re.compile(r'[a-z0-9+#]+')
+STOPWORDS = frozenset('''
+    a an and are as at be by for from has have in is it its of on or our the to
+    we will with you your this that who what their they us all any can
+'''.split())
+
+
+def _words(text):
+    return {w for w in _WORD_RE.findall(text.lower()) if w not in STOPWORDS and len(w) > 1}
+
+
+def job_tokens(job):
+    tokens = {f't:{w}' for w in _words(job.title)}
+    tokens |= _words(job.description)
+    tokens.add(f'c:{job.company_id}')
+    return tokens
+
+
+def minhash(tokens):
+    signature = [_MAX_HASH] * NUM_HASHES
+    for token in tokens:
+        value = int.from_bytes(blake2b(token.encode(), digest_size=8).digest(), 'big')
+        for i, (a, b) in enumerate(_PERMUTATIONS):
+            hashed = ((a * value + b) % _MERSENNE_PRIME) & _MAX_HASH
+            if hashed < signature[i]:
+                signature[i] = hashed
+    return signature
+
+
+def band_buckets(signature):
+    buckets = []
+    for band, start in enumerate(range(0, NUM_HASHES, ROWS_PER_BAND)):
+        rows = array('I', [band, *signature[start:start + ROWS_PER_BAND]]).tobytes()
+        buckets.append(int.from_bytes(blake2b(rows, digest_size=8).digest(), 'big', signed=True))
+    return buckets
+
+
+def similarity(left, right):
+    return sum(1 for a, b in zip(left, right) if a == b) / NUM_HASHES
+
+
+def pack(signature):
+    return array('I', signature).tobytes()
+
+
+def unpack(data):
+    signature = array('I')
+    signature.frombytes(bytes(data))
+    return signature.tolist()
+
+
+def _store_neighbours(job_id, scored):
+    SimilarJob.objects.filter(job_id=job_id).delete()
+    SimilarJob.objects.bulk_create([
+        SimilarJob(job_id=job_id, similar_job_id=other_id, score=score, rank=rank)
+        for rank, (score, other_id) in enumerate(scored[:NEIGHBOURS])
+    ])
+
+
+def _top(scored):
+    # Highest score first, newer jobs win ties
+    return sorted(scored, key=lambda item: (-item[0], -item[1]))[:NEIGHBOURS]
+
+
+@transaction.atomic
+def refresh_similar_jobs(job):
+    """Recomputes the signature of ``job`` and the neighbour lists it affects."""
+    signature = minhash(job_tokens(job))
+    buckets = band_buckets(signature)
+    JobSignature.objects.update_or_create(job_id=job.id, defaults={'minhash': pack(signature)})
+    JobSignatureBucket.objects.filter(job_id=job.id).delete()
+    JobSignatureBucket.objects.bulk_create([JobSignatureBucket(job_id=job.id, bucket=b) for b in buckets])
+
+    # Jobs sharing more bands are likelier neighbours, so a capped candidate
+    # list keeps those; ties go to newer jobs so the cut is deterministic
+    candidate_ids = list(
+        JobSignatureBucket.objects.filter(bucket__in=buckets)
+        .exclude(job_id=job.id)
+        .values('job_id')
+        .annotate(shared=Count('id'))
+        .order_by('-shared', '-job_id')
+        .values_list('job_id', flat=True)[:MAX_CANDIDATES]
+    )
+    signatures = {
+        row.job_id: unpack(row.minhash)
+        for row in JobSignature.objects.filter(job_id__in=candidate_ids)
+    }
+    scores = {other_id: similarity(signature, other) for other_id, other in signatures.items()}
+    _store_neighbours(job.id, _top([(score, other_id) for other_id, score in scores.items() if score > 0]))
+
+    # Merge this job into the candidates' own lists, and drop it from lists
+    # it no longer belongs to after an edit
+    previous = set(SimilarJob.objects.filter(similar_job_id=job.id).values_list('job_id', flat=True))
+    affected = set(scores) | previous
+    existing = {}
+    for entry in SimilarJob.objects.filter(job_id__in=affected).exclude(similar_job_id=job.id):
+        existing.setdefault(entry.job_id, []).append((entry.score, entry.similar_job_id))
+    for other_id in affected:
+        current = existing.get(other_id, [])
+        score = scores.get(other_id, 0)
+        if score > 0 and (len(current) < NEIGHBOURS or score > min(current)[0]):
+            current.append((score, job.id))
+        elif other_id not in previous:
+            continue
+        _store_neighbours(other_id, _top(current))
+
+
+def refresh_neighbours_of(job_ids):
+    """Refills the lists of jobs that pointed at a deleted job."""
+    for job in Job.objects.filter(id__in=job_ids):
+        refresh_similar_jobs(job)
+
+
+def _similar_entries(job, limit):
+    return (
+        SimilarJob.objects.filter(job=job)
+        .select_related('similar_job__company', 'similar_job__location')
+        .order_by('rank')[:limit]
+    )
+
+
+def get_similar_jobs(job, limit=3):
+    return [entry.similar_job for entry in _similar_entries(job, limit)]
+
+
+async def aget_similar_jobs(job, limit=3):
+    return [entry.similar_job async for entry in _similar_entries(job, limit)]
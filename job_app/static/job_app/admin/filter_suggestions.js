@@ -0,0 +1,24 @@
+'use strict';
+{
+    // Suggestions for the text box filters of job_app.admin.CappedValuesFieldListFilter
+    document.addEventListener('input', function(event) {
+        const input = event.target;
+        if (!input.dataset || !input.dataset.suggestionsUrl) {
+            return;
+        }
+        clearTimeout(input.suggestionsTimer);
+        input.suggestionsTimer = setTimeout(function() {
+            const url = input.dataset.suggestionsUrl + '?term=' + encodeURIComponent(input.value);
+            fetch(url, {credentials: 'same-origin'})
+                .then((response) => response.json())
+                .then(function(data) {
+                    const list = document.getElementById(input.getAttribute('list'));
+                    list.replaceChildren(...data.results.map(function(value) {
+                        const option = document.createElement('option');
+                        option.value = value;
+                        return option;
+                    }));
+                });
+        }, 200);
+    });
+}
@@ -0,0 +1,61 @@
+// File upload handling
+const fileInput = document.getElementById('resume');
+const fileInfo = document.getElementById('file-info');
+const fileName = document.getElementById('file-name');
+const removeFile = document.getElementById('remove-file');
+
+fileInput.addEventListener('change', function(e) {
+    const file = e.target.files[0];
+    if (file) {
+        fileName.textContent = file.name;
+        fileInfo.classList.remove('hidden');
+    } else {
+        fileInfo.classList.add('hidden');
+    }
+});
+
+removeFile.addEventListener('click', function() {
+    fileInput.value = '';
+    fileInfo.classList.add('hidden');
+});
+
+// Drag and drop functionality
+const dropZone = fileInput.closest('.border-dashed');
+
+['dragenter', 'dragover', 'dragleave', 'drop'].forEach(eventName => {
+    dropZone.addEventListener(eventName, preventDefaults, false);
+});
+
+function preventDefaults(e) {
+    e.preventDefault();
+    e.stopPropagation();
+}
+
+['dragenter', 'dragover'].forEach(eventName => {
+    dropZone.addEventListener(eventName, highlight, false);
+});
+
+['dragleave', 'drop'].forEach(eventName => {
+    dropZone.addEventListener(eventName, unhighlight, false);
+});
+
+function highlight(e) {
+    dropZone.classList.add('border-primary');
+}
+
+function unhighlight(e) {
+    dropZone.classList.remove('border-primary');
+}
+
+dropZone.addEventListener('drop', handleDrop, false);
+
+function handleDrop(e) {
+    const dt = e.dataTransfer;
+    const files = dt.files;
+    fileInput.files = files;
+
+    if (files.length > 0) {
+        fileName.textContent = files[0].name;
+        fileInfo.classList.remove('hidden');
+    }
+}
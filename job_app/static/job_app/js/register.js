@@ -0,0 +1,25 @@
+// Handle role selection styling
+document.querySelectorAll('input[name="role"]').forEach(function(radio) {
+    radio.addEventListener('change', function() {
+        // Remove selected styling from all labels
+        document.querySelectorAll('input[name="role"]').forEach(function(r) {
+            r.closest('label').classList.remove('border-primary', 'ring-2', 'ring-primary');
+            r.closest('label').classList.add('border-gray-300');
+        });
+
+        // Add selected styling to checked label
+        if (this.checked) {
+            this.closest('label').classList.remove('border-gray-300');
+            this.closest('label').classList.add('border-primary', 'ring-2', 'ring-primary');
+        }
+    });
+});
+
+// Initialize styling for pre-selected role
+document.addEventListener('DOMContentLoaded', function() {
+    const checkedRole = document.querySelector('input[name="role"]:checked');
+    if (checkedRole) {
+        checkedRole.closest('label').classList.remove('border-gray-300');
+        checkedRole.closest('label').classList.add('border-primary', 'ring-2', 'ring-primary');
+    }
+});
@@ -0,0 +1,211 @@
+"""
+Fingerprinted, precompressed static files and the handler that serves them.
+
+``collectstatic`` with CompressedManifestStaticFilesStorage writes every file
+under a content-hashed name plus ``.gz`` (and, when the brotli package is
+installed, ``.br``) siblings. StaticFilesMiddleware wraps the WSGI or ASGI
+application and answers STATIC_URL requests from STATIC_ROOT before Django
+sees them: it picks the best encoding the client accepts, and hashed names are
+cached by browsers for a year since their content never changes.
+"""
+import gzip
+import mimetypes
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from wsgiref.util import FileWrapper
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.mjs', '.map', '.json', '.svg', '.txt', '.xml', '.html'}
+# Smaller files are not worth an extra variant
+MIN_COMPRESS_SIZE = 256
+# Best encoding first
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+CHUNK_SIZE = 64 * 1024
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage that also writes gzip and brotli variants."""
+
+    def stored_name(self, name):
+        # Without a manifest (collectstatic has not run, e.g. in tests) fall
+        # back to the source names; once it exists, missing entries still raise
+        if not self.hashed_files and not self.exists(self.manifest_name):
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        processed = set()
+        for name, hashed_name, result in super().post_process(paths, dry_run, **options):
+            if not isinstance(result, Exception):
+                processed.update([name, hashed_name])
+            yield name, hashed_name, result
+        if dry_run:
+            return
+        for name in sorted(filter(None, processed)):
+            if os.path.splitext(name)[1] in COMPRESSIBLE_EXTENSIONS:
+                self.compress(name)
+
+    def compress(self, name):
+        path = Path(self.path(name))
+        data = path.read_bytes()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants['.br'] = brotli.compress(data)
+        for suffix, compressed in variants.items():
+            variant = path.with_name(path.name + suffix)
+            # Only keep variants that save at least 5%
+            if len(compressed) < len(data) * 0.95:
+                variant.write_bytes(compressed)
+            elif variant.exists():
+                variant.unlink()
+
+
+class StaticFile:
+    def __init__(self, path, immutable):
+        stat = path.stat()
+        self.path = path
+        self.size = stat.st_size
+        self.mtime = int(stat.st_mtime)
+        self.content_type = mimetypes.guess_type(path.name)[0] or 'application/octet-stream'
+        if self.content_type.startswith('text/') or self.content_type in ('application/javascript', 'image/svg+xml'):
+            self.content_type += '; charset=utf-8'
+        self.immutable = immutable
+        self.variants = {
+            encoding: (variant, variant.stat().st_size)
+            for encoding, suffix in ENCODINGS
+            if (variant := path.with_name(path.name + suffix)).exists()
+        }
+
+    def select(self, accept_encoding):
+        """Returns the (encoding, path, size) to send for an Accept-Encoding header."""
+        accepted = {part.split(';')[0].strip() for part in accept_encoding.split(',')}
+        for encoding, (variant, size) in self.variants.items():
+            if encoding in accepted:
+                return encoding, variant, size
+        return None, self.path, self.size
+
+    def headers(self, encoding, size):
+        etag = f'"{self.mtime:x}-{self.size:x}{"-" + encoding if encoding else ""}"'
+        max_age = 365 * 24 * 60 * 60 if self.immutable else settings.STATIC_MAX_AGE
+        headers = [
+            ('Content-Type', self.content_type),
+            ('Content-Length', str(size)),
+            ('Last-Modified', formatdate(self.mtime, usegmt=True)),
+            ('ETag', etag),
+            ('Cache-Control', f'public, max-age={max_age}' + (', immutable' if self.immutable else '')),
+        ]
+        if self.variants:
+            headers.append(('Vary', 'Accept-Encoding'))
+        if encoding:
+            headers.append(('Content-Encoding', encoding))
+        return headers
+
+    def not_modified(self, etag, if_none_match, if_modified_since):
+        if if_none_match:
+            return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+        if if_modified_since:
+            try:
+                return self.mtime <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def respond(self, method, request_headers):
+        """
+        Returns (status, headers, path); path is None when there is no body
+        to send (HEAD, 304, 405).
+        """
+        if method not in ('GET', 'HEAD'):
+            return '405 Method Not Allowed', [('Allow', 'GET, HEAD'), ('Content-Length', '0')], None
+        encoding, path, size = self.select(request_headers.get('accept-encoding', ''))
+        headers = self.headers(encoding, size)
+        etag = dict(headers)['ETag']
+        if self.not_modified(etag, request_headers.get('if-none-match'), request_headers.get('if-modified-since')):
+            return '304 Not Modified', [
+                (name, value) for name, value in headers if name not in ('Content-Length', 'Content-Encoding')
+            ], None
+        return '200 OK', headers, path if method == 'GET' else None
+
+
+def scan_static_root():
+    """Maps URL paths under STATIC_URL to StaticFile entries for STATIC_ROOT."""
+    root = Path(settings.STATIC_ROOT) if settings.STATIC_ROOT else None
+    if root is None or not root.is_dir():
+        return {}
+    hashed_names = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+    files = {}
+    for dirpath, _dirnames, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith(('.gz', '.br')):
+                continue
+            path = Path(dirpath) / filename
+            name = path.relative_to(root).as_posix()
+            files[name] = StaticFile(path, immutable=name in hashed_names)
+    return files
+
+
+class StaticFilesMiddleware:
+    """
+    Serves collected static files in front of the WSGI or ASGI application.
+
+    The file index is built once at startup, so restart workers after
+    ``collectstatic``. Paths it does not know fall through to Django.
+    """
+    def __init__(self, application):
+        self.application = application
+        self.prefix = settings.STATIC_URL
+        self.files = scan_static_root()
+
+    def find(self, path):
+        if self.files and path.startswith(self.prefix):
+            return self.files.get(path[len(self.prefix):])
+        return None
+
+    def __call__(self, environ, start_response):
+        static_file = self.find(environ.get('PATH_INFO', ''))
+        if static_file is None:
+            return self.application(environ, start_response)
+        request_headers = {
+            key[5:].replace('_', '-').lower(): value
+            for key, value in environ.items() if key.startswith('HTTP_')
+        }
+        status, headers, path = static_file.respond(environ['REQUEST_METHOD'], request_headers)
+        start_response(status, headers)
+        if path is None:
+            return []
+        file_wrapper = environ.get('wsgi.file_wrapper', FileWrapper)
+        return file_wrapper(open(path, 'rb'), CHUNK_SIZE)
+
+
+class ASGIStaticFilesMiddleware(StaticFilesMiddleware):
+    async def __call__(self, scope, receive, send):
+        static_file = self.find(scope['path']) if scope['type'] == 'http' else None
+        if static_file is None:
+            return await self.application(scope, receive, send)
+        request_headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+        status, headers, path = static_file.respond(scope['method'], request_headers)
+        await send({
+            'type': 'http.response.start',
+            'status': int(status.split()[0]),
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+        })
+        if path is None:
+            return await send({'type': 'http.response.body', 'body': b''})
+        with open(path, 'rb') as file:
+            while True:
+                chunk = await sync_to_async(file.read, thread_sensitive=False)(CHUNK_SIZE)
+                more = len(chunk) == CHUNK_SIZE
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': more})
+                if not more:
+                    break
@@ -0,0 +1,150 @@
+"""
+Streamed, incrementally gzipped HTML for long list pages.
+
+A streamed page is rendered once, with a placeholder where its rows go (the
+``{% render_rows %}`` tag emits it for a StreamedKeysetPage), and split there.
+The part before the rows is sent as soon as the first row has been read, and
+the rows follow in batches straight off a server-side cursor. The pagination
+cursors are only known after the last row, so the template puts the parts
+that show them in ``{% after_rows %}`` blocks; on streamed pages those are
+rendered from the captured context once the rows are out. Memory stays at
+one batch of rows whatever the page size.
+
+Django's GZipMiddleware only hands compressed bytes on when zlib's buffer
+fills, which would hold the head back; here every batch is sync-flushed.
+QueryInstrumentationMiddleware keeps counting while the body is sent, so
+the rows count against the view's budget.
+"""
+import re
+import zlib
+from contextlib import contextmanager
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+from django.template.context import make_context
+from django.template.loader import get_template
+from django.utils.cache import patch_vary_headers
+from django.utils.safestring import mark_safe
+
+ROWS_PLACEHOLDER = mark_safe('<!--streamed-rows-->')
+AFTER_ROWS_PLACEHOLDER = mark_safe('<!--after-streamed-rows-->')
+ACCEPTS_GZIP_RE = re.compile(r'\bgzip\b')
+GZIP_LEVEL = 6
+
+
+def render_rows(template, context, rows, name):
+    """Renders the engine ``template`` once per row, with the row as ``name``."""
+    html = []
+    for row in rows:
+        with context.push({name: row}):
+            html.append(template.render(context))
+    return mark_safe(''.join(html))
+
+
+def split_page(template_name, html):
+    head, placeholder, tail = html.partition(ROWS_PLACEHOLDER)
+    if not placeholder:
+        raise ValueError(f'{template_name} does not render its rows with {{% render_rows %}}')
+    if AFTER_ROWS_PLACEHOLDER in head:
+        raise ValueError(f'{template_name} has an {{% after_rows %}} block before its rows')
+    return head, tail
+
+
+def render_after_rows(tail, page):
+    """``tail`` with its {% after_rows %} blocks rendered, now that ``page`` has been read."""
+    parts = tail.split(AFTER_ROWS_PLACEHOLDER)
+    html = [parts[0]]
+    for render, part in zip(page.after_rows, parts[1:]):
+        html += [render(), part]
+    return ''.join(html)
+
+
+def gzip_chunks(chunks):
+    # wbits=31 writes the gzip header and trailer
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        # The sync flush sends each chunk now instead of once zlib's buffer
+        # fills; it costs a few bytes per chunk
+        yield compressor.compress(chunk.encode()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+async def agzip_chunks(chunks):
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        yield compressor.compress(chunk.encode()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def streaming_response(request, chunks, is_async=False):
+    gzipped = bool(ACCEPTS_GZIP_RE.search(request.META.get('HTTP_ACCEPT_ENCODING', '')))
+    if is_async:
+        chunks = agzip_chunks(chunks) if gzipped else _aencode(chunks)
+    else:
+        chunks = gzip_chunks(chunks) if gzipped else (chunk.encode() for chunk in chunks)
+    response = StreamingHttpResponse(chunks, content_type='text/html; charset=utf-8')
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if gzipped:
+        response['Content-Encoding'] = 'gzip'
+    # Ask nginx to pass the chunks on as they come instead of buffering them
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def _aencode(chunks):
+    async for chunk in chunks:
+        yield chunk.encode()
+
+
+@contextmanager
+def row_renderer(request, context, row_template, row_name):
+    """Yields a function rendering a batch of rows with one RequestContext."""
+    template = get_template(row_template).template
+    context = make_context(context, request)
+    # Binding runs the context processors, once rather than per row
+    with context.bind_template(template):
+        yield lambda rows: render_rows(template, context, rows, row_name)
+
+
+def stream_template(request, template_name, context, page, row_template, row_name):
+    """
+    A StreamingHttpResponse for ``template_name`` whose rows, the
+    StreamedKeysetPage ``page``, are each rendered with ``row_template``.
+    """
+    template = get_template(template_name)
+    page.open()
+    head, tail = split_page(template_name, template.render(context, request))
+
+    def chunks():
+        yield head
+        with row_renderer(request, context, row_template, row_name) as render_batch:
+            rows = iter(page)
+            while batch := list(islice(rows, page.chunk_size)):
+                yield render_batch(batch)
+        yield render_after_rows(tail, page)
+
+    return streaming_response(request, chunks())
+
+
+async def astream_template(request, template_name, context, page, row_template, row_name):
+    """Async version of stream_template(), reading the rows with aiterator()."""
+    template = get_template(template_name)
+    await page.aopen()
+    head, tail = split_page(template_name, await sync_to_async(template.render)(context, request))
+
+    async def chunks():
+        yield head
+        with row_renderer(request, context, row_template, row_name) as render_batch:
+            batch = []
+            async for row in page:
+                batch.append(row)
+                if len(batch) == page.chunk_size:
+                    # Templates may still touch lazy relations, so render in a thread
+                    yield await sync_to_async(render_batch)(batch)
+                    batch = []
+            if batch:
+                yield await sync_to_async(render_batch)(batch)
+        yield await sync_to_async(render_after_rows)(tail, page)
+
+    return streaming_response(request, chunks(), is_async=True)
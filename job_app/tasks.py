@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail import send_mail
+
+from . import similarity
+from .models import Application, Job
+from .queue import task
+from .resumes import extract_text
+
+
+@task(concurrency=2)
+def extract_resume_text(application_id):
+    application = Application.objects.filter(id=application_id).first()
+    if application is None or not application.resume or application.resume_text:
+        return
+    # Identical resumes share one stored file, so reuse any earlier extraction
+    text = (
+        Application.objects.filter(resume_sha256=application.resume_sha256)
+        .exclude(resume_text='')
+        .values_list('resume_text', flat=True)
+        .first()
+    )
+    if text is None:
+        with application.resume.open('rb') as resume:
+            text = extract_text(resume, application.resume.name)
+    Application.objects.filter(resume_sha256=application.resume_sha256, resume_text='').update(resume_text=text)
+
+
+@task
+def notify_employer_of_application(application_id):
+    application = (
+        Application.objects.select_related('job__posted_by', 'job__company', 'applicant')
+        .filter(id=application_id)
+        .first()
+    )
+    if application is None or not application.job.posted_by.email:
+        return
+    applicant = application.applicant
+    send_mail(
+        f'New application for "{application.job.title}"',
+        f'{applicant.get_full_name() or applicant.username} applied to "{application.job.title}" '
+        f'at {application.job.company.name}.',
+        settings.DEFAULT_FROM_EMAIL,
+        [application.job.posted_by.email],
+    )
+
+
+@task
+def send_welcome_email(user_id):
+    user = User.objects.filter(id=user_id).first()
+    if user is None or not user.email:
+        return
+    send_mail(
+        'Welcome to Job Portal',
+        f'Hi {user.first_name or user.username}, your account is ready.',
+        settings.DEFAULT_FROM_EMAIL,
+        [user.email],
+    )
+
+
+# Similar-jobs maintenance rewrites neighbour lists, one worker at a time
+@task(concurrency=1)
+def refresh_similar_jobs(job_id):
+    job = Job.objects.filter(id=job_id).first()
+    if job is not None:
+        similarity.refresh_similar_jobs(job)
+
+
+@task(concurrency=1)
+def refresh_neighbours_of(job_ids):
+    similarity.refresh_neighbours_of(job_ids)
+
+
+# Queued by import_jobs, since bulk_create does not send post_save
+@task(concurrency=1)
+def refresh_similar_jobs_batch(job_ids):
+    for job in Job.objects.filter(id__in=job_ids).order_by('id'):
+        similarity.refresh_similar_jobs(job)
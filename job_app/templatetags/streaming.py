@@ -0,0 +1,50 @@
+from functools import partial
+
+from django import template
+
+from ..streaming import AFTER_ROWS_PLACEHOLDER, ROWS_PLACEHOLDER, render_rows as render_row_template
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def render_rows(context, rows, template_name, name):
+    """
+    Renders ``template_name`` once per row with the row as ``name``, like an
+    ``{% include %}`` in a for loop. Streamed pages (job_app.streaming) get a
+    placeholder instead and their rows are sent in its place.
+    """
+    if getattr(rows, 'streamed', False):
+        return ROWS_PLACEHOLDER
+    row_template = context.template.engine.get_template(template_name)
+    return render_row_template(row_template, context, rows, name)
+
+
+class AfterRowsNode(template.Node):
+    def __init__(self, page, nodelist):
+        self.page = page
+        self.nodelist = nodelist
+
+    def render(self, context):
+        page = self.page.resolve(context)
+        if not getattr(page, 'streamed', False):
+            return self.nodelist.render(context)
+        # Rendered by job_app.streaming once the rows have been sent
+        page.after_rows.append(partial(self.nodelist.render, context.new(context.flatten())))
+        return AFTER_ROWS_PLACEHOLDER
+
+
+@register.tag
+def after_rows(parser, token):
+    """
+    ``{% after_rows page %}...{% endafter_rows %}`` renders its content in
+    place, except on streamed pages: there it is rendered after the rows
+    have been sent, when the page's cursors are known. It must come after
+    ``{% render_rows %}``.
+    """
+    bits = token.split_contents()
+    if len(bits) != 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes the page as its only argument")
+    nodelist = parser.parse(('endafter_rows',))
+    parser.delete_first_token()
+    return AfterRowsNode(parser.compile_filter(bits[1]), nodelist)
@@ -0,0 +1,42 @@
+from django.test.utils import override_settings
+
+
+class QueryBudgetTestMixin:
+    """
+    Test case mixin for QueryInstrumentationMiddleware.
+
+    Requests to views that go over their declared budget raise
+    QueryBudgetExceeded, and the assertions below check the recorded
+    statistics of a single response.
+    """
+
+    def setUp(self):
+        super().setUp()
+        strict = override_settings(QUERY_BUDGET_STRICT=True)
+        strict.enable()
+        self.addCleanup(strict.disable)
+
+    @staticmethod
+    def _request(response):
+        # Client responses carry wsgi_request, AsyncClient ones asgi_request
+        return getattr(response, 'wsgi_request', None) or response.asgi_request
+
+    def assertQueryBudget(self, response, budget=None):
+        stats = response.query_stats
+        request = self._request(response)
+        if budget is None:
+            budget = request.query_budget
+        self.assertIsNotNone(budget, f'{request.path} declares no query budget')
+        self.assertLessEqual(
+            stats.count, budget,
+            f'{request.path} ran {stats.count} queries, budget is {budget}:\n'
+            + '\n'.join(stats.fingerprints),
+        )
+
+    def assertNoRepeatedQueries(self, response, threshold=None):
+        repeated = response.query_stats.repeated(threshold)
+        self.assertFalse(
+            repeated,
+            f'{self._request(response).path} repeats queries (N+1?):\n'
+            + '\n'.join(f'{n}x {sql}' for sql, n in repeated.items()),
+        )
@@ -1,3 +1,1531 @@
-from django.test import TestCase
+import csv
+import gzip
+import hashlib
+import io
+import os
+import re
+import tempfile
+import zipfile
+from datetime import timedelta
+from unittest import mock, skipUnless
+from urllib.parse import unquote
+from xml.etree import ElementTree
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+
+from django.conf import settings
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import F
+from django.http import HttpResponse
+from django.template.backends.django import Template as DjangoTemplate
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .admin import ProfileAdmin
+from .backends.sqlite3.base import DatabaseWrapper
+from .auth import CachedModelBackend
+from .benchmarks import SCENARIOS, compare, generate, load_baseline, percentile, save_baseline
+from .cache import bump_catalogue_version
+from .entities import LRUCache
+from .geo import bounding_boxes, distance_km
+from .gazetteer import geocode
+from .middleware import QueryBudgetExceeded, ReplicaRoutingMiddleware
+from .models import Application, CacheVersion, Company, Job, Location, Profile, SimilarJob, Task
+from .pagination import InvalidCursor, KeysetPaginator
+from .queue import Worker, claim_tasks, run_task, task
+from .routers import PrimaryReplicaRouter, replica_reads
+from .search import normalize_search, search_jobs
+from . import similarity, tasks
+from .staticfiles import StaticFilesMiddleware
+from .testing import QueryBudgetTestMixin
+from .uploads import ResumeUploadHandler
+
+# "SCAN job_app_job" with no index clause means SQLite reads the whole table
+FULL_SCAN_RE = re.compile(r'^SCAN (\w+)$')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'The FTS5 index is SQLite specific')
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employer = User.objects.create_user('employer', password='pass12345')
+        cls.jobs = {}
+        for title, company, location, description in [
+            ('Python Developer', 'Acme', 'Berlin', 'Django services'),
+            ('Data Engineer', 'Initech', 'Zürich', 'Python pipelines'),
+            ('Office Manager', 'Acme', 'Remote', 'Scheduling'),
+        ]:
+            cls.jobs[title] = Job.objects.create(
+                title=title, company_id=Company.objects.intern(company),
+                location_id=Location.objects.intern(location), description=description, posted_by=cls.employer,
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def titles(self, params, ranked=False):
+        jobs = search_jobs(Job.objects.all(), params, ranked=ranked)
+        return [job.title for job in jobs] if ranked else sorted(job.title for job in jobs)
+
+    def test_fields_and_prefixes(self):
+        self.assertEqual(self.titles({'q': 'pyth'}), ['Data Engineer', 'Python Developer'])
+        self.assertEqual(self.titles({'title': 'python'}), ['Python Developer'])
+        self.assertEqual(self.titles({'company': 'acme', 'q': 'django'}), ['Python Developer'])
+        # Diacritics are folded and punctuation-only values match nothing
+        self.assertEqual(self.titles({'location': 'zurich'}), ['Data Engineer'])
+        self.assertEqual(self.titles({'title': '!!'}), [])
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.titles({'q': 'python'}, ranked=True), ['Python Developer', 'Data Engineer'])
+        response = self.client.get(reverse('home'), {'q': 'python'})
+        self.assertEqual([job.title for job in response.context['recent_jobs']], ['Python Developer', 'Data Engineer'])
+
+    def test_ranked_search_composes_and_matches_once(self):
+        jobs = search_jobs(Job.objects.filter(company__name='Acme'), {'q': 'python'}, ranked=True)
+        self.assertEqual(jobs.count(), 1)
+        self.assertEqual(list(jobs.values_list('title', flat=True)), ['Python Developer'])
+        self.assertLess(jobs.get().search_rank, 0)
+        # The ranks come from one materialized MATCH; ranking each job on its
+        # own would constrain the index by rowid ('=M' in the plan)
+        sql, params = jobs.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = [row[-1] for row in cursor.fetchall()]
+        self.assertIn('MATERIALIZE ranked', plan)
+        self.assertNotIn('=M', ' '.join(line for line in plan if 'job_app_job_fts' in line))
+
+    def test_index_follows_job_changes(self):
+        job = self.jobs['Office Manager']
+        job.title = 'Rust Developer'
+        job.save()
+        self.assertEqual(self.titles({'title': 'rust'}), ['Rust Developer'])
+        self.assertEqual(self.titles({'title': 'office'}), [])
+        job.delete()
+        self.assertEqual(self.titles({'title': 'rust'}), [])
+        call_command('rebuild_search_index', stdout=io.StringIO())
+        self.assertEqual(self.titles({'q': 'python'}), ['Data Engineer', 'Python Developer'])
+
+    @override_settings(JOB_SEARCH_BACKEND='job_app.search.IContainsSearchBackend')
+    def test_icontains_fallback(self):
+        self.assertEqual(self.titles({'q': 'pipelines'}), ['Data Engineer'])
+        self.assertEqual(self.titles({'company': 'acm', 'title': 'manager'}), ['Office Manager'])
+
+    def test_backend_follows_the_queryset_database(self):
+        # A replica on another database gets the fallback whatever the default is
+        databases = {'default': connection, 'replica': mock.Mock(vendor='postgresql')}
+        with mock.patch('job_app.search.connections', databases):
+            sql = str(search_jobs(Job.objects.using('replica'), {'q': 'pipelines'}).query)
+            self.assertNotIn('MATCH', sql)
+            self.assertIn('LIKE', sql)
+            self.assertEqual(normalize_search({'q': 'Python  pipelines'}, 'replica'), (('q', 'python pipelines'),))
+            self.assertEqual(normalize_search({'q': 'Python  pipelines'}), (('q', 'pipelines python'),))
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        employer = User.objects.create_user('employer', password='pass12345')
+        cls.jobs = [
+            Job.objects.create(title=f'Job {i}', company_id=Company.objects.intern('Acme'),
+                               location_id=Location.objects.intern('Remote'), description='Work', posted_by=employer)
+            for i in range(7)
+        ]
+        # Ties on created_at are broken by id
+        Job.objects.filter(pk__in=[job.pk for job in cls.jobs[2:5]]).update(created_at=cls.jobs[2].created_at)
+
+    def setUp(self):
+        self.paginator = KeysetPaginator(Job.objects.all(), ('-created_at', '-id'), per_page=3)
+
+    def titles(self, page):
+        return [job.title for job in page]
+
+    def test_walks_forward_and_back(self):
+        expected = [job.title for job in Job.objects.order_by('-created_at', '-id')]
+        first = self.paginator.page()
+        second = self.paginator.page(first.next_cursor)
+        third = self.paginator.page(second.next_cursor)
+        self.assertEqual(self.titles(first) + self.titles(second) + self.titles(third), expected)
+        self.assertFalse(first.has_previous)
+        self.assertFalse(third.has_next)
+        self.assertEqual(self.titles(self.paginator.page(third.previous_cursor)), self.titles(second))
+        back = self.paginator.page(second.previous_cursor)
+        self.assertEqual(self.titles(back), self.titles(first))
+        self.assertFalse(back.has_previous)
+
+    def test_invalid_cursors(self):
+        with self.assertRaises(InvalidCursor):
+            self.paginator.decode_cursor('not-a-cursor')
+        response = self.client.get(reverse('job_listings'), {'cursor': 'tampered'})
+        self.assertEqual(len(response.context['page']), 7)
+
+    def test_listing_pages(self):
+        response = self.client.get(reverse('job_listings'), {'per_page': 5})
+        self.assertEqual(self.titles(response.context['page']), ['Job 6', 'Job 5', 'Job 4', 'Job 3', 'Job 2'])
+        response = self.client.get(reverse('job_listings'), {'per_page': 5, 'cursor': response.context['page'].next_cursor})
+        self.assertEqual(self.titles(response.context['page']), ['Job 1', 'Job 0'])
+
+
+class ApplicationCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        employer = User.objects.create_user('employer', password='pass12345')
+        cls.job = Job.objects.create(title='Data Engineer', company_id=Company.objects.intern('Acme'),
+                                     location_id=Location.objects.intern('Remote'), description='Work',
+                                     posted_by=employer)
+        cls.applicants = [User.objects.create_user(f'applicant{i}') for i in range(3)]
+
+    def apply(self, applicant):
+        return Application.objects.create(job=self.job, applicant=applicant, cover_letter='Hi', resume='resumes/cv.pdf')
+
+    def test_counters_follow_applications(self):
+        first, second = self.apply(self.applicants[0]), self.apply(self.applicants[1])
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.applications_count, self.job.last_applied_at), (2, second.applied_at))
+        second.delete()
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.applications_count, self.job.last_applied_at), (1, first.applied_at))
+        first.delete()
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.applications_count, self.job.last_applied_at), (0, None))
+
+    def test_rebuild_command(self):
+        application = self.apply(self.applicants[2])
+        Job.objects.update(applications_count=7, last_applied_at=None)
+        call_command('rebuild_application_counters', '--batch-size', '1', stdout=io.StringIO())
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.applications_count, self.job.last_applied_at), (1, application.applied_at))
+
+
+class ResumeUploadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        employer = User.objects.create_user('employer', password='pass12345')
+        cls.job = Job.objects.create(title='Data Engineer', company_id=Company.objects.intern('Acme'),
+                                     location_id=Location.objects.intern('Remote'), description='Work',
+                                     posted_by=employer)
+        cls.applicants = [User.objects.create_user(f'applicant{i}') for i in range(2)]
+        for applicant in cls.applicants:
+            Profile.objects.create(user=applicant, role='applicant')
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.media_root = media_root.name
+        temp_dir = f'{self.media_root}/tmp'
+        os.makedirs(temp_dir)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, FILE_UPLOAD_TEMP_DIR=temp_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def apply(self, applicant, name, content):
+        self.client.force_login(applicant)
+        return self.client.post(reverse('apply_to_job', args=[self.job.id]), {
+            'cover_letter': 'Hello', 'resume': SimpleUploadedFile(name, content, 'text/plain'),
+        })
+
+    def stored_files(self):
+        return [os.path.join(root, name) for root, _dirs, names in os.walk(f'{self.media_root}/resumes')
+                for name in names]
+
+    def test_identical_resumes_share_one_file(self):
+        content = b'Python developer, ten years of Django'
+        self.assertRedirects(self.apply(self.applicants[0], 'cv.TXT', content), reverse('my_applications'))
+        self.assertRedirects(self.apply(self.applicants[1], 'resume.txt', content), reverse('my_applications'))
+
+        sha256 = hashlib.sha256(content).hexdigest()
+        first, second = Application.objects.order_by('id')
+        self.assertEqual(first.resume.name, f'resumes/{sha256[:2]}/{sha256}.txt')
+        self.assertEqual((second.resume.name, first.resume_sha256, second.resume_sha256),
+                         (first.resume.name, sha256, sha256))
+        self.assertEqual(self.stored_files(), [first.resume.path])
+        with first.resume.open('rb') as resume:
+            self.assertEqual(resume.read(), content)
+        # Nothing is left behind in the upload directory
+        self.assertEqual(os.listdir(f'{self.media_root}/tmp'), [])
+
+    @override_settings(RESUME_MAX_UPLOAD_SIZE=16)
+    def test_oversized_resume_is_rejected(self):
+        response = self.apply(self.applicants[0], 'cv.txt', b'x' * 17)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Your resume is too large.')
+        self.assertFalse(Application.objects.exists())
+        self.assertEqual(self.stored_files(), [])
+
+    @override_settings(RESUME_MAX_UPLOAD_SIZE=16)
+    def test_handler_is_installed_before_the_csrf_check(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.applicants[0])
+        url = reverse('apply_to_job', args=[self.job.id])
+        client.get(url)
+
+        def data(**extra):
+            return {'cover_letter': 'Hello', 'resume': SimpleUploadedFile('cv.txt', b'x' * 17, 'text/plain'), **extra}
+        self.assertEqual(client.post(url, data()).status_code, 403)
+        response = client.post(url, data(csrfmiddlewaretoken=client.cookies['csrftoken'].value))
+        self.assertContains(response, 'Your resume is too large.')
+
+    def test_other_uploads_use_the_default_handlers(self):
+        handlers = RequestFactory().post('/').upload_handlers
+        self.assertFalse(any(isinstance(handler, ResumeUploadHandler) for handler in handlers))
+
+    def test_extracted_text_is_shared_by_identical_resumes(self):
+        for applicant in self.applicants:
+            self.apply(applicant, 'cv.txt', b'  Senior data engineer  ')
+        first, second = Application.objects.order_by('id')
+        tasks.extract_resume_text(first.id)
+        second.refresh_from_db()
+        self.assertEqual(second.resume_text, 'Senior data engineer')
+        # Extraction queues one task per application; the second is a no-op
+        with self.assertNumQueries(1):
+            tasks.extract_resume_text(second.id)
+
+
+@task(name='tests.record')
+def record_task(value):
+    Task.objects.create(name='tests.recorded', payload={'value': value}, run_at=timezone.now(), status='done')
+
+
+@task(name='tests.fail', max_attempts=2)
+def failing_task():
+    raise ValueError('boom')
+
+
+@task(name='tests.capped', concurrency=1)
+def capped_task():
+    pass
+
+
+class TaskQueueTests(TestCase):
+    def test_claims_due_tasks_once(self):
+        first, second = record_task.enqueue(1), record_task.enqueue(2)
+        record_task.enqueue(3, delay=60)
+        claimed = claim_tasks('worker-a', 5, 30)
+        self.assertEqual([row.id for row in claimed], [first.id, second.id])
+        self.assertEqual(claim_tasks('worker-b', 5, 30), [])
+        first.refresh_from_db()
+        self.assertEqual((first.status, first.worker, first.attempts), ('running', 'worker-a', 1))
+
+        self.assertTrue(run_task(claimed[0]))
+        first.refresh_from_db()
+        self.assertEqual(first.status, 'done')
+        self.assertTrue(Task.objects.filter(name='tests.recorded', payload__value=1).exists())
+
+    def test_expired_claims_are_reclaimed(self):
+        row = record_task.enqueue(1)
+        stale, = claim_tasks('worker-a', 1, 30)
+        Task.objects.filter(id=row.id).update(locked_until=timezone.now() - timedelta(seconds=1))
+        reclaimed, = claim_tasks('worker-b', 1, 30)
+        self.assertEqual((reclaimed.id, reclaimed.worker, reclaimed.attempts), (row.id, 'worker-b', 2))
+        # The worker that lost the claim cannot record an outcome
+        run_task(stale)
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.worker), ('running', 'worker-b'))
+
+    def test_failures_back_off_then_fail(self):
+        row = failing_task.enqueue()
+        claimed, = claim_tasks('worker-a', 1, 30)
+        before = timezone.now()
+        with self.assertLogs('job_app.queue', 'WARNING'):
+            self.assertFalse(run_task(claimed))
+        row.refresh_from_db()
+        self.assertEqual(row.status, 'queued')
+        self.assertIn('ValueError: boom', row.last_error)
+        self.assertGreaterEqual(row.run_at, before + timedelta(seconds=2))
+        self.assertEqual(claim_tasks('worker-a', 1, 30), [])
+
+        Task.objects.filter(id=row.id).update(run_at=timezone.now())
+        claimed, = claim_tasks('worker-a', 1, 30)
+        with self.assertLogs('job_app.queue', 'ERROR'):
+            self.assertFalse(run_task(claimed))
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts), ('failed', 2))
+        self.assertIsNotNone(row.finished_at)
+
+    def test_concurrency_cap(self):
+        capped_task.enqueue(), capped_task.enqueue()
+        record_task.enqueue(1)
+        claimed = claim_tasks('worker-a', 5, 30)
+        self.assertEqual(sorted(row.name for row in claimed), ['tests.capped', 'tests.record'])
+        self.assertEqual(claim_tasks('worker-b', 5, 30), [])
+        # A worker whose running counts are out of date is still held to the cap
+        with mock.patch('job_app.queue._running_counts', return_value={}):
+            self.assertEqual(claim_tasks('worker-b', 5, 30), [])
+        run_task(next(row for row in claimed if row.name == 'tests.capped'))
+        self.assertEqual([row.name for row in claim_tasks('worker-b', 5, 30)], ['tests.capped'])
+
+    def test_old_finished_tasks_are_purged(self):
+        old = timezone.now() - timedelta(days=8)
+        for status in ('done', 'failed', 'done'):
+            record_task.enqueue(status)
+            Task.objects.filter(payload__args=[status], finished_at=None).update(status=status, finished_at=old)
+        recent = record_task.enqueue('recent')
+        Task.objects.filter(id=recent.id).update(status='done', finished_at=timezone.now())
+        queued = record_task.enqueue('queued')
+        out = io.StringIO()
+        call_command('purge_tasks', '--batch-size', '2', stdout=out)
+        self.assertIn('Deleted 3 finished task(s).', out.getvalue())
+        self.assertEqual(set(Task.objects.values_list('id', flat=True)), {recent.id, queued.id})
+
+    def test_idle_workers_purge_at_most_once_per_interval(self):
+        record_task.enqueue(1)
+        Task.objects.update(status='done', finished_at=timezone.now() - timedelta(days=8))
+        worker = Worker()
+        worker.purge()
+        self.assertFalse(Task.objects.exists())
+        with self.assertNumQueries(0):
+            worker.purge()
+
+
+class ImportJobsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employer = User.objects.create_user('employer', password='pass12345')
+        Job.objects.create(title='Python Developer', company_id=Company.objects.intern('Acme'),
+                           location_id=Location.objects.intern('Remote'), description='Django',
+                           posted_by=cls.employer)
+
+    def import_file(self, content, suffix='.csv', *args):
+        with tempfile.NamedTemporaryFile('w', suffix=suffix, encoding='utf-8') as feed:
+            feed.write(content)
+            feed.flush()
+            stdout = io.StringIO()
+            call_command('import_jobs', feed.name, '--posted-by', 'employer', *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_csv_import_skips_duplicates_and_incomplete_rows(self):
+        version = CacheVersion.objects.get(name='catalogue').version
+        output = self.import_file(
+            'title,company_name,location,description\n'
+            ' python developer ,ACME,Remote,Already listed\n'
+            'Data Engineer,Globex,Berlin,Spark\n'
+            'data engineer,globex,Berlin,Same job twice in the feed\n'
+            ',Initech,Austin,No title\n'
+            'Site Reliability Engineer,Initech,Remote,Kubernetes\n',
+            '.csv', '--batch-size', '1',
+        )
+        self.assertIn('Imported 2 job(s), skipped 3 of 5 row(s)', output)
+        self.assertEqual(
+            set(Job.objects.filter(posted_by=self.employer).values_list('title', 'company__name', 'location__name')),
+            {('Python Developer', 'Acme', 'Remote'), ('Data Engineer', 'Globex', 'Berlin'),
+             ('Site Reliability Engineer', 'Initech', 'Remote')},
+        )
+        # Facet counts, the search index and cached pages follow the import
+        self.assertEqual(dict(Company.objects.values_list('name', 'job_count')), {'Acme': 1, 'Globex': 1, 'Initech': 1})
+        self.assertEqual(Location.objects.get(name='Remote').job_count, 2)
+        self.assertEqual([job.title for job in search_jobs(Job.objects.all(), {'q': 'kubernetes'})],
+                         ['Site Reliability Engineer'])
+        self.assertGreater(CacheVersion.objects.get(name='catalogue').version, version)
+        # One similar-jobs task per batch
+        batches = Task.objects.filter(name='job_app.tasks.refresh_similar_jobs_batch')
+        self.assertEqual(sorted(len(row.payload['args'][0]) for row in batches), [1, 1])
+
+    def test_jsonl_import(self):
+        output = self.import_file(
+            '{"title": "Backend Engineer", "company_name": "Globex", "location": "Berlin"}\n'
+            '\n'
+            '{"title": "Python Developer", "company_name": "Acme"}\n',
+            '.jsonl', '--skip-similar',
+        )
+        self.assertIn('Imported 1 job(s), skipped 1 of 2 row(s)', output)
+        job = Job.objects.get(title='Backend Engineer')
+        self.assertEqual((job.company.name, job.location.name, job.description), ('Globex', 'Berlin', ''))
+        self.assertFalse(Task.objects.filter(name='job_app.tasks.refresh_similar_jobs_batch').exists())
+
+    def test_errors(self):
+        with self.assertRaisesMessage(CommandError, 'Line 2: invalid JSON'):
+            self.import_file('{"title": "Backend Engineer", "company_name": "Globex"}\n{oops\n', '.jsonl')
+        with self.assertRaisesMessage(CommandError, 'User "nobody" does not exist'):
+            call_command('import_jobs', '-', '--posted-by', 'nobody')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Tests the SQLite backend')
+class SQLiteBackendTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'portal.sqlite3')
+
+    def connect(self, alias, **options):
+        options = {'transaction_mode': 'IMMEDIATE', 'serialize_writes': True, **options}
+        wrapper = DatabaseWrapper({**connection.settings_dict, 'NAME': self.path, 'OPTIONS': options}, alias)
+        connections[alias] = wrapper
+        self.addCleanup(connections.__delitem__, alias)
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        wrapper = self.connect('tuned', pragmas={'busy_timeout': 250})
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma(wrapper, 'cache_size'), -64000)
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 250)
+
+    def test_write_transactions_queue_on_the_process_lock(self):
+        first = self.connect('first', pragmas={'busy_timeout': 100})
+        second = self.connect('second', pragmas={'busy_timeout': 100})
+        with first.cursor() as cursor:
+            cursor.execute('CREATE TABLE counter (value integer)')
+        with transaction.atomic(using='first'):
+            with self.assertRaisesMessage(OperationalError, 'timed out waiting for the write queue'):
+                with transaction.atomic(using='second'):
+                    pass
+        # Commits and rollbacks both hand the lock on
+        with self.assertRaises(ValueError), transaction.atomic(using='first'):
+            raise ValueError
+        with transaction.atomic(using='second'), second.cursor() as cursor:
+            cursor.execute('INSERT INTO counter VALUES (1)')
+        with transaction.atomic(using='first'), first.cursor() as cursor:
+            cursor.execute('SELECT value FROM counter')
+            self.assertEqual(cursor.fetchall(), [(1,)])
+
+    def test_immediate_transactions_take_the_write_lock_at_begin(self):
+        first = self.connect('first', serialize_writes=False, pragmas={'busy_timeout': 100})
+        second = self.connect('second', serialize_writes=False, pragmas={'busy_timeout': 100})
+        with transaction.atomic(using='first'):
+            # Nothing has been written yet, but the database is already locked
+            with self.assertRaisesMessage(OperationalError, 'database is locked'):
+                with transaction.atomic(using='second'):
+                    pass
+            # Readers are not blocked in WAL mode
+            self.assertEqual(self.pragma(second, 'user_version'), 0)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN output is SQLite specific')
+class QueryPlanTests(TestCase):
+    """Every query issued by the public views must be answered from an index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employer = User.objects.create_user('employer', password='pass12345')
+        Profile.objects.create(user=cls.employer, role='employee')
+        cls.applicant = User.objects.create_user('applicant', password='pass12345')
+        Profile.objects.create(user=cls.applicant, role='applicant')
+        cls.jobs = [
+            Job.objects.create(
+                title=f'Software Engineer {i}',
+                company_id=Company.objects.intern(f'Company {i % 5}'),
+                location_id=Location.objects.intern(f'City {i % 7}'),
+                description='Python, Django and SQL',
+                posted_by=cls.employer,
+            )
+            for i in range(40)
+        ]
+        for job in cls.jobs[:15]:
+            Application.objects.create(job=job, applicant=cls.applicant, cover_letter='Hello', resume='resumes/cv.pdf')
+        # No ANALYZE on purpose: without sqlite_stat1 the planner assumes large
+        # tables, which is the case these plans have to hold up for.
+
+    def assertNoFullScans(self, url, method='get', data=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, data or {})
+        self.assertLess(response.status_code, 400)
+        for query in ctx.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plan = [row[-1] for row in cursor.fetchall()]
+            scans = [step for step in plan if FULL_SCAN_RE.match(step)]
+            self.assertFalse(scans, f'Full table scan in {url}:\n{sql}\n' + '\n'.join(plan))
+
+    def test_anonymous_pages(self):
+        job = self.jobs[20]
+        self.assertNoFullScans(reverse('home'))
+        self.assertNoFullScans(reverse('home'), data={'title': 'software', 'location': 'city'})
+        self.assertNoFullScans(reverse('job_listings'))
+        self.assertNoFullScans(reverse('job_listings'), data={'company': 'company 3'})
+        self.assertNoFullScans(reverse('job_listings'), data={'near': 'Austin, TX', 'remote': '1'})
+        self.assertNoFullScans(reverse('job_detail', args=[job.id]))
+
+    def test_applicant_pages(self):
+        self.client.force_login(self.applicant)
+        job = self.jobs[30]
+        self.assertNoFullScans(reverse('home'))
+        self.assertNoFullScans(reverse('job_listings'))
+        self.assertNoFullScans(reverse('job_detail', args=[job.id]))
+        self.assertNoFullScans(reverse('apply_to_job', args=[job.id]))
+        self.assertNoFullScans(reverse('my_applications'))
+
+    def test_duplicate_application_rejected(self):
+        self.client.force_login(self.applicant)
+        job = self.jobs[0]
+        response = self.client.post(reverse('apply_to_job', args=[job.id]), {'cover_letter': 'Again'})
+        self.assertRedirects(response, reverse('job_detail', args=[job.id]))
+        self.assertEqual(Application.objects.filter(job=job, applicant=self.applicant).count(), 1)
+
+
+class QueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    """Views stay within their declared query budgets and issue no N+1 queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employer = User.objects.create_user('employer', password='pass12345')
+        Profile.objects.create(user=cls.employer, role='employee')
+        cls.applicant = User.objects.create_user('applicant', password='pass12345')
+        Profile.objects.create(user=cls.applicant, role='applicant')
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        cls.jobs = [
+            Job.objects.create(
+                title=f'Data Engineer {i}',
+                company_id=Company.objects.intern(f'Company {i % 3}'),
+                location_id=Location.objects.intern('Remote'),
+                description='Pipelines',
+                posted_by=cls.employer,
+            )
+            for i in range(20)
+        ]
+        for job in cls.jobs[:12]:
+            Application.objects.create(job=job, applicant=cls.applicant, cover_letter='Hello', resume='resumes/cv.pdf')
+            Application.objects.create(job=job, applicant=cls.admin, cover_letter='Hi', resume='resumes/cv.pdf')
+
+    def assertWithinBudget(self, url, data=None, method='get'):
+        response = getattr(self.client, method)(url, data or {})
+        self.assertQueryBudget(response)
+        self.assertNoRepeatedQueries(response)
+        return response
+
+    def test_public_pages(self):
+        for client_user in (None, self.applicant, self.employer):
+            if client_user:
+                self.client.force_login(client_user)
+            self.assertWithinBudget(reverse('home'))
+            self.assertWithinBudget(reverse('home'), {'title': 'data'})
+            self.assertWithinBudget(reverse('job_listings'))
+            self.assertWithinBudget(reverse('job_listings'), {'company': 'company 1'})
+            self.assertWithinBudget(reverse('job_detail', args=[self.jobs[3].id]))
+
+    async def test_async_read_views(self):
+        # The read-path views are async; under ASGI their queries run on a
+        # worker thread and must still be counted
+        await self.async_client.aforce_login(self.applicant)
+        for url, data in [
+            (reverse('home'), {}),
+            (reverse('home'), {'title': 'data'}),
+            (reverse('job_listings'), {'company': 'company 1'}),
+            (reverse('job_detail', args=[self.jobs[3].id]), {}),
+            (reverse('my_applications'), {}),
+        ]:
+            response = await self.async_client.get(url, data)
+            self.assertEqual(response.status_code, 200)
+            self.assertGreater(response.query_stats.count, 0)
+            self.assertQueryBudget(response)
+            self.assertNoRepeatedQueries(response)
+
+    def test_applicant_pages(self):
+        self.client.force_login(self.applicant)
+        self.assertWithinBudget(reverse('my_applications'))
+        self.assertWithinBudget(reverse('apply_to_job', args=[self.jobs[15].id]))
+        response = self.assertWithinBudget(
+            reverse('apply_to_job', args=[self.jobs[15].id]), {'cover_letter': 'Hello'}, method='post'
+        )
+        self.assertRedirects(response, reverse('my_applications'))
+
+    def test_auth_pages(self):
+        self.assertWithinBudget(reverse('login'), {'username': 'applicant', 'password': 'pass12345'}, method='post')
+        self.client.logout()
+        self.assertWithinBudget(reverse('register'), {
+            'username': 'newcomer', 'first_name': 'New', 'last_name': 'Comer',
+            'email': 'newcomer@example.com', 'password1': 'Zx!92kfjq1', 'password2': 'Zx!92kfjq1',
+            'role': 'applicant', 'agree_terms': 'on',
+        }, method='post')
+
+    def test_admin_pages(self):
+        self.client.force_login(self.admin)
+        self.assertWithinBudget(reverse('admin:job_app_job_changelist'))
+        self.assertWithinBudget(reverse('admin:job_app_application_changelist'))
+        self.assertWithinBudget(reverse('admin:job_applications', args=[self.jobs[0].id]))
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('home'))
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", total;dur=[\d.]+$')
+
+
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate(20, log=lambda message: None)
+
+    def test_scenarios_run_and_their_writes_are_deleted(self):
+        applications = Application.objects.count()
+        tasks_queued = Task.objects.count()
+        counters = list(Job.objects.order_by('id').values_list('applications_count', flat=True))
+        out = io.StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            call_command('benchmark', '--requests', '3', '--warmup', '1', '--save-baseline', path, stdout=out)
+            results = load_baseline(path)
+        self.assertEqual(set(results), {scenario.name for scenario in SCENARIOS})
+        self.assertFalse([name for name, result in results.items() if result['errors']])
+        for name in results:
+            self.assertIn(name, out.getvalue())
+        self.assertEqual(Application.objects.count(), applications)
+        self.assertEqual(Task.objects.count(), tasks_queued)
+        self.assertEqual(list(Job.objects.order_by('id').values_list('applications_count', flat=True)), counters)
+        self.assertFalse(Session.objects.exists())
+
+    def test_regressions_against_the_baseline_fail_the_run(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            save_baseline(path, {'homepage': {'queries': 0, 'p95_ms': 1000.0, 'rps': 0.0}}, {})
+            with self.assertRaisesMessage(CommandError, 'homepage: '):
+                call_command('benchmark', '--scenario', 'homepage', '--requests', '2', '--warmup', '0',
+                             '--baseline', path, stdout=io.StringIO())
+
+    def test_compare(self):
+        baseline = {'search': {'queries': 3, 'p95_ms': 10.0, 'rps': 100.0}}
+        within = {'search': {'queries': 3, 'p95_ms': 12.0, 'rps': 80.0}, 'new': {'queries': 9, 'p95_ms': 1.0, 'rps': 1.0}}
+        self.assertEqual(compare(within, baseline, 0.25), [])
+        worse = {'search': {'queries': 4, 'p95_ms': 13.0, 'rps': 70.0}}
+        self.assertEqual(compare(worse, baseline, 0.25), [
+            'search: 4 queries per request, baseline 3',
+            'search: p95 13.0ms, baseline 10.0ms',
+            'search: 70.0 req/s, baseline 100.0 req/s',
+        ])
+        self.assertEqual(percentile(range(1, 101), 0.95), 95)
+
+
+# Versions are read from the database each time, as once CACHE_VERSION_TTL has passed
+@override_settings(CACHE_VERSION_TTL=0)
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('applicant', password='pass12345')
+        Profile.objects.create(user=cls.user, role='applicant')
+        cls.job = Job.objects.create(title='Data Engineer', company_id=Company.objects.intern('Acme'),
+                                     location_id=Location.objects.intern('Remote'), description='Pipelines',
+                                     posted_by=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def bump_elsewhere(self):
+        # What another worker or a management command does: only the row changes
+        CacheVersion.objects.filter(name='catalogue').update(version=F('version') + 1)
+
+    def test_pages_follow_versions_bumped_by_other_processes(self):
+        self.assertEqual(self.client.get(reverse('job_listings'))['X-Page-Cache'], 'miss')
+        self.assertEqual(self.client.get(reverse('job_listings'))['X-Page-Cache'], 'hit')
+        # Changes that skip the signals stay hidden until the version moves
+        Job.objects.filter(pk=self.job.pk).update(title='Platform Engineer')
+        self.assertContains(self.client.get(reverse('job_listings')), 'Data Engineer')
+        self.bump_elsewhere()
+        response = self.client.get(reverse('job_listings'))
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Platform Engineer')
+
+    def test_search_counts_follow_versions(self):
+        params = {'title': 'engineer'}
+        self.assertEqual(self.client.get(reverse('job_listings'), params).context['total_jobs'], 1)
+        Job.objects.bulk_create([Job(title='Test Engineer', company_id=self.job.company_id,
+                                     location_id=self.job.location_id, description='Tests', posted_by=self.user)])
+        self.assertEqual(self.client.get(reverse('job_listings'), params).context['total_jobs'], 1)
+        self.bump_elsewhere()
+        self.assertEqual(self.client.get(reverse('job_listings'), params).context['total_jobs'], 2)
+
+    @override_settings(CACHE_VERSION_TTL=60)
+    def test_versions_are_reused_for_their_ttl(self):
+        self.addCleanup(cache.clear)
+        self.assertEqual(self.client.get(reverse('job_listings'))['X-Page-Cache'], 'miss')
+        response = self.client.get(reverse('job_listings'))
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertEqual(response.query_stats.count, 0)
+        # Other processes sharing only the database are noticed once the TTL is up
+        self.bump_elsewhere()
+        self.assertEqual(self.client.get(reverse('job_listings'))['X-Page-Cache'], 'hit')
+        # Bumps from this process (or through a shared cache) show at once
+        bump_catalogue_version()
+        self.assertEqual(self.client.get(reverse('job_listings'))['X-Page-Cache'], 'miss')
+
+    def test_job_card_fragments(self):
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(reverse('job_listings')), 'Pipelines')
+        self.job.description = 'Warehouses'
+        self.job.save()
+        self.assertContains(self.client.get(reverse('job_listings')), 'Warehouses')
+        # The job's age is rendered outside the cached fragment
+        Job.objects.filter(pk=self.job.pk).update(created_at=self.job.created_at - timedelta(days=3))
+        self.assertContains(self.client.get(reverse('job_listings')), '3\xa0days ago')
+
+
+class AppliedJobsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        employer = User.objects.create_user('employer', password='pass12345')
+        Profile.objects.create(user=employer, role='employee')
+        cls.applicant, other = User.objects.create_user('applicant'), User.objects.create_user('other')
+        for user in (cls.applicant, other):
+            Profile.objects.create(user=user, role='applicant')
+        cls.jobs = [
+            Job.objects.create(title=f'Engineer {i}', company_id=Company.objects.intern('Acme'),
+                               location_id=Location.objects.intern('Remote'), description='Work', posted_by=employer)
+            for i in range(6)
+        ]
+        Application.objects.create(job=cls.jobs[1], applicant=cls.applicant, cover_letter='Hi', resume='resumes/cv.pdf')
+        Application.objects.create(job=cls.jobs[2], applicant=other, cover_letter='Hi', resume='resumes/cv.pdf')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.applicant)
+
+    def applied(self, response, key):
+        return {job.title for job in response.context[key] if job.has_applied}
+
+    def test_applied_flag(self):
+        for url, key in ((reverse('home'), 'recent_jobs'), (reverse('job_listings'), 'page')):
+            response = self.client.get(url)
+            self.assertEqual(self.applied(response, key), {'Engineer 1'})
+        self.client.force_login(User.objects.get(username='employer'))
+        self.assertEqual(self.applied(self.client.get(reverse('job_listings')), 'page'), set())
+
+    def test_queries_do_not_grow_with_applications(self):
+        self.client.get(reverse('job_listings'))
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(reverse('job_listings'))
+        for job in self.jobs[2:]:
+            Application.objects.create(job=job, applicant=self.applicant, cover_letter='Hi', resume='resumes/cv.pdf')
+        with CaptureQueriesContext(connection) as after:
+            response = self.client.get(reverse('job_listings'))
+        self.assertEqual(len(after), len(before))
+        self.assertEqual(len(self.applied(response, 'page')), 5)
+
+    def test_search_totals_are_cached(self):
+        params = {'title': 'engineer'}
+        with CaptureQueriesContext(connection) as first:
+            self.assertEqual(self.client.get(reverse('home'), params).context['total_jobs'], 6)
+        with CaptureQueriesContext(connection) as second:
+            self.assertEqual(self.client.get(reverse('job_listings'), params).context['total_jobs'], 6)
+        counts = [[query for query in ctx if '"__count"' in query['sql']] for ctx in (first, second)]
+        self.assertEqual([len(queries) for queries in counts], [1, 0])
+
+
+class SimilarJobsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employer = User.objects.create_user('employer', password='pass12345')
+
+    def create(self, title, description, company='Acme'):
+        job = Job.objects.create(title=title, company_id=Company.objects.intern(company),
+                                 location_id=Location.objects.intern('Remote'), description=description,
+                                 posted_by=self.employer)
+        similarity.refresh_similar_jobs(job)
+        return job
+
+    def test_signatures_estimate_overlap(self):
+        tokens = {f'word{i}' for i in range(40)}
+        signature = similarity.minhash(tokens)
+        self.assertEqual(similarity.similarity(signature, similarity.minhash(set(tokens))), 1.0)
+        half = {f'word{i}' for i in range(20, 60)}  # Jaccard 1/3
+        self.assertAlmostEqual(similarity.similarity(signature, similarity.minhash(half)), 1 / 3, delta=0.15)
+        self.assertLess(similarity.similarity(signature, similarity.minhash({'other'})), 0.1)
+        self.assertEqual(similarity.unpack(similarity.pack(signature)), signature)
+
+    def test_banding(self):
+        signature = similarity.minhash({'python', 'django'})
+        buckets = similarity.band_buckets(signature)
+        self.assertEqual(len(buckets), similarity.NUM_HASHES // similarity.ROWS_PER_BAND)
+        changed = [signature[0] + 1, *signature[1:]]
+        # Only the first band differs
+        self.assertEqual([a == b for a, b in zip(buckets, similarity.band_buckets(changed))],
+                         [False] + [True] * (len(buckets) - 1))
+
+    def test_neighbours_follow_edits_and_deletes(self):
+        python = self.create('Python Developer', 'Django REST APIs PostgreSQL Celery Redis')
+        backend = self.create('Backend Python Developer', 'Django REST APIs PostgreSQL Docker')
+        chef = self.create('Pastry Chef', 'Croissants bread ovens mornings', company='Bakery')
+        self.assertEqual(similarity.get_similar_jobs(python)[0], backend)
+        self.assertEqual(similarity.get_similar_jobs(backend)[0], python)
+        self.assertNotIn(chef, similarity.get_similar_jobs(python))
+
+        backend.title, backend.description = 'Bread Baker', 'Croissants bread ovens nights'
+        backend.company_id = chef.company_id
+        backend.save()
+        similarity.refresh_similar_jobs(backend)
+        self.assertNotIn(backend, similarity.get_similar_jobs(python))
+        self.assertEqual(similarity.get_similar_jobs(chef), [backend])
+
+        neighbours_of = list(SimilarJob.objects.filter(similar_job=backend).values_list('job_id', flat=True))
+        backend.delete()
+        similarity.refresh_neighbours_of(neighbours_of)
+        self.assertEqual(similarity.get_similar_jobs(chef), [])
+
+    def test_capped_candidates_keep_the_closest(self):
+        job = self.create('Data Engineer', 'Spark Airflow Kafka pipelines warehouse dbt')
+        self.create('Data Analyst', 'Spark dashboards SQL reports')
+        closest = self.create('Senior Data Engineer', 'Spark Airflow Kafka pipelines warehouse')
+        with mock.patch.object(similarity, 'MAX_CANDIDATES', 1):
+            similarity.refresh_similar_jobs(job)
+        self.assertEqual(similarity.get_similar_jobs(job), [closest])
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(SimpleTestCase):
+    router = PrimaryReplicaRouter()
+
+    def test_primary_outside_requests(self):
+        self.assertEqual(self.router.db_for_read(Job), 'default')
+
+    def test_reads_pinned_after_write(self):
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Job), 'replica')
+            self.assertEqual(self.router.db_for_read(User), 'default')
+            self.assertEqual(self.router.db_for_read(Task), 'default')
+            self.assertEqual(self.router.db_for_read(CacheVersion), 'default')
+            self.assertEqual(self.router.db_for_write(Application), 'default')
+            self.assertEqual(self.router.db_for_read(Job), 'default')
+
+    def route(self, request, write=False):
+        def view(request):
+            if write:
+                self.router.db_for_write(Application)
+            return HttpResponse(self.router.db_for_read(Job))
+        return ReplicaRoutingMiddleware(view)(request)
+
+    def test_write_pins_follow_up_requests(self):
+        factory = RequestFactory()
+        self.assertEqual(self.route(factory.get('/')).content, b'replica')
+        self.assertEqual(self.route(factory.post('/')).content, b'default')
+
+        response = self.route(factory.post('/'), write=True)
+        self.assertIn('pin_primary', response.cookies)
+        request = factory.get('/')
+        request.COOKIES['pin_primary'] = '1'
+        self.assertEqual(self.route(request).content, b'default')
+
+
+class ApiTests(QueryBudgetTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employer = User.objects.create_user('employer', password='pass12345')
+        cls.applicant = User.objects.create_user('applicant', password='pass12345')
+        Profile.objects.create(user=cls.applicant, role='applicant')
+        cls.jobs = [
+            Job.objects.create(title=f'Backend Engineer {i}', company_id=Company.objects.intern('Acme'),
+                               location_id=Location.objects.intern('Remote'), description='APIs', posted_by=cls.employer)
+            for i in range(25)
+        ]
+        Application.objects.create(job=cls.jobs[0], applicant=cls.applicant, cover_letter='Hi', resume='resumes/cv.pdf')
+
+    def test_job_list_pagination_and_fields(self):
+        response = self.client.get(reverse('api_job_list'), {'title': 'backend', 'fields': 'id,title'})
+        self.assertQueryBudget(response)
+        data = response.json()
+        self.assertEqual(len(data['results']), 20)
+        self.assertEqual(set(data['results'][0]), {'id', 'title'})
+        self.assertEqual(data['results'][0]['id'], self.jobs[-1].id)
+
+        data = self.client.get(reverse('api_job_list'), {'cursor': data['next_cursor']}).json()
+        self.assertEqual([job['id'] for job in data['results']], [job.id for job in reversed(self.jobs[:5])])
+        self.assertIsNone(data['next_cursor'])
+
+        response = self.client.get(reverse('api_job_list'), {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(CACHE_VERSION_TTL=60)
+    def test_conditional_get(self):
+        # The cached version would outlive the rows rolled back after the test
+        self.addCleanup(cache.clear)
+        url = reverse('api_job_detail', args=[self.jobs[3].id])
+        response = self.client.get(url)
+        self.assertEqual(response.json()['title'], 'Backend Engineer 3')
+
+        response = self.client.get(url, headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        # Nothing is read: the catalogue version is still cached from the first request
+        self.assertEqual(response.query_stats.count, 0)
+
+        # Any job change invalidates the catalogue version and so the ETag
+        etag = response['ETag']
+        self.jobs[3].title = 'Platform Engineer'
+        self.jobs[3].save()
+        response = self.client.get(url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['title'], 'Platform Engineer')
+
+    @override_settings(CACHE_VERSION_TTL=0)
+    def test_validators_follow_bumps_from_other_processes(self):
+        url = reverse('api_job_list')
+        response = self.client.get(url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        # Another worker shares only the database with this one, not its cache
+        CacheVersion.objects.filter(name='catalogue').update(version=F('version') + 10 ** 9)
+        response = self.client.get(url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(url, headers={'if-modified-since': last_modified}).status_code, 200)
+        self.assertEqual(self.client.get(url, headers={'if-none-match': response['ETag']}).status_code, 304)
+
+    def test_application_list(self):
+        url = reverse('api_application_list')
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+        self.client.force_login(self.applicant)
+        response = self.client.get(url, {'job': self.jobs[0].id})
+        self.assertQueryBudget(response)
+        self.assertEqual(response.json()['results'][0]['job']['id'], self.jobs[0].id)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, {'job': self.jobs[0].id}, headers={'if-none-match': etag}).status_code, 304)
+
+        response = self.client.get(url)
+        etag = response['ETag']
+        Application.objects.create(job=self.jobs[1], applicant=self.applicant, cover_letter='Hi', resume='resumes/cv.pdf')
+        response = self.client.get(url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 2)
+
+
+class CachedUserTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('applicant', password='pass12345')
+        cls.profile = Profile.objects.create(user=cls.user, role='applicant')
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(AUTH_USER_CACHE_TIMEOUT=0)
+    def test_uncached_lookup_sees_changes_from_other_processes(self):
+        backend = CachedModelBackend()
+        with self.assertNumQueries(1):
+            self.assertEqual(backend.get_user(self.user.pk).profile.role, 'applicant')
+        # A queryset update sends no signals, like a change made by another worker
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertIsNone(backend.get_user(self.user.pk))
+        self.assertIsNone(async_to_sync(backend.aget_user)(self.user.pk))
+        self.assertIsNone(cache.get(f'auth:user:{self.user.pk}'))
+
+    def test_pages_skip_user_and_profile_queries(self):
+        self.client.force_login(self.user)
+        # An async and a sync view
+        for name in ['job_listings', 'login']:
+            with self.subTest(name):
+                response = self.client.get(reverse(name))
+                for sql in response.query_stats.fingerprints:
+                    self.assertNotRegex(sql, r'FROM "(auth_user|job_app_profile)"')
+                self.assertEqual(response.wsgi_request.user.profile.role, 'applicant')
+
+    def test_session_copy_follows_user_changes(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('job_listings'))
+
+        admin = ProfileAdmin(Profile, site)
+        admin.message_user = lambda *args: None
+        admin.make_employee(RequestFactory().post('/'), Profile.objects.filter(pk=self.profile.pk))
+        response = self.client.get(reverse('job_listings'))
+        self.assertEqual(response.wsgi_request.user.profile.role, 'employee')
+
+        self.user.set_password('changed123')
+        self.user.save()
+        response = self.client.get(reverse('job_listings'))
+        self.assertFalse(response.wsgi_request.user.is_authenticated)
+
+    @override_settings(AUTH_USER_CACHE_TIMEOUT=300)
+    def test_role_changes_invalidate_cached_user(self):
+        backend = CachedModelBackend()
+        self.assertEqual(backend.get_user(self.user.pk).profile.role, 'applicant')
+
+        admin = ProfileAdmin(Profile, site)
+        admin.message_user = lambda *args: None
+        admin.make_employee(RequestFactory().post('/'), Profile.objects.filter(pk=self.profile.pk))
+        self.assertEqual(backend.get_user(self.user.pk).profile.role, 'employee')
+
+        # list_editable saves each profile, which goes through the signals
+        self.profile.role = 'applicant'
+        self.profile.save()
+        self.assertEqual(backend.get_user(self.user.pk).profile.role, 'applicant')
+
+
+class PurgeSessionsTests(TestCase):
+    def test_expired_sessions_are_deleted_in_batches(self):
+        now = timezone.now()
+        for i in range(5):
+            Session.objects.create(session_key=f'expired{i}', session_data='', expire_date=now - timedelta(days=1))
+        Session.objects.create(session_key='live', session_data='', expire_date=now + timedelta(days=1))
+        out = io.StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command('purge_sessions', '--batch-size', '2', stdout=out)
+        self.assertEqual(out.getvalue().strip(), 'Deleted 5 expired session(s).')
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live'])
+        deletes = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('DELETE')]
+        self.assertEqual(len(deletes), 3)
+
+
+# The logins run in threads with their own connections, which only see
+# committed rows
+class BenchmarkSessionsTests(TransactionTestCase):
+    def test_every_engine_runs(self):
+        out = io.StringIO()
+        call_command('benchmark_sessions', '--concurrency', '2', '--rounds', '1', '--pages', '1', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual([line.split()[0] for line in lines], list(settings.SESSION_BACKENDS))
+        for line in lines:
+            self.assertIn(' 0 errors', line)
+        self.assertFalse(User.objects.exists())
+        self.assertFalse(Session.objects.exists())
+
+
+@override_settings(ADMIN_EXACT_COUNT_LIMIT=5, ADMIN_FILTER_MAX_CHOICES=3)
+class AdminPerformanceModeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        for i in range(8):
+            Job.objects.create(
+                title=f'Engineer {i}', company_id=Company.objects.intern(f'Company {i}'),
+                location_id=Location.objects.intern('Remote'), description='Pipelines', posted_by=cls.admin,
+            )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_filtered_counts_are_capped(self):
+        response = self.client.get(reverse('admin:job_app_job_changelist'), {'location__name': 'Remote'})
+        paginator = response.context['cl'].paginator
+        self.assertTrue(paginator.capped)
+        self.assertEqual(paginator.count, 6)
+        self.assertContains(response, 'more than 5')
+
+    def test_estimated_count_from_table_statistics(self):
+        response = self.client.get(reverse('admin:job_app_job_changelist'))
+        # No ANALYZE yet, so the unfiltered total is an exact count
+        self.assertFalse(response.context['cl'].paginator.estimated)
+        self.assertEqual(response.context['cl'].result_count, 8)
+
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            response = self.client.get(reverse('admin:job_app_job_changelist'))
+            self.assertTrue(response.context['cl'].paginator.estimated)
+            self.assertContains(response, 'about 8')
+
+    def test_filters_past_the_cap_become_text_boxes(self):
+        response = self.client.get(reverse('admin:job_app_job_changelist'), {'company__name': 'Company 2'})
+        company, location = response.context['cl'].filter_specs[:2]
+        self.assertTrue(company.autocomplete)
+        self.assertFalse(location.autocomplete)
+        self.assertEqual(response.context['cl'].result_count, 1)
+        self.assertContains(response, 'data-suggestions-url="/admin/job_app/job/filter-values/company__name/"')
+
+        response = self.client.get(reverse('admin:job_app_job_filter_values', args=['company__name']), {'term': 'company'})
+        self.assertEqual(response.json()['results'], ['Company 0', 'Company 1', 'Company 2', 'Company 3', 'Company 4',
+                                                      'Company 5', 'Company 6', 'Company 7'])
+        response = self.client.get(reverse('admin:job_app_job_filter_values', args=['description']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_related_filter_and_search(self):
+        applicant = User.objects.create_user('applicant', email='applicant@example.com')
+        job = Job.objects.get(company__name='Company 3')
+        Application.objects.create(job=job, applicant=applicant, cover_letter='Hello', resume='resumes/cv.pdf')
+        url = reverse('admin:job_app_application_changelist')
+        for params in ({'job__company__name': 'Company 3'}, {'q': 'engineer 3'}, {'q': 'applicant@'}):
+            self.assertEqual(self.client.get(url, params).context['cl'].result_count, 1, params)
+        self.assertEqual(self.client.get(url, {'job__company__name': 'Company 4'}).context['cl'].result_count, 0)
+
+
+class JobApplicationsAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        cls.job = Job.objects.create(
+            title='Data Engineer', company_id=Company.objects.intern('Acme'), location_id=Location.objects.intern('Remote'),
+            description='Pipelines', posted_by=cls.admin,
+        )
+        for i in range(30):
+            applicant = User.objects.create_user(f'applicant{i:02}', email=f'applicant{i:02}@example.com')
+            Application.objects.create(
+                job=cls.job, applicant=applicant, cover_letter='=1+1' if i == 0 else 'Hello',
+                resume='resumes/cv.pdf' if i % 2 else '',
+            )
+        cls.url = reverse('admin:job_applications', args=[cls.job.id])
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_pages_filters_and_sorting(self):
+        response = self.client.get(self.url, {'sort': 'applicant'})
+        page = response.context['page']
+        self.assertEqual([a.applicant.username for a in page][:2], ['applicant00', 'applicant01'])
+        self.assertEqual(len(page), 25)
+        response = self.client.get(self.url, {'sort': 'applicant', 'cursor': page.next_cursor})
+        self.assertEqual([a.applicant.username for a in response.context['page']],
+                         [f'applicant{i}' for i in range(25, 30)])
+
+        response = self.client.get(self.url, {'q': 'applicant1', 'resume': 'yes'})
+        self.assertEqual(response.context['matching_count'], 5)
+        self.assertEqual({a.applicant.username for a in response.context['page']},
+                         {'applicant11', 'applicant13', 'applicant15', 'applicant17', 'applicant19'})
+
+    def test_long_pages_stream(self):
+        def get(**params):
+            response = self.client.get(self.url, {'sort': 'applicant', 'per_page': 26, **params},
+                                       headers={'accept-encoding': 'gzip'})
+            self.assertTrue(response.streaming)
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            html = gzip.decompress(b''.join(response.streaming_content)).decode()
+            cursors = dict(re.findall(r'per_page=26&amp;cursor=([^"]+)" class="back-button">\s*(?:<i[^>]*></i>)?\s*(\w+)', html))
+            cursors = {label: unquote(cursor) for cursor, label in cursors.items()}
+            return re.findall(r'<span>(applicant\d+)</span>', html), cursors
+
+        usernames, cursors = get()
+        self.assertEqual(usernames, [f'applicant{i:02}' for i in range(26)])
+        self.assertEqual(set(cursors), {'Next'})
+        usernames, cursors = get(cursor=cursors['Next'])
+        self.assertEqual(usernames, [f'applicant{i:02}' for i in range(26, 30)])
+        self.assertEqual(set(cursors), {'Previous'})
+        # Pages reached backwards are read in page order too
+        usernames, cursors = get(cursor=cursors['Previous'])
+        self.assertEqual(usernames, [f'applicant{i:02}' for i in range(26)])
+        self.assertEqual(set(cursors), {'Next'})
+
+    def test_streamed_pages_render_once_and_count_their_queries(self):
+        second = self.client.get(self.url, {'sort': 'applicant', 'per_page': 5, 'cursor': self.client.get(
+            self.url, {'sort': 'applicant', 'per_page': 5}).context['page'].next_cursor})
+        # Reached backwards, so whether earlier rows exist is only checked after the last row
+        params = {'sort': 'applicant', 'per_page': 26, 'cursor': second.context['page'].previous_cursor}
+        with mock.patch.object(DjangoTemplate, 'render', autospec=True, side_effect=DjangoTemplate.render) as render:
+            response = self.client.get(self.url, params)
+            head_queries = response.query_stats.count
+            html = b''.join(response.streaming_content).decode()
+        rendered = [call.args[0].template.name for call in render.call_args_list]
+        self.assertEqual(rendered.count('admin/job_app/job/applications.html'), 1)
+        self.assertEqual(re.findall(r'<span>(applicant\d+)</span>', html), [f'applicant{i:02}' for i in range(5)])
+        self.assertRegex(html, r'class="back-button">\s*Next')
+        self.assertGreater(response.query_stats.count, head_queries)
+
+        with override_settings(QUERY_BUDGETS={'admin:job_applications': head_queries}, QUERY_BUDGET_STRICT=True):
+            response = self.client.get(self.url, params)
+            with self.assertRaises(QueryBudgetExceeded):
+                b''.join(response.streaming_content)
+
+    def test_csv_export(self):
+        response = self.client.get(self.url, {'export': 'csv', 'sort': 'applicant', 'resume': 'no'})
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="job-{self.job.id}-applications.csv"')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], ['Username', 'Name', 'Email', 'Applied at', 'Resume', 'Cover letter'])
+        self.assertEqual(len(rows), 16)
+        # Formula-looking cells are quoted so spreadsheets show them as text
+        self.assertEqual(rows[1][0], 'applicant00')
+        self.assertEqual(rows[1][5], "'=1+1")
+
+    def test_xlsx_export(self):
+        response = self.client.get(self.url, {'export': 'xlsx'})
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertIsNone(archive.testzip())
+        namespace = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+        sheet = ElementTree.fromstring(archive.read('xl/worksheets/sheet1.xml'))
+        rows = sheet.findall(f'.//{namespace}row')
+        self.assertEqual(len(rows), 31)
+        self.assertEqual(rows[0][0].findtext(f'.//{namespace}t'), 'Username')
+
+
+class JobFacetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employer = User.objects.create_user('employer', password='pass12345')
+        Profile.objects.create(user=cls.employer, role='employee')
+        for i in range(6):
+            Job.objects.create(title=f'Python Developer {i}', company_id=Company.objects.intern('Acme' if i < 4 else 'Globex'),
+                               location_id=Location.objects.intern('Remote' if i % 2 else 'Berlin'), description='Django',
+                               posted_by=cls.employer)
+
+    def setUp(self):
+        cache.clear()
+
+    def stored(self, model):
+        return dict(model.objects.filter(job_count__gt=0).values_list('name', 'job_count'))
+
+    def test_counts_follow_job_changes(self):
+        self.assertEqual(self.stored(Company), {'Acme': 4, 'Globex': 2})
+        self.assertEqual(self.stored(Location), {'Remote': 3, 'Berlin': 3})
+
+        job = Job.objects.filter(company__name='Globex').first()
+        job.company_id = Company.objects.intern('Initech')
+        job.save()
+        job.title = 'Senior Python Developer'
+        job.save(update_fields=['title'])
+        self.assertEqual(self.stored(Company), {'Acme': 4, 'Globex': 1, 'Initech': 1})
+        job.delete()
+        self.assertEqual(self.stored(Company), {'Acme': 4, 'Globex': 1})
+        self.employer.delete()
+        self.assertEqual(self.stored(Company), {})
+
+    def test_rebuild(self):
+        Company.objects.update(job_count=0)
+        Location.objects.create(name='Nowhere', job_count=3)
+        call_command('rebuild_job_facets', stdout=io.StringIO())
+        self.assertEqual(self.stored(Company), {'Acme': 4, 'Globex': 2})
+        self.assertEqual(self.stored(Location), {'Remote': 3, 'Berlin': 3})
+
+    def test_listings_read_counts_from_facets(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('job_listings'))
+        self.assertFalse([q['sql'] for q in ctx.captured_queries if 'COUNT(' in q['sql'].upper()])
+        self.assertEqual(response.context['total_jobs'], 6)
+        companies, locations = response.context['facets']
+        self.assertEqual(companies, ('Companies', [('Acme', 4, 'company=Acme'), ('Globex', 2, 'company=Globex')]))
+        self.assertEqual(locations[1], [('Berlin', 3, 'location=Berlin'), ('Remote', 3, 'location=Remote')])
+
+        # Searches group their own matches, once per normalized search
+        response = self.client.get(reverse('job_listings'), {'location': 'remote', 'title': 'python developer'})
+        self.assertEqual(response.context['total_jobs'], 3)
+        self.assertEqual(response.context['facets'][0][1][0][:2], ('Acme', 2))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('job_listings'), {'location': 'Remote', 'title': 'Developer  PYTHON'})
+        self.assertEqual(response.context['total_jobs'], 3)
+        self.assertFalse([q['sql'] for q in ctx.captured_queries if 'COUNT(' in q['sql'].upper()])
+
+    def test_admin_filters_use_facets(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pass12345'))
+        response = self.client.get(reverse('admin:job_app_job_filter_values', args=['company__name']), {'term': 'g'})
+        self.assertEqual(response.json(), {'results': ['Globex']})
+        response = self.client.get(reverse('admin:job_app_job_changelist'))
+        self.assertContains(response, '?company__name=Globex')
+
+
+# Versions are read from the database each time, as once CACHE_VERSION_TTL has passed
+@override_settings(CACHE_VERSION_TTL=0)
+class CompanyLocationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employer = User.objects.create_user('employer', password='pass12345')
+        for i in range(3):
+            Job.objects.create(title=f'Data Engineer {i}', company_id=Company.objects.intern('Acme'),
+                               location_id=Location.objects.intern('Remote'), description='Pipelines',
+                               posted_by=cls.employer)
+
+    def setUp(self):
+        cache.clear()
+        # Ids cached by one test belong to rows that are rolled back after it
+        for model in (Company, Location):
+            model.objects.forget()
+            self.addCleanup(model.objects.forget)
+
+    def test_intern_reuses_rows_and_caches_committed_ids(self):
+        self.assertEqual(Company.objects.intern('  Acme '), Company.objects.get(name='Acme').pk)
+        # Inside a transaction nothing is cached, it could still roll back
+        self.assertIsNone(Company.objects.ids.get('Acme'))
+        with self.captureOnCommitCallbacks(execute=True):
+            pk = Company.objects.intern('Initech  Labs')
+        self.assertEqual(Company.objects.get(pk=pk).name, 'Initech Labs')
+        # Only the entities version is read
+        with self.assertNumQueries(1):
+            self.assertEqual(Company.objects.intern('Initech Labs'), pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            ids = Location.objects.intern_many(['Remote', 'Berlin '])
+        self.assertEqual(ids, {'Remote': Location.objects.get(name='Remote').pk,
+                               'Berlin ': Location.objects.get(name='Berlin').pk})
+        with self.assertNumQueries(1):
+            Location.objects.intern_many(['Berlin'])
+
+    def test_lru_cache_evicts_least_recently_used(self):
+        ids = LRUCache(2)
+        ids.set('a', 1)
+        ids.set('b', 2)
+        ids.get('a')
+        ids.set('c', 3)
+        self.assertEqual((ids.get('a'), ids.get('b'), ids.get('c')), (1, None, 3))
+
+    def test_rename_reindexes_jobs_and_clears_cache(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Company.objects.intern('Acme')
+        company = Company.objects.get(name='Acme')
+        company.name = 'Umbrella'
+        company.save()
+        self.assertIsNone(Company.objects.ids.get('Acme'))
+        response = self.client.get(reverse('job_listings'), {'company': 'umbrella'})
+        self.assertEqual(response.context['total_jobs'], 3)
+        self.assertContains(response, 'Umbrella')
+        response = self.client.get(reverse('job_listings'), {'company': 'acme'})
+        self.assertEqual(response.context['total_jobs'], 0)
+
+    def test_deletes_from_other_processes_clear_cache(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            pk = Company.objects.intern('Initech')
+        # Another worker deletes the company; only the database is shared with it
+        Company.objects.filter(pk=pk).delete()
+        CacheVersion.objects.filter(name='entities').update(version=F('version') + 1)
+        new_pk = Company.objects.intern('Initech')
+        self.assertNotEqual(new_pk, pk)
+        self.assertEqual(Company.objects.get(pk=new_pk).name, 'Initech')
+
+    def test_api_serializes_names(self):
+        response = self.client.get(reverse('api_job_list'), {'fields': 'id,company_name,location'})
+        self.assertEqual(response.json()['results'][0]['company_name'], 'Acme')
+        self.assertEqual(response.json()['results'][0]['location'], 'Remote')
+
+
+class GeoSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employer = User.objects.create_user('employer', password='pass12345')
+        for title, location in [('Baker', 'San Francisco, CA'), ('Barista', 'Oakland'),
+                                ('Chemist', 'San Jose, California'), ('Welder', 'Austin, TX'),
+                                ('Writer', 'Remote - US'), ('Farmer', 'Springfield')]:
+            Job.objects.create(title=title, company_id=Company.objects.intern('Acme'),
+                               location_id=Location.objects.intern(location), description='Work',
+                               posted_by=cls.employer)
+
+    def setUp(self):
+        cache.clear()
+        for model in (Company, Location):
+            model.objects.forget()
+            self.addCleanup(model.objects.forget)
+
+    def search(self, **params):
+        response = self.client.get(reverse('job_listings'), params)
+        return response, sorted(job.title for job in response.context['jobs'])
+
+    def test_geocode(self):
+        self.assertEqual(geocode('Austin, TX'), geocode('austin texas'))
+        self.assertEqual(geocode('Austin, Texas, United States'), geocode('Austin'))
+        self.assertEqual(geocode('SF'), geocode('San Francisco, CA'))
+        self.assertIsNone(geocode('Springfield, IL'))
+        location = Location.objects.get(name='Remote - US')
+        self.assertEqual((location.is_remote, location.latitude), (True, None))
+        self.assertAlmostEqual(distance_km(*geocode('San Francisco'), *geocode('Oakland')), 13, delta=1)
+
+    def test_radius_search(self):
+        self.assertEqual(self.search(near='sf', radius='25')[1], ['Baker', 'Barista'])
+        self.assertEqual(self.search(near='San Francisco', radius='100')[1], ['Baker', 'Barista', 'Chemist'])
+        self.assertEqual(self.search(near='Oakland, CA', radius='25', remote='1')[1], ['Baker', 'Barista', 'Writer'])
+        # Text and radius filters combine
+        self.assertEqual(self.search(near='Oakland, CA', title='baker')[1], ['Baker'])
+        response, titles = self.search(near='Oakland', radius='25')
+        self.assertEqual(response.context['total_jobs'], 2)
+        # The radius options do nothing without a place
+        self.assertEqual(len(self.search(radius='10', remote='1')[1]), 6)
+
+    def test_unknown_place_matches_nothing(self):
+        response, titles = self.search(near='Atlantis')
+        self.assertEqual(titles, [])
+        self.assertTrue(response.context['unknown_place'])
+        self.assertContains(response, 'know where')
+
+    def test_coordinate_edits_move_index_entry(self):
+        location = Location.objects.get(name='Springfield')
+        location.latitude, location.longitude = geocode('San Jose')
+        location.save()
+        self.assertEqual(self.search(near='San Jose', radius='10')[1], ['Chemist', 'Farmer'])
+        Location.objects.filter(pk=location.pk).update(latitude=None, longitude=None)
+        self.assertEqual(self.search(near='San Jose', radius='10')[1], ['Chemist'])
+
+    def test_geocode_locations_command(self):
+        Location.objects.update(latitude=None, longitude=None)
+        out = io.StringIO()
+        call_command('geocode_locations', stdout=out)
+        self.assertIn('Geocoded 4 locations', out.getvalue())
+        self.assertIn('Springfield (1 jobs)', out.getvalue())
+        self.assertEqual(self.search(near='Austin')[1], ['Welder'])
+
+    def test_bounding_boxes_wrap_the_antimeridian(self):
+        boxes = bounding_boxes(*geocode('Auckland'), 2500)
+        self.assertEqual(len(boxes), 2)
+        self.assertEqual((boxes[0][3], boxes[1][2]), (180, -180))
+        self.assertEqual(bounding_boxes(89.5, 0, 100)[0][2:], (-180, 180))
+
+
+class StreamedListPageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employer = User.objects.create_user('employer', password='pass12345')
+        Profile.objects.create(user=cls.employer, role='employee')
+        cls.applicant = User.objects.create_user('applicant', password='pass12345')
+        Profile.objects.create(user=cls.applicant, role='applicant')
+        cls.jobs = [
+            Job.objects.create(title=f'Analyst {i:02}', company_id=Company.objects.intern('Acme'),
+                               location_id=Location.objects.intern('Remote'), description='Reports', posted_by=cls.employer)
+            for i in range(30)
+        ]
+        for job in cls.jobs:
+            Application.objects.create(job=job, applicant=cls.applicant, cover_letter='Hello')
+
+    async def get_html(self, url, data):
+        response = await self.async_client.get(url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+    async def test_job_listings(self):
+        html = await self.get_html(reverse('job_listings'), {'per_page': 20, 'title': 'analyst'})
+        titles = re.findall(r'>(Analyst \d+)</a>', html)
+        self.assertEqual(titles, [f'Analyst {i:02}' for i in range(29, 9, -1)])
+        self.assertIn('title=analyst&amp;per_page=20&amp;cursor=', html)
+        self.assertTrue(html.rstrip().endswith('</html>'))
+
+        html = await self.get_html(reverse('job_listings'), {'per_page': 20, 'title': 'nothing'})
+        self.assertIn('No jobs found matching your search', html)
+
+    async def test_my_applications(self):
+        await self.async_client.aforce_login(self.applicant)
+        html = await self.get_html(reverse('my_applications'), {'per_page': 50})
+        self.assertEqual(len(re.findall(r'Application ID:', html)), 30)
+        self.assertNotIn('cursor=', html)
+
+
+class StaticFilesTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        static_root = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(static_root.cleanup)
+        cls.enterClassContext(override_settings(STATIC_ROOT=static_root.name))
+        call_command('collectstatic', interactive=False, verbosity=0)
+        cls.application = StaticFilesMiddleware(cls.django_application)
+
+    @staticmethod
+    def django_application(environ, start_response):
+        start_response('404 Not Found', [])
+        return [b'django']
+
+    def get(self, path, **headers):
+        environ = {'PATH_INFO': path, 'REQUEST_METHOD': 'GET', 'wsgi.input': io.BytesIO()}
+        environ.update({f'HTTP_{name.upper()}': value for name, value in headers.items()})
+        response = {}
+
+        def start_response(status, response_headers):
+            response.update(status=status, headers=dict(response_headers))
+        response['body'] = b''.join(self.application(environ, start_response))
+        return response
+
+    def test_hashed_files_are_cached_for_a_year(self):
+        url = staticfiles_storage.url('job_app/css/site.css')
+        self.assertRegex(url, r'^/static/job_app/css/site\.[0-9a-f]{12}\.css$')
+        response = self.get(url)
+        self.assertEqual(response['status'], '200 OK')
+        self.assertEqual(response['headers']['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertIn(b'--color-primary', response['body'])
+
+        # Unhashed names are still served, but only briefly cacheable
+        response = self.get('/static/job_app/css/site.css')
+        self.assertEqual(response['headers']['Cache-Control'], 'public, max-age=60')
+
+    def test_precompressed_variants_and_revalidation(self):
+        url = staticfiles_storage.url('job_app/css/site.css')
+        plain = self.get(url)['body']
+        response = self.get(url, accept_encoding='gzip, deflate')
+        self.assertEqual(response['headers']['Content-Encoding'], 'gzip')
+        self.assertEqual(response['headers']['Vary'], 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(response['body']), plain)
+
+        response = self.get(url, accept_encoding='gzip', if_none_match=response['headers']['ETag'])
+        self.assertEqual(response['status'], '304 Not Modified')
+        self.assertEqual(response['body'], b'')
+
+    def test_unknown_paths_reach_django(self):
+        self.assertEqual(self.get('/static/missing.css')['body'], b'django')
+        self.assertEqual(self.get('/jobs/')['body'], b'django')
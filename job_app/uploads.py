@@ -0,0 +1,117 @@
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+from django.utils.deconstruct import deconstructible
+
+
+def file_sha256(file):
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+class ResumeUploadHandler(TemporaryFileUploadHandler):
+    """
+    Streams uploads to a temporary file next to MEDIA_ROOT while hashing
+    them, so the file can later be renamed into place instead of copied.
+    Files over RESUME_MAX_UPLOAD_SIZE are dropped as soon as the limit is
+    crossed and listed in ``request.rejected_uploads``.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_size = settings.RESUME_MAX_UPLOAD_SIZE
+        if request is not None and not hasattr(request, 'rejected_uploads'):
+            request.rejected_uploads = []
+
+    def reject(self):
+        if self.request is not None:
+            self.request.rejected_uploads.append(self.field_name)
+        raise SkipFile()
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        self.field_name = field_name
+        self.size = 0
+        self.digest = hashlib.sha256()
+        if content_length is not None and content_length > self.max_size:
+            self.reject()
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.size += len(raw_data)
+        if self.size > self.max_size:
+            self.reject()
+        self.digest.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        if uploaded is not None:
+            uploaded.sha256 = self.digest.hexdigest()
+        return uploaded
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File storage for names derived from the file content. Saving a name that
+    already exists keeps the stored copy, so identical uploads share one file.
+    New files are fsynced and renamed into place atomically.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        full_path = self.path(name)
+        if os.path.exists(full_path):
+            return name
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+
+        if hasattr(content, 'temporary_file_path'):
+            content.file.flush()
+            os.fsync(content.file.fileno())
+            try:
+                os.replace(content.temporary_file_path(), full_path)
+                return self._finish(name, full_path)
+            except OSError:
+                pass  # different filesystem, fall back to copying
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as destination:
+                for chunk in content.chunks():
+                    destination.write(chunk)
+                destination.flush()
+                os.fsync(destination.fileno())
+            os.replace(tmp_path, full_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return self._finish(name, full_path)
+
+    def _finish(self, name, full_path):
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+        return str(name).replace('\\', '/')
+
+
+resume_storage = ContentAddressedStorage()
+
+
+def resume_upload_to(instance, filename):
+    """Stores resumes as resumes/<sha[:2]>/<sha><ext>."""
+    resume = instance.resume.file
+    sha256 = getattr(resume, 'sha256', None) or file_sha256(resume)
+    # resume_sha256 is declared after resume, so it is read after this runs
+    instance.resume_sha256 = sha256
+    extension = os.path.splitext(filename)[1].lower()
+    return f'resumes/{sha256[:2]}/{sha256}{extension}'
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     # Auth
@@ -16,4 +16,9 @@ urlpatterns = [
     path('jobs/<int:job_id>/', views.job_detail, name='job_detail'),
     path('jobs/<int:job_id>/apply/', views.apply_to_job, name='apply_to_job'),
     path('my-applications/', views.my_applications, name='my_applications'),
+
+    # JSON API
+    path('api/jobs/', api.job_list, name='api_job_list'),
+    path('api/jobs/<int:job_id>/', api.job_detail, name='api_job_detail'),
+    path('api/applications/', api.application_list, name='api_application_list'),
 ]
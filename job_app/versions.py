@@ -0,0 +1,101 @@
+"""
+Version stamps shared by every process through the CacheVersion table.
+
+Cached pages, counts and fragments embed a version in their keys; bumping it
+makes all of them unreachable at once without deleting anything. The stamps
+are kept in the database rather than in the cache so that a bump from one
+worker or a management command is seen by all the others even with the
+per-process locmem cache. Inside a request (see CacheVersionMiddleware) each
+version is read at most once, and a version read from the database is kept
+in the cache for CACHE_VERSION_TTL seconds so that cache hits need no query.
+Bumps delete that copy, so with a shared cache every process sees them at
+once; with locmem other processes see them within the TTL.
+"""
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+from .models import CacheVersion
+
+CATALOGUE = 'catalogue'
+# Renames and deletes of companies and locations (see job_app.entities)
+ENTITIES = 'entities'
+# User and profile changes, for the session copies kept by job_app.auth
+USERS = 'users'
+
+_request_versions = ContextVar('cache_versions', default=None)
+
+
+@contextmanager
+def request_versions():
+    """Reads each version once inside the block."""
+    token = _request_versions.set({})
+    try:
+        yield
+    finally:
+        _request_versions.reset(token)
+
+
+def get_version(name):
+    versions = _request_versions.get()
+    if versions is not None:
+        version = versions.get(name)
+        if isinstance(version, asyncio.Future):
+            version = version.result() if version.done() else None
+        if version is not None:
+            return version
+    version = _read_version(name)
+    if versions is not None:
+        versions[name] = version
+    return version
+
+
+async def aget_version(name):
+    versions = _request_versions.get()
+    if versions is None:
+        return await sync_to_async(_read_version)(name)
+    # Concurrent lookups in one request (asyncio.gather) share a single read
+    if name not in versions:
+        versions[name] = asyncio.ensure_future(sync_to_async(_read_version)(name))
+    version = versions[name]
+    return await version if isinstance(version, asyncio.Future) else version
+
+
+def _cache_key(name):
+    return f'cache_version:{name}'
+
+
+def _read_version(name):
+    ttl = settings.CACHE_VERSION_TTL
+    version = cache.get(_cache_key(name)) if ttl else None
+    if version is not None:
+        return version
+    version = CacheVersion.objects.filter(name=name).values_list('version', flat=True).first()
+    if version is None:
+        version = CacheVersion.objects.get_or_create(name=name, defaults={'version': time.time_ns()})[0].version
+    if ttl:
+        cache.set(_cache_key(name), version, ttl)
+    return version
+
+
+def bump_version(name):
+    # Nanoseconds since the epoch, so the version doubles as a modification
+    # time; never lower than before in case clocks disagree
+    now = time.time_ns()
+    if not CacheVersion.objects.filter(name=name).update(version=Greatest(F('version') + 1, Value(now))):
+        CacheVersion.objects.get_or_create(name=name, defaults={'version': now})
+    # Again on commit, in case another process cached the old version meanwhile
+    cache.delete(_cache_key(name))
+    transaction.on_commit(lambda: cache.delete(_cache_key(name)))
+    versions = _request_versions.get()
+    if versions is not None:
+        versions.pop(name, None)
@@ -1,13 +1,38 @@
-from django.shortcuts import render, get_object_or_404, redirect
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, get_object_or_404, aget_object_or_404, redirect
+from django.conf import settings
 from .models import Job, Application
-from django.db import models
+from django.db.models import Exists, OuterRef
+from django.db import transaction, IntegrityError
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login, authenticate, logout
 from django.contrib import messages
 from .forms import CustomUserCreationForm, CustomAuthenticationForm
+from .search import SEARCH_FIELDS, read_search_params, search_jobs
+from .pagination import apaginate, get_per_page, stream_paginate
+from .middleware import query_budget
+from .cache import acount_jobs, ajob_facets, cache_anonymous_page
+from .streaming import astream_template
+from .similarity import aget_similar_jobs
+from . import geo
+from . import tasks
 from django.http import HttpResponseForbidden
+from django.template.defaultfilters import filesizeformat
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from .uploads import ResumeUploadHandler
+from urllib.parse import urlencode
+
+JOBS_PER_PAGE = 12
+APPLICATIONS_PER_PAGE = 10
+# Search form field each facet narrows the listings by, and its heading
+FACET_PARAMS = {'company': ('company', 'Companies'), 'location': ('location', 'Locations')}
 
 # Auth Views
+# Logging in also reads the profile and users version for the session copy
+# (see job_app.auth.get_session_user), which saves a query on every request after
+@query_budget(12)
 def login_view(request):
     if request.user.is_authenticated:
         return redirect('home')
@@ -31,6 +56,8 @@ def login_view(request):
     
     return render(request, 'auth/login.html', {'form': form})
 
+# As login_view, plus the users version bump for the new profile
+@query_budget(16)
 def register_view(request):
     if request.user.is_authenticated:
         return redirect('home')
@@ -39,6 +66,7 @@ def register_view(request):
         form = CustomUserCreationForm(request.POST)
         if form.is_valid():
             user = form.save()
+            tasks.send_welcome_email.enqueue(user.id)
             login(request, user)
             messages.success(request, f'Account created successfully! Welcome, {user.get_full_name()}!')
             return redirect('home')
@@ -55,112 +83,168 @@ def logout_view(request):
     messages.success(request, 'You have been successfully logged out.')
     return redirect('home')
 
+def get_search_params(request):
+    return read_search_params(request.GET)
+
+def search_form_context(search_params):
+    """The radius choices for the search form, and whether ``near`` named an unknown place."""
+    return {
+        'radius_choices': geo.RADIUS_CHOICES,
+        'radius': geo.get_radius(search_params),
+        'unknown_place': bool(search_params['near']) and geo.geocode(search_params['near']) is None,
+    }
+
+# The read-path views below are async. Their independent queries are awaited
+# together, and templates render in a worker thread since they may still
+# touch the session or lazy relations.
+async def get_user(request):
+    # Reuse the user loaded by auser() when templates read request.user
+    request.user = await request.auser()
+    return request.user
+
+async def alist(queryset):
+    return [obj async for obj in queryset]
+
+def annotate_applied(jobs, user):
+    """Marks each job with ``has_applied`` for the current applicant."""
+    if not user.is_authenticated:
+        return jobs
+    # Only applicants can apply, so other roles simply match no rows
+    return jobs.annotate(has_applied=Exists(Application.objects.filter(
+        job=OuterRef('pk'), applicant=user, applicant__profile__role='applicant'
+    )))
+
+async def has_applied_to(user, job):
+    if not user.is_authenticated:
+        return False
+    return await Application.objects.filter(
+        applicant=user, job=job, applicant__profile__role='applicant'
+    ).aexists()
+
+def facet_links(top_facets, filters):
+    """(heading, [(value, count, query string)]) per facet; each link narrows the current search."""
+    return [
+        (label, [(value, count, urlencode({**filters, param: value})) for value, count in top_facets[field]])
+        for field, (param, label) in FACET_PARAMS.items()
+    ]
+
+async def arender(request, template_name, context):
+    return await sync_to_async(render)(request, template_name, context)
+
 # Homepage
-def homepage(request):
+@query_budget(6)
+@cache_anonymous_page
+async def homepage(request):
     # Get search parameters
-    title_query = request.GET.get('title', '')
-    company_query = request.GET.get('company', '')
-    location_query = request.GET.get('location', '')
-    
-    # Start with all jobs
-    jobs = Job.objects.all()
+    search_params = get_search_params(request)
+    search_performed = any(search_params.values())
+    # Only text searches have a relevance order; radius searches list the newest jobs
+    ranked = any(search_params[param] for param in SEARCH_FIELDS)
     
-    # Apply filters if search parameters are provided
-    if title_query:
-        jobs = jobs.filter(title__icontains=title_query)
-    if company_query:
-        jobs = jobs.filter(company_name__icontains=company_query)
-    if location_query:
-        jobs = jobs.filter(location__icontains=location_query)
+    # Full-text search over all jobs; best matches first when searching
+    jobs = search_jobs(Job.objects.select_related('company', 'location'), search_params, ranked=ranked)
     
     # Get recent jobs (either filtered or all)
-    recent_jobs = jobs.order_by('-created_at')[:9]  # Show latest 9 jobs
-    total_jobs = jobs.count()
-    
-    # Get user's applied job IDs if authenticated
-    user_applied_jobs = []
-    if request.user.is_authenticated and hasattr(request.user, 'profile') and request.user.profile.role == 'applicant':
-        user_applied_jobs = list(Application.objects.filter(applicant=request.user).values_list('job_id', flat=True))
+    if not ranked:
+        jobs = jobs.order_by('-created_at')
+    user = await get_user(request)
+    # Latest 9 jobs with their applied flag, and the cached total
+    recent_jobs, total_jobs = await asyncio.gather(
+        alist(annotate_applied(jobs, user)[:9]),
+        acount_jobs(jobs, search_params),
+    )
     
     context = {
         'recent_jobs': recent_jobs,
         'total_jobs': total_jobs,
-        'search_performed': any([title_query, company_query, location_query]),
-        'search_params': {
-            'title': title_query,
-            'company': company_query,
-            'location': location_query,
-        },
-        'user_applied_jobs': user_applied_jobs,
+        'search_performed': search_performed,
+        'search_params': search_params,
+        **search_form_context(search_params),
     }
-    return render(request, 'homepage.html', context)
+    return await arender(request, 'homepage.html', context)
 
 # Applicant Views
 def applicant_dashboard(request):
     return render(request, 'applicant/dashboard.html')
 
-def job_listings(request):
+@query_budget(7)
+@cache_anonymous_page
+async def job_listings(request):
     # Get search parameters
-    title_query = request.GET.get('title', '')
-    company_query = request.GET.get('company', '')
-    location_query = request.GET.get('location', '')
-    
-    # Start with all jobs
-    jobs = Job.objects.all()
-    
-    # Apply filters if search parameters are provided
-    if title_query:
-        jobs = jobs.filter(title__icontains=title_query)
-    if company_query:
-        jobs = jobs.filter(company_name__icontains=company_query)
-    if location_query:
-        jobs = jobs.filter(location__icontains=location_query)
+    search_params = get_search_params(request)
+    search_performed = any(search_params.values())
     
-    # Order by creation date (newest first)
-    jobs = jobs.order_by('-created_at')
+    # Full-text search over all jobs
+    jobs = search_jobs(Job.objects.select_related('company', 'location'), search_params)
     
-    # Get user's applied job IDs if authenticated
-    user_applied_jobs = []
-    if request.user.is_authenticated and hasattr(request.user, 'profile') and request.user.profile.role == 'applicant':
-        user_applied_jobs = list(Application.objects.filter(applicant=request.user).values_list('job_id', flat=True))
+    # Newest first, one keyset page at a time, alongside the cached total and
+    # facet counts (see job_app.facets)
+    user = await get_user(request)
+    per_page = get_per_page(request, JOBS_PER_PAGE)
+    if per_page > JOBS_PER_PAGE:
+        # Longer pages stream their rows as they are read
+        page = stream_paginate(request, annotate_applied(jobs, user), ('-created_at', '-id'), per_page)
+        total_jobs, top_facets = await asyncio.gather(
+            acount_jobs(jobs, search_params), ajob_facets(jobs, search_params)
+        )
+    else:
+        page, total_jobs, top_facets = await asyncio.gather(
+            apaginate(request, annotate_applied(jobs, user), ('-created_at', '-id'), per_page),
+            acount_jobs(jobs, search_params),
+            ajob_facets(jobs, search_params),
+        )
+    filters = {k: v for k, v in search_params.items() if v}
+    if per_page != JOBS_PER_PAGE:
+        filters['per_page'] = per_page
     
     context = {
-        'jobs': jobs,
-        'total_jobs': jobs.count(),
-        'search_performed': any([title_query, company_query, location_query]),
-        'search_params': {
-            'title': title_query,
-            'company': company_query,
-            'location': location_query,
-        },
-        'user_applied_jobs': user_applied_jobs,
+        'jobs': page,
+        'page': page,
+        'page_query': urlencode(filters),
+        'facets': facet_links(top_facets, filters),
+        'total_jobs': total_jobs,
+        'search_performed': search_performed,
+        'search_params': search_params,
+        **search_form_context(search_params),
     }
-    return render(request, 'applicant/job_listings.html', context)
+    if page.streamed:
+        return await astream_template(
+            request, 'applicant/job_listings.html', context, page, 'includes/job_card.html', 'job'
+        )
+    return await arender(request, 'applicant/job_listings.html', context)
 
-def job_detail(request, job_id):
-    job = get_object_or_404(Job, id=job_id)
-    
-    # Check if user has already applied to this job
-    has_applied = False
-    if request.user.is_authenticated and hasattr(request.user, 'profile') and request.user.profile.role == 'applicant':
-        has_applied = Application.objects.filter(applicant=request.user, job=job).exists()
+@query_budget(6)
+@cache_anonymous_page
+async def job_detail(request, job_id):
+    job = await aget_object_or_404(Job.objects.select_related('posted_by', 'company', 'location'), id=job_id)
+    user = await get_user(request)
     
-    # Get similar jobs (same company or similar titles, excluding current job)
-    similar_jobs = Job.objects.filter(
-        models.Q(company_name=job.company_name) | 
-        models.Q(title__icontains=job.title.split()[0])  # Jobs with similar title keywords
-    ).exclude(id=job.id).order_by('-created_at')[:3]
+    # Whether the user already applied, and the precomputed nearest
+    # neighbours (see job_app.similarity)
+    has_applied, similar_jobs = await asyncio.gather(
+        has_applied_to(user, job), aget_similar_jobs(job)
+    )
     
     context = {
         'job': job,
         'similar_jobs': similar_jobs,
         'has_applied': has_applied,
     }
-    return render(request, 'job_detail.html', context)
+    return await arender(request, 'job_detail.html', context)
 
 @login_required
+@query_budget(12)
+@csrf_exempt
 def apply_to_job(request, job_id):
-    job = get_object_or_404(Job, id=job_id)
+    # The resume handler (and its size cap) only applies here. It has to be
+    # installed before anything reads request.POST, which CsrfViewMiddleware
+    # would do, so the CSRF check runs inside the view instead.
+    request.upload_handlers.insert(0, ResumeUploadHandler(request))
+    return _apply_to_job(request, job_id)
+
+@csrf_protect
+def _apply_to_job(request, job_id):
+    job = get_object_or_404(Job.objects.select_related('company', 'location'), id=job_id)
     
     # Check if user is an applicant
     if not hasattr(request.user, 'profile') or request.user.profile.role != 'applicant':
@@ -182,13 +266,28 @@ def apply_to_job(request, job_id):
             messages.error(request, 'Please provide a cover letter.')
             return render(request, 'applicant/apply.html', {'job': job})
         
-        # Create the application
-        application = Application.objects.create(
-            applicant=request.user,
-            job=job,
-            cover_letter=cover_letter,
-            resume=resume
-        )
+        if 'resume' in getattr(request, 'rejected_uploads', []):
+            max_size = filesizeformat(settings.RESUME_MAX_UPLOAD_SIZE)
+            messages.error(request, f'Your resume is too large. The maximum size is {max_size}.')
+            return render(request, 'applicant/apply.html', {'job': job})
+        
+        # Create the application; the unique constraint catches double submits
+        try:
+            with transaction.atomic():
+                application = Application.objects.create(
+                    applicant=request.user,
+                    job=job,
+                    cover_letter=cover_letter,
+                    resume=resume
+                )
+        except IntegrityError:
+            messages.warning(request, 'You have already applied for this job.')
+            return redirect('job_detail', job_id=job_id)
+        
+        # The resume is on disk; parsing and notifications happen in the background
+        if application.resume:
+            tasks.extract_resume_text.enqueue(application.id)
+        tasks.notify_employer_of_application.enqueue(application.id)
         
         messages.success(request, f'Your application for "{job.title}" has been submitted successfully!')
         return redirect('my_applications')
@@ -199,14 +298,33 @@ def apply_to_job(request, job_id):
     return render(request, 'applicant/apply.html', context)
 
 @login_required
-def my_applications(request):
-    # Get all applications for the current user
-    applications = Application.objects.filter(applicant=request.user).order_by('-applied_at')
+@query_budget(6)
+async def my_applications(request):
+    # Get the current user's applications, newest first, one keyset page at a time
+    user = await get_user(request)
+    applications = Application.objects.filter(applicant=user).select_related('job__company', 'job__location')
+    per_page = get_per_page(request, APPLICATIONS_PER_PAGE)
+    if per_page > APPLICATIONS_PER_PAGE:
+        # Longer pages stream their rows as they are read
+        page = stream_paginate(request, applications, ('-applied_at', '-id'), per_page)
+        total_applications = await applications.acount()
+    else:
+        page, total_applications = await asyncio.gather(
+            apaginate(request, applications, ('-applied_at', '-id'), per_page),
+            applications.acount(),
+        )
     
     context = {
-        'applications': applications,
-        'total_applications': applications.count(),
+        'applications': page,
+        'page': page,
+        'page_query': urlencode({'per_page': per_page}) if per_page != APPLICATIONS_PER_PAGE else '',
+        'total_applications': total_applications,
     }
-    return render(request, 'applicant/my_applications.html', context)
+    if page.streamed:
+        return await astream_template(
+            request, 'applicant/my_applications.html', context, page,
+            'includes/application_card.html', 'application',
+        )
+    return await arender(request, 'applicant/my_applications.html', context)
 
 